@@ -0,0 +1,301 @@
+function info = export_gp_compact(model, filename, precision)
+% Export a fitted GPR model to a compact '.gpc' file for the NumPy predictor (src/control/gp_compact.py)
+% model    : RegressionGP from fitrgp (e.g. GPRmodel_i in GPR_Model_*.mat), an incremental-engine
+%            model (gp_fit.m, not coregionalized), or the name of a .mat file holding such models
+% filename : output file (default: <mat file name>.gpc, or <mat file name>_<variable>.gpc
+%            when the .mat file holds several models)
+% precision: 'double' (default) or 'single' (arrays stored as float32, about half the size)
+% info     : footer written to the file plus the max. deviation from predict() on training
+%            points (max_err_mu, max_err_sd; NaN when not checked)
+%
+% Stored: training/active-set inputs X, weights alpha, basis coefficients beta and the Cholesky
+% factor L of K + sn^2*I (plus Lb for FITC/VFE engine models); hyperparameters go in the footer.
+% Layout: MAGIC | arrays (column-major, little-endian) | footer JSON | footer offset (uint64) | MAGIC,
+% the same layout as the '.fsirun' run files.
+%
+% Example:
+%   export_gp_compact('GPR_Model_Free_4DIM.mat');
+%   export_gp_compact(GPRmodel_i, 'Free_4DIM.gpc', 'single');
+
+if nargin < 3 || isempty(precision)
+    precision = 'double';
+end
+if ~any(strcmp(precision, {'double', 'single'}))
+    error('export_gp_compact:precision', 'precision must be ''double'' or ''single''');
+end
+
+if ischar(model) || isstring(model)
+    % .mat file: export every GPR model it contains
+    matfile_name = char(model);
+    S = load(matfile_name);
+    vars = fieldnames(S);
+    keep = cellfun(@(v) is_fitrgp(S.(v)) || is_engine(S.(v)), vars);
+    vars = vars(keep);
+    if isempty(vars)
+        error('export_gp_compact:empty', 'No GPR model found in %s', matfile_name);
+    end
+    [folder, stem] = fileparts(matfile_name);
+    for k = 1:numel(vars)
+        if nargin >= 2 && ~isempty(filename) && numel(vars) == 1
+            out = filename;
+        elseif numel(vars) == 1
+            out = fullfile(folder, [stem '.gpc']);
+        else
+            out = fullfile(folder, [stem '_' vars{k} '.gpc']);
+        end
+        info(k) = export_gp_compact(S.(vars{k}), out, precision); %#ok<AGROW>
+    end
+    return
+end
+
+if nargin < 2 || isempty(filename)
+    error('export_gp_compact:filename', 'Output file name required');
+end
+
+if is_fitrgp(model)
+    [c, err] = from_fitrgp(model);
+elseif is_engine(model)
+    c = from_engine(model);
+    err = [NaN, NaN];
+else
+    error('export_gp_compact:model', 'Unsupported model type %s', class(model));
+end
+
+info = write_compact(c, filename, precision);
+info.max_err_mu = err(1);
+info.max_err_sd = err(2);
+if ~isnan(err(1))
+    fprintf('Exported %s: n = %d, d = %d, max |mu - predict| = %.3g, max |sd - predict| = %.3g\n', ...
+        filename, size(c.X,1), size(c.X,2), err(1), err(2));
+else
+    fprintf('Exported %s: n = %d, d = %d\n', filename, size(c.X,1), size(c.X,2));
+end
+end
+
+
+function tf = is_fitrgp(m)
+tf = isa(m, 'RegressionGP') || isa(m, 'classreg.learning.regr.CompactRegressionGP');
+end
+
+
+function tf = is_engine(m)
+tf = isstruct(m) && all(isfield(m, {'kcode', 'bcode', 'hyp', 'alpha', 'L', 'X', 'xlo', 'xscale'}));
+end
+
+
+% ----------------------------- Model conversion -----------------------------
+
+function [c, err] = from_fitrgp(model)
+% Built-in kernels only; ARD kernels keep one length scale per input
+ki = model.KernelInformation;
+name = lower(ki.Name);
+if strncmp(name, 'ard', 3)
+    name = name(4:end);
+end
+kp = ki.KernelParameters(:);
+switch name
+    case {'squaredexponential', 'exponential', 'matern32', 'matern52'}
+        c.ell = kp(1:end-1)';
+        c.rq_alpha = 1;
+    case 'rationalquadratic'
+        c.ell = kp(1:end-2)';
+        c.rq_alpha = kp(end-1);
+    otherwise
+        error('export_gp_compact:kernel', 'Custom kernel %s cannot be exported', ki.Name);
+end
+if isa(model.BasisFunction, 'function_handle')
+    error('export_gp_compact:basis', 'Custom basis functions cannot be exported');
+end
+c.kernel = name;
+c.sf = kp(end);
+c.sn = model.Sigma;
+c.basis = lower(char(model.BasisFunction));
+c.beta = model.Beta(:);
+c.alpha = model.Alpha(:);
+c.X = model.ActiveSetVectors;
+d = size(c.X, 2);
+c.xloc = zeros(1, d);
+c.xscale = ones(1, d);
+c.ymu = 0;
+c.ysd = 1;
+c.Lb = [];
+c.L = chol_jitter(compact_kernel(c, c.X, c.X), c.sf^2, c.sn^2);
+c.source = class(model);
+c.predictor_names = model.PredictorNames;
+
+% With Standardize the active set may be stored standardized: keep the variant that reproduces predict()
+err = [NaN, NaN];
+if isprop(model, 'X') && ~isempty(model.X)
+    probes = model.X(1:min(200, size(model.X,1)), :);
+    [mu0, sd0] = predict(model, probes);
+    variants = {c};
+    try
+        standardized = model.ModelParameters.Standardize;
+    catch
+        standardized = false;
+    end
+    if standardized
+        s = c;
+        s.xloc = mean(model.X, 1);
+        s.xscale = std(model.X, 0, 1);
+        s.xscale(s.xscale == 0) = 1;
+        variants{end+1} = s;
+    end
+    best = inf;
+    for k = 1:numel(variants)
+        [mu, sd] = compact_predict(variants{k}, probes);
+        e = [max(abs(mu - mu0)), max(abs(sd - sd0))];
+        if e(1) < best
+            best = e(1);
+            c = variants{k};
+            err = e;
+        end
+    end
+end
+end
+
+
+function c = from_engine(model)
+if isfield(model, 'icm') && ~isempty(model.icm)
+    error('export_gp_compact:icm', 'Coregionalized (ICM) engine models cannot be exported');
+end
+kernels = {'squaredexponential', 'exponential', 'matern32', 'matern52', 'rationalquadratic'};
+bases = {'none', 'constant', 'linear', 'purequadratic', 'poly2'};
+kp = model.hyp(1:end-1);
+c.kernel = kernels{model.kcode};
+c.ell = exp(kp(1));
+c.sf = exp(kp(2));
+c.rq_alpha = 1;
+if model.kcode == 5
+    c.rq_alpha = exp(kp(3));
+end
+c.sn = exp(model.hyp(end));
+c.basis = bases{model.bcode};
+c.beta = model.beta;
+c.alpha = model.alpha;
+c.X = model.X; % already scaled to [0,1]
+c.L = model.L;
+c.Lb = [];
+if isfield(model, 'Lb')
+    c.Lb = model.Lb;
+end
+c.xloc = model.xlo;
+c.xscale = model.xscale;
+c.ymu = model.ymu;
+c.ysd = model.ysd;
+c.source = 'gp_fit';
+c.predictor_names = {};
+end
+
+
+% ----------------------------- Prediction (for the check against predict) -----------------------------
+
+function K = compact_kernel(c, X1, X2)
+X1 = X1 ./ c.ell;
+X2 = X2 ./ c.ell;
+D2 = max(sum(X1.^2,2) + sum(X2.^2,2)' - 2*(X1*X2'), 0);
+sf2 = c.sf^2;
+switch c.kernel
+    case 'squaredexponential'
+        K = sf2*exp(-D2/2);
+    case 'exponential'
+        K = sf2*exp(-sqrt(D2));
+    case 'matern32'
+        R = sqrt(3*D2);
+        K = sf2*(1+R).*exp(-R);
+    case 'matern52'
+        R = sqrt(5*D2);
+        K = sf2*(1+R+R.^2/3).*exp(-R);
+    case 'rationalquadratic'
+        K = sf2*(1 + D2/(2*c.rq_alpha)).^(-c.rq_alpha);
+end
+end
+
+
+function H = compact_basis(c, X)
+n = size(X,1);
+switch c.basis
+    case 'none'
+        H = zeros(n,0);
+    case 'constant'
+        H = ones(n,1);
+    case 'linear'
+        H = [ones(n,1), X];
+    case 'purequadratic'
+        H = [ones(n,1), X, X.^2];
+    case 'poly2'
+        H = [ones(n,1), polynomialBasis(X,2)];
+end
+end
+
+
+function [mu, sd] = compact_predict(c, Xq)
+Xs = (Xq - c.xloc)./c.xscale;
+Ks = compact_kernel(c, c.X, Xs);
+mu = Ks'*c.alpha;
+if ~isempty(c.beta)
+    mu = mu + compact_basis(c, Xs)*c.beta;
+end
+mu = mu.*c.ysd + c.ymu;
+var_f = max(c.sf^2 - sum((c.L \ Ks).^2,1)', 0);
+sd = sqrt(var_f + c.sn^2).*c.ysd;
+end
+
+
+function L = chol_jitter(K, sf2, sn2)
+n = size(K,1);
+jitter = 0;
+[L, p] = chol(K + sn2*eye(n), 'lower');
+while p > 0
+    jitter = max(10*jitter, 1e-10*sf2);
+    [L, p] = chol(K + (sn2 + jitter)*eye(n), 'lower');
+end
+end
+
+
+% ----------------------------- Writer -----------------------------
+
+function footer = write_compact(c, filename, precision)
+MAGIC = uint8(['FSIGPC1' 0]);
+tmp = [filename '.tmp'];
+fid = fopen(tmp, 'w', 'ieee-le');
+if fid < 0
+    error('export_gp_compact:open', 'Cannot open %s', tmp);
+end
+cleaner = onCleanup(@() close_quietly(fid));
+fwrite(fid, MAGIC, 'uint8');
+arrays = struct();
+names = {'X', 'alpha', 'beta', 'L', 'Lb'};
+for k = 1:numel(names)
+    A = c.(names{k});
+    if strcmp(names{k}, 'Lb') && isempty(A)
+        continue
+    end
+    offset = ftell(fid);
+    fwrite(fid, A, precision);
+    fwrite(fid, zeros(1, mod(-ftell(fid), 8), 'uint8'), 'uint8'); % 8-byte alignment
+    arrays.(names{k}) = struct('offset', offset, 'shape', size(A));
+end
+footer = struct( ...
+    'format', 'fsigpc', 'version', 1, 'source', c.source, ...
+    'kernel', c.kernel, 'ell', c.ell, 'sf', c.sf, 'rq_alpha', c.rq_alpha, 'sn', c.sn, ...
+    'basis', c.basis, 'xloc', c.xloc, 'xscale', c.xscale, 'ymu', c.ymu, 'ysd', c.ysd, ...
+    'n', size(c.X,1), 'd', size(c.X,2), 'outputs', size(c.alpha,2), ...
+    'dtype', strrep(strrep(precision, 'double', 'float64'), 'single', 'float32'), ...
+    'order', 'F', 'arrays', arrays, 'created', char(datetime('now', 'Format', 'yyyy-MM-dd HH:mm:ss')));
+footer.predictor_names = c.predictor_names;
+offset = ftell(fid);
+fwrite(fid, unicode2native(jsonencode(footer), 'UTF-8'), 'uint8');
+fwrite(fid, offset, 'uint64');
+fwrite(fid, MAGIC, 'uint8');
+clear cleaner
+movefile(tmp, filename, 'f');
+end
+
+
+function close_quietly(fid)
+try
+    fclose(fid);
+catch
+end
+end
@@ -0,0 +1,46 @@
+function [Coe, cache] = DataDeal_cached(files,U,A,f,L,D,M,tinterval,CF_CL,IL_CL,cache)
+% Coefficients of several run files (one row per file, same columns as DataDeal)
+% Results are cached by file content hash and case parameters, so repeated runs
+% are only processed once per campaign; uncached files are processed with parfor
+% (runs serially when no parallel pool is available)
+% files: cell array of file names; cache: containers.Map from key to 1x5 coefficients
+if ischar(files)
+    files = {files};
+end
+nfile = numel(files);
+keys = cell(nfile,1);
+for k = 1:nfile
+    keys{k} = sprintf('%s_%.10g_%.10g_%.10g_%.10g_%d_%d', file_md5(files{k}), U, A, f, tinterval, CF_CL, IL_CL);
+end
+Coe = zeros(nfile,5);
+hit = false(nfile,1);
+for k = 1:nfile
+    if isKey(cache, keys{k})
+        Coe(k,:) = cache(keys{k});
+        hit(k) = true;
+    end
+end
+todo = find(~hit);
+Coe_new = zeros(numel(todo),5);
+parfor j = 1:numel(todo)
+    data = read_run(files{todo(j)}); % text file or run-store copy
+    Coe_new(j,:) = DataDeal(data,U,A,f,L,D,M,tinterval,CF_CL,IL_CL);
+end
+for j = 1:numel(todo)
+    Coe(todo(j),:) = Coe_new(j,:);
+    cache(keys{todo(j)}) = Coe_new(j,:);
+end
+return
+
+function h = file_md5(filename)
+% MD5 of the file content (hex string)
+fid = fopen(filename, 'r');
+if fid < 0
+    error('DataDeal_cached:open', 'Cannot open %s', filename);
+end
+bytes = fread(fid, inf, '*uint8');
+fclose(fid);
+md = java.security.MessageDigest.getInstance('MD5');
+md.update(typecast(bytes, 'int8'));
+h = sprintf('%02x', typecast(md.digest(), 'uint8'));
+return
@@ -4,14 +4,14 @@ function output4 = Step4_DealCreatCoe(stepn,filenametxt,filenamecsv,filenamestor
 % After processing the data and obtaining the coefficient results, a preliminary assessment of the rationality of the coefficient results is required.
 % Import the hydrodynamic coefficient results into the initial_data file.
 output4=stepn;
-%% Read txt data
-input0=importdata(filenametxt);
-tinterval=input0.data(23);
-err_coe=input0.data(24);
-err_coeType=input0.data(25);
-ytrain_direction=input0.data(26);
-ytrain_type=input0.data(27);
-Coe_Zhengzhi=input0.data(31);
+%% Read txt data (by parameter name; filenametxt may also be a struct passed from Python)
+input0=param_struct(filenametxt);
+tinterval=input0.Tinterval;
+err_coe=input0.Errcoe;
+err_coeType=input0.ErrcoeType;
+ytrain_direction=input0.YtrainDirection;
+ytrain_type=input0.YtrainType;
+Coe_Zhengzhi=input0.Coe_Zhengzhi;
 % Read csv data
 data = readtable(filenamecsv);
 case_No = table2array(data (:,1));
@@ -21,7 +21,23 @@ csv_input0 = table2array(data (:,4:13));
 case_direction = table2array(data (:,14));
 case_count = table2array(data (:,15));
 csv_coe = table2array(data (:,16:20));
-load('information.mat');
+% .mat files live next to the case table (absolute path from Python), not in the current folder
+folder = step_folder(filenamecsv);
+f = @(name) fullfile(folder, name);
+if isfile(f('information.mat'))
+    load(f('information.mat'));
+else
+    % written to the current folder by a step 1 built before step_folder; that folder is
+    % shared by every rig of the process, so this only holds for single-rig runs
+    warning('Step4_DealCreatCoe:cwd', 'information.mat not in %s; reading it from the current folder', folder);
+    load('information.mat');
+end
+% Per-file coefficient cache (file content hash + case parameters), kept across steps
+if isfile(f('coe_cache.mat'))
+    load(f('coe_cache.mat'),'coe_cache');
+else
+    coe_cache = containers.Map('KeyType','char','ValueType','any');
+end
 if sum(csv_input0(:,1))~=0
     CF_CL=1;
 else
@@ -46,7 +62,7 @@ err_coe_ZF=zeros(n/2,5);
 
 for im=1:length(m)
     i=m(im);
-    filelist = dir([filenamestorematlab case_name{i} '.txt']);
+    filelist = run_files(filenamestorematlab, case_name{i}); % text files and run-store copies
     filedate = [filelist.datenum];
     [~,newestIdx] = max(filedate);
     if ~isempty(newestIdx)
@@ -54,14 +70,13 @@ for im=1:length(m)
     else
         fprintf('Missing file: %s\n', case_name{i});
     end
-    newestfilename = filelist(newestIdx).name;
-    data = readmatrix(newestfilename); % There is a file naming issue to be resolved here
+    newestfilename = fullfile(filelist(newestIdx).folder, filelist(newestIdx).name);
     if mod(i,2)==1
         i1=(i+1)/2;
         Us = csv_input0(i,10);
         As = csv_input0(i,5);
         fs = csv_input0(i,6);
-        Coe1 = DataDeal(data,Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL); 
+        [Coe1, coe_cache] = DataDeal_cached({newestfilename},Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL,coe_cache);
         Train_data1(i1,1:6) = csv_input0(i,5:10);
         Train_data1(i1,7:end) = Coe1(1:4); % output 4 hydrodynamic coefficients
         csv_coe(i,:) = Coe1;
@@ -70,7 +85,7 @@ for im=1:length(m)
         Us = csv_input0(i,10);
         As = csv_input0(i,5);
         fs = csv_input0(i,6);
-        Coe0 = DataDeal(data,Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL); 
+        [Coe0, coe_cache] = DataDeal_cached({newestfilename},Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL,coe_cache);
         Train_data0(i0,1:6) = csv_input0(i,5:10);
         Train_data0(i0,7:end) = Coe0(1:4);
         csv_coe(i,:) = Coe0;
@@ -101,30 +116,19 @@ for im=1:length(m)
             case_record(i-1:i) = [0;0]; % mark as unqualified and redo
             % Check whether it has already been redone for the second time; process the data that has been redone twice
             if length(filelist) > 1
-                Coe0_repeat = zeros(length(filelist),5);
-                Coe1_repeat = zeros(length(filelist),5);
                 filelist0 =filelist;
-                filelist1 = dir([filenamestorematlab case_name{i-1} '.txt']);
-                
-                for ifile=1:length(filelist1) % number of forward cases (in this loop it must be forward)
-                    filename1 = filelist1(ifile).name;
-                    datafile1 = readmatrix(filename1);
-                    Coe1_repeat(ifile,:) = DataDeal(datafile1,Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL);
-                end
-                for ifile=1:length(filelist0) % number of backward cases (in this loop it must be backward)
-                    filename0 = filelist0(ifile).name;
-                    datafile0 = readmatrix(filename0);
-                    Coe0_repeat(ifile,:) = DataDeal(datafile0,Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL);
-                end
-                % Set up a loop to compute coefficient error under all combinations
-                ii=1;
-                err_coe_ZF1=zeros(length(filelist1)*length(filelist0),5);
-                for ifile1=1:length(filelist1)
-                    for ifile0=1:length(filelist0)
-                        err_coe_ZF1(ii,1:5)=abs((Coe1_repeat(ifile1,:)-Coe0_repeat(ifile0,:))./Coe1_repeat(ifile1,:));
-                        ii=ii+1;
-                    end
-                end
+                filelist1 = run_files(filenamestorematlab, case_name{i-1});
+                files1 = fullfile({filelist1.folder}, {filelist1.name}); % forward runs
+                files0 = fullfile({filelist0.folder}, {filelist0.name}); % backward runs
+                % Only files not seen before are processed (in parallel when a pool is available)
+                [Coe1_repeat, coe_cache] = DataDeal_cached(files1,Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL,coe_cache);
+                [Coe0_repeat, coe_cache] = DataDeal_cached(files0,Us,As,fs,L,D,M,tinterval,CF_CL,IL_CL,coe_cache);
+                % Coefficient error under all combinations in one pass; row ii=(ifile1-1)*n_0+ifile0
+                n_1 = size(Coe1_repeat,1);
+                n_0 = size(Coe0_repeat,1);
+                C1 = reshape(Coe1_repeat,[n_1 1 5]);
+                C0 = reshape(Coe0_repeat,[1 n_0 5]);
+                err_coe_ZF1 = reshape(permute(abs((C1-C0)./C1),[2 1 3]), n_1*n_0, 5);
                 % Choose the coefficients under the minimum discrepancy according to the selected reference coefficient
                 switch err_coeType
                     case 1 % based on CF Ce
@@ -145,10 +149,10 @@ for im=1:length(m)
                         [~,err_min_idx]=min(err_coe_ZF1(:,5));
                 end
                 % Process data based on the number of backward cases (using the embedded direction)
-                coe1_n = ceil(err_min_idx/ifile); % selected index for forward coefficients
-                coe0_n = mod(err_min_idx,ifile); % selected index for backward coefficients
+                coe1_n = ceil(err_min_idx/n_0); % selected index for forward coefficients
+                coe0_n = mod(err_min_idx,n_0); % selected index for backward coefficients
                 if coe0_n == 0
-                    coe0_n = ifile;
+                    coe0_n = n_0;
                 end
                 % Extract positive values and then do nearest selection and maximum selection; reliability needs to be ensured here
                 switch Coe_Zhengzhi
@@ -179,7 +183,8 @@ for im=1:length(m)
 end
 clear m
 m=find(case_record==0);
-save('information.mat','S','D','L','M','n0','n','m','N0');
+save(f('information.mat'),'S','D','L','M','n0','n','m','N0');
+save(f('coe_cache.mat'),'coe_cache');
 %% Write the analyzed hydrodynamic coefficients into the csv file
 switch ytrain_direction
     case 2 % use the mean of forward and backward as training data
@@ -208,11 +213,11 @@ switch ytrain_type
         y_train = y_train1(:,5);
 end
 
-save('err_coe_ZF.mat','err_coe_ZF');
-save('Train_data0.mat','Train_data0');
-save('Train_data1.mat','Train_data1');
-save('csv_coe.mat','csv_coe');
-save('y_train.mat','y_train');
+save(f('err_coe_ZF.mat'),'err_coe_ZF');
+save(f('Train_data0.mat'),'Train_data0');
+save(f('Train_data1.mat'),'Train_data1');
+save(f('csv_coe.mat'),'csv_coe');
+save(f('y_train.mat'),'y_train');
 
 data = table(case_No, case_name, case_record, csv_input0(:,1),csv_input0(:,2),...
        csv_input0(:,3),csv_input0(:,4),csv_input0(:,5),csv_input0(:,6),...
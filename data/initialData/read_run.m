@@ -0,0 +1,50 @@
+function data = read_run(filename)
+% Samples of one run file (samples x columns, as readmatrix on the oscillator text file)
+% '.fsirun' files are the chunked, compressed copies written by run_store.py: every
+% channel is stored as zlib-compressed byte planes of float64 chunks; columns that were
+% not stored are returned as zeros
+[~,~,ext] = fileparts(filename);
+if ~strcmpi(ext, '.fsirun')
+    data = readmatrix(filename);
+    return
+end
+magic = uint8(['FSIRUN1' 0]);
+fid = fopen(filename, 'r', 'ieee-le');
+if fid < 0
+    error('read_run:open', 'Cannot open %s', filename);
+end
+cleanup = onCleanup(@() fclose(fid));
+head = fread(fid, 8, '*uint8')';
+fseek(fid, -16, 'eof');
+offset = fread(fid, 1, 'uint64=>double');
+tail = fread(fid, 8, '*uint8')';
+footer_end = ftell(fid) - 16;
+if ~isequal(head, magic) || ~isequal(tail, magic)
+    error('read_run:format', 'Not a complete run file: %s', filename);
+end
+fseek(fid, offset, 'bof');
+footer = jsondecode(char(fread(fid, footer_end - offset, '*uint8')'));
+n = footer.n_samples;
+channels = footer.channels(:)';
+data = zeros(n, max(channels) + 1);
+for c = channels
+    table = footer.chunks.(matlab.lang.makeValidName(num2str(c))); % rows of [offset, length]
+    for k = 1:size(table, 1)
+        fseek(fid, table(k,1), 'bof');
+        blob = fread(fid, table(k,2), '*int8');
+        k0 = (k-1) * footer.chunk;
+        count = min(footer.chunk, n - k0);
+        data(k0+(1:count), c+1) = decode_chunk(blob, count);
+    end
+end
+return
+
+function values = decode_chunk(blob, count)
+% zlib inflate (java.util.zip), then byte planes -> little-endian float64
+sink = java.io.ByteArrayOutputStream();
+inflater = java.util.zip.InflaterOutputStream(sink);
+inflater.write(blob);
+inflater.close();
+planes = reshape(typecast(sink.toByteArray(), 'uint8'), count, 8); % column p = byte p of every value
+values = typecast(reshape(planes', [], 1), 'double');
+return
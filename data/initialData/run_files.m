@@ -0,0 +1,15 @@
+function filelist = run_files(filenamestorematlab, casename)
+% Run files of one case, like dir([filenamestorematlab casename '.txt'])
+% Runs archived by run_store.py into the 'runstore' folder next to the text files
+% ('yyyyMMddHHmmss<name>.fsirun', text file removed) are listed too; a run that still
+% has its text file is listed once
+filelist = dir([filenamestorematlab casename '.txt']);
+stored = dir(fullfile(fileparts(filenamestorematlab), 'runstore', ['*' casename '.fsirun']));
+if isempty(stored)
+    return
+end
+[~, txtstems] = cellfun(@fileparts, {filelist.name}, 'UniformOutput', false);
+[~, stems] = cellfun(@fileparts, {stored.name}, 'UniformOutput', false);
+stored = stored(~ismember(stems, txtstems));
+filelist = [filelist(:); stored(:)];
+return
@@ -0,0 +1,163 @@
+function [next_point_write, next_point_cal, y_pre_data, y_pre_err, y_pre_sco, x_pre_data, y_train, stats] = ...
+    GPR_Pre_core(p0, p1, csv_coe, x_train, out_dir)
+%% 5 高斯过程回归预测的计算部分（不读写文件）DPQ
+% p0: Input0 参数（结构体或 txt 文件名），p1: Input1_pre 预测参数（结构体或 txt 文件名）
+% csv_coe: 工况表中 Cv1,Ca1,Cv2,Ca2,Cdm 五列（正反向交替），x_train: 训练输入
+% Python 端可直接传入 dict 与数值数组，返回下一实验点及预测结果数组
+% GridTile>0（增量引擎）时分块预测：预测数组写入 out_dir（为空则不写），返回值为空，stats 为在线归约的统计量
+if nargin < 5
+    out_dir = '';
+end
+p0 = param_struct(p0);
+p1 = param_struct(p1);
+csv_coe = double(csv_coe);
+x_train = double(x_train);
+
+ytrain_direction = p0.YtrainDirection;
+ytrain_type = p0.YtrainType;
+
+xtrain_type = p1.XtrainType;
+Kernel_fun = p1.Kernelfun;
+Basis_fun = p1.Basisfun;
+para.nextpoint_method = p1.Nextpointmethod;
+para.sigma = p1.Sigma;
+para.explorationratio = p1.Explorationratio;
+para.maxEvaluations = p1.MaxEvaluations;
+para.Boundzone = p1.Boundzone;
+para.w_mu = p1.w_mu;
+para.w_sigma = p1.w_sigma;
+para.lambda = p1.lambda;
+para.Dis_Penalty = p1.Dis_Penalty;
+para.Bounds_Penalty = p1.Bounds_Penalty;
+para.penalty_w1 = p1.penalty_w1;
+para.penalty_w2 = p1.penalty_w2;
+para.Multiply = p1.Multiply;
+para.JiaoTi_YorN = p1.JiaoTi_YorN;
+para.JiaoTi_YorN2 = p1.JiaoTi_YorN2;
+para.opti_fun = p1.Fun_option;
+para.ConstantSigma = p1.ConstantSigma;
+for name = {'HypIters','DriftTol','BatchSize','BatchMethod','ContinuousOpt','Sparsefun','Inducing','MultiOutput','CvFolds'} % 增量引擎、批量采样的可选设置
+    if isfield(p1, name{1})
+        para.(name{1}) = p1.(name{1});
+    end
+end
+para.StateDir = out_dir; % 增量引擎模型（gp_state.mat）与交叉验证缓存的保存目录，为空则只保留在内存中
+
+Kfun=[floor(Kernel_fun/1000);floor(mod(Kernel_fun,1000)/100);...
+      floor(mod(Kernel_fun,100)/10);mod(Kernel_fun,10)];
+Bfun=[floor(Basis_fun/1000);floor(mod(Basis_fun,1000)/100);...
+      floor(mod(Basis_fun,100)/10);mod(Basis_fun,10)];
+
+A1non_pre = pre_range(p1.A1non0, p1.StepA1, p1.A1non1); % CF无因次振幅
+f1non_pre = pre_range(p1.f1non0, p1.StepF1, p1.f1non1); % CF无因次频率
+A2non_pre = pre_range(p1.A2non0, p1.StepA2, p1.A2non1); % IL
+theta_pre = pre_range(p1.theta0, p1.Steptheta, p1.thetaend); % CF和IL相位差
+U_pre = pre_range(p1.U0, p1.StepU, p1.Uend); % U 0.05-0.2 大致对应Re 0.5e4-2e4
+
+% 建立训练数据
+switch ytrain_direction
+    case 2 % 正反取均值作为训练数据
+        y_train1 = (csv_coe(1:2:end,:)+csv_coe(2:2:end,:))./2;
+    case 1 % 以正向数据为准
+        y_train1 = csv_coe(1:2:end,:);
+    case 0 % 以反向数据为准
+        y_train1 = csv_coe(2:2:end,:);
+    case 3 % 以正反数据中ce正值、大值为准
+        for iyt=1:2:length(csv_coe(:,1))
+            if csv_coe(iyt,1) > csv_coe(iyt+1,1)
+                y_train1((iyt+1)/2,:) = csv_coe(iyt,:); % 正向数据大，取正向
+            else
+                y_train1((iyt+1)/2,:) = csv_coe(iyt+1,:); % 负向数据大，取负向
+            end
+        end
+end
+switch ytrain_type
+    case 1 % CF
+        y_train = y_train1(:,[1,2]);
+    case 2 % IL
+        y_train = y_train1(:,[3,4]);
+    case 3 % CF+IL
+        y_train = y_train1(:,[1,2,3,4]);
+    case 4 % CF+IL
+        y_train = y_train1;
+end
+x_cols = xtrain_columns(xtrain_type);
+drop4 = sum(A1non_pre)~=0 && sum(A2non_pre)~=0; % CF、IL 均有振幅时 f2=2*f1，不作为输入
+pre_grid.axes = {A1non_pre, f1non_pre, A2non_pre, theta_pre, U_pre};
+pre_grid.cols = x_cols;
+x_train1=x_train;
+if drop4
+    pre_grid.cols(4)=[];
+    x_train1(:,4)=[];
+end
+if isfield(p1,'ModelSelect') && p1.ModelSelect && isfield(p1,'GpEngine') && p1.GpEngine
+    % 交叉验证选择每个输出列的核函数、基函数（代替 Kernelfun/Basisfun 的设定）
+    [Kfun, Bfun] = gp_select_model(x_train1, y_train, 1:5, 1:4, gp_options(para));
+end
+stats = [];
+if isfield(p1,'GridTile') && p1.GridTile > 0 && isfield(p1,'GpEngine') && p1.GpEngine
+    % 分块预测：不展开整个网格，结果逐块写入 out_dir，只返回候选点与统计量
+    [next_point_cal, stats] = GP_pre_tiled(pre_grid, x_train1, y_train, Kfun, Bfun, para, p1.GridTile, out_dir);
+    y_pre_data = [];
+    y_pre_err = [];
+    y_pre_sco = [];
+    x_pre_data = [];
+else
+    [A1, f1, A2, theta, U] = ...
+        ndgrid(A1non_pre, f1non_pre, A2non_pre, theta_pre, U_pre);
+    if sum(A2non_pre)==0
+        f2=A2;
+    else
+        f2=2*f1;
+    end
+    x_pre_data_total = [A1(:), f1(:), A2(:), f2(:), theta(:), U(:)];
+    x_pre_data = x_pre_data_total(:,x_cols);
+    x_pre_data1 = x_pre_data_total(:,pre_grid.cols);
+    if isfield(p1,'GpEngine') && p1.GpEngine % 增量引擎：新增点只做秩扩展，模型跨调用保留
+        [y_pre_data, y_pre_err, y_pre_sco,next_point_cal]= GP_pre_engine(x_pre_data1,x_train1,y_train,Kfun,Bfun,para);
+    else
+        [y_pre_data, y_pre_err, y_pre_sco,next_point_cal]= GRP_pre(x_pre_data1,x_train1,y_train,Kfun,Bfun,para); % n_pre*4个方差
+    end
+    if isfield(para,'BatchSize') && para.BatchSize > 1 && size(next_point_cal,1) < para.BatchSize*size(y_train,2)
+        % 批量采样：局部惩罚（克里金信任者已在增量引擎中完成）
+        next_point_cal = batch_points(x_pre_data1, y_pre_sco, x_train1, para.BatchSize, para);
+    end
+end
+if drop4
+    for j=length(next_point_cal(1,:)):-1:4
+        next_point_cal(:,j+1)=next_point_cal(:,j);
+    end
+    next_point_cal(:,4)=2*next_point_cal(:,2);
+end
+
+% 扩展后的下一个实验点，用于写入文件（其余列取网格前几行，同 ndgrid 展开顺序）
+next_point_write = grid_rows(struct('axes',{pre_grid.axes},'cols',1:6), 1:size(next_point_cal,1));
+next_point_write(:,x_cols) = next_point_cal;
+end
+
+function v = pre_range(v0, step, v1)
+% 预测范围：步长为0时只取起点
+if step~=0
+    v=(v0:step:v1)';
+else
+    v=(v0)';
+end
+end
+
+function cols = xtrain_columns(xtrain_type)
+% 训练输入类型对应 [A1, f1, A2, f2, theta, U] 中的列
+switch xtrain_type
+    case 1 % CF A和f
+        cols = [1,2];
+    case 2 % IL A和f
+        cols = [3,4];
+    case 3 % CF+IL A、f和θ
+        cols = 1:5;
+    case 4 % CF A、f和Re（U）
+        cols = [1,2,6];
+    case 5 % IL A、f和Re（U）
+        cols = [3,4,6];
+    case 6 % CF+IL A、f、θ和Re（U）
+        cols = 1:6;
+end
+end
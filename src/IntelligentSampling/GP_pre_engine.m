@@ -0,0 +1,55 @@
+function [y_pre_data, y_pre_err, y_pre_sco, next_point_cal] = GP_pre_engine(x_pre, x_train, y_train, Kfun, Bfun, para)
+% 增量高斯过程引擎（与 GRP_pre 接口相同），每个输出列一个模型
+% 模型在两次调用之间保留（gp_engine_fit）：新增训练点只做 Cholesky 秩扩展，超参数从上一轮热启动
+% Kfun/Bfun: 每个输出列的核函数/基函数编号；para: GPR_Pre_core 中的参数结构体
+% 采集函数按 para.nextpoint_method 在整个网格上批量计算（acquisition_batch）
+% para.ContinuousOpt>0 时以网格最优的 ContinuousOpt 个点为起点做多起点梯度优化（optimize_acquisition_grad）
+% para.BatchSize>1 且 BatchMethod=2 时按克里金信任者法每列选 BatchSize 个点（next_point_cal 共 ny*q 行）
+opts = gp_options(para);
+q = 1;
+if isfield(para,'BatchSize') && para.BatchSize > 1 && isfield(para,'BatchMethod') && para.BatchMethod == 2
+    q = para.BatchSize;
+end
+opts_kb = opts;
+opts_kb.HypIters = 0; % 信任点不更新超参数
+nstart = 0;
+if isfield(para,'ContinuousOpt')
+    nstart = para.ContinuousOpt;
+end
+ny = size(y_train,2);
+models = gp_engine_fit(x_train, y_train, Kfun, Bfun, opts);
+
+n_pre = size(x_pre,1);
+y_pre_data = zeros(n_pre, ny);
+y_pre_err = zeros(n_pre, ny);
+y_pre_sco = zeros(n_pre, ny);
+next_point_cal = zeros(ny*q, size(x_pre,2));
+bounds = [min(x_pre,[],1); max(x_pre,[],1)]'; % 预测网格范围，用于边界惩罚
+for j = 1:ny
+    t0 = tic;
+    acq = acquisition_batch(models{j}, x_pre, x_train, bounds, para); % 整个网格一次打分
+    y_pre_data(:,j) = acq.mu;
+    y_pre_err(:,j) = acq.sd;
+    y_pre_sco(:,j) = acq.score;
+    mb = models{j};
+    xnext = pick_point(mb, x_pre, acq, x_train, bounds, para, nstart);
+    next_point_cal((j-1)*q+1,:) = xnext;
+    for k = 2:q % 克里金信任者：已选点以预测均值作为观测值加入（秩1扩展），再重新打分
+        mb = gp_update(mb, xnext, gp_predict(mb, xnext), opts_kb);
+        acq = acquisition_batch(mb, x_pre, mb.Xraw, bounds, para);
+        xnext = pick_point(mb, x_pre, acq, mb.Xraw, bounds, para, nstart);
+        next_point_cal((j-1)*q+k,:) = xnext;
+    end
+    fprintf('[GP] 第%d列：打分%.3f s\n', j, toc(t0));
+end
+end
+
+function xnext = pick_point(model, x_pre, acq, x_train, bounds, para, nstart)
+% 网格上得分最高的点；nstart>0 时再做多起点梯度优化（不限于网格点）
+if nstart > 0
+    xnext = optimize_acquisition_grad(model, x_pre, acq.score, x_train, bounds, para, nstart);
+else
+    [~, inext] = max(acq.score);
+    xnext = x_pre(inext,:);
+end
+end
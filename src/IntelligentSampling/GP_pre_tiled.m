@@ -0,0 +1,52 @@
+function [next_point_cal, stats] = GP_pre_tiled(grid, x_train, y_train, Kfun, Bfun, para, tile, out_dir)
+% 增量引擎的分块版本：网格不展开（grid_rows），predict_grid_tiled 分块打分并在线归约
+% 下一个点在每列得分最高的候选点中选取：BatchSize>1 时选 q 个，BatchMethod=2 为克里金信任者
+% （同 GP_pre_engine，但只在候选点上重新打分，不再次遍历整个网格），否则局部惩罚（batch_points）；
+% ContinuousOpt>0 时以候选点为起点做多起点梯度优化，否则取得分最高的网格点
+opts = gp_options(para);
+models = gp_engine_fit(x_train, y_train, Kfun, Bfun, opts);
+q = 1;
+if isfield(para,'BatchSize') && para.BatchSize > 1
+    q = para.BatchSize;
+end
+believer = q > 1 && isfield(para,'BatchMethod') && para.BatchMethod == 2;
+opts_kb = opts;
+opts_kb.HypIters = 0; % 信任点不更新超参数
+nstart = 0;
+if isfield(para,'ContinuousOpt')
+    nstart = para.ContinuousOpt;
+end
+t0 = tic;
+stats = predict_grid_tiled(models, grid, x_train, para, tile, out_dir, max([50, 20*q, nstart]));
+fprintf('[GP] 分块预测%d点：%.3f s\n', stats.n, toc(t0));
+
+ny = numel(models);
+next_point_cal = zeros(ny*q, numel(grid.cols));
+for j = 1:ny
+    cand = stats.top_x{j};
+    sco = stats.top_score(:,j);
+    if q > 1 && ~believer
+        next_point_cal((j-1)*q+(1:q),:) = batch_points(cand, sco, x_train, q, para, stats.bounds);
+        continue
+    end
+    mb = models{j};
+    xnext = pick_point(mb, cand, sco, x_train, stats.bounds, para, nstart);
+    next_point_cal((j-1)*q+1,:) = xnext;
+    for k = 2:q % 克里金信任者：已选点以预测均值作为观测值加入（秩1扩展），候选点重新打分
+        mb = gp_update(mb, xnext, gp_predict(mb, xnext), opts_kb);
+        acq = acquisition_batch(mb, cand, mb.Xraw, stats.bounds, para);
+        xnext = pick_point(mb, cand, acq.score, mb.Xraw, stats.bounds, para, nstart);
+        next_point_cal((j-1)*q+k,:) = xnext;
+    end
+end
+end
+
+function xnext = pick_point(model, cand, sco, x_train, bounds, para, nstart)
+% 候选点中得分最高的点；nstart>0 时再做多起点梯度优化（不限于网格点）
+if nstart > 0
+    xnext = optimize_acquisition_grad(model, cand, sco, x_train, bounds, para, nstart);
+else
+    [~, inext] = max(sco);
+    xnext = cand(inext,:);
+end
+end
@@ -0,0 +1,71 @@
+function A = acquisition_batch(model, Xc, X_train, bounds, para)
+% 批量计算采集函数：Xc 每行一个候选点，一次预测供所有采集函数共用
+% model: fitrgp 模型或增量引擎模型（gp_fit 的结构体）；bounds: [下界, 上界]，每行一个输入
+% 返回结构体：mu、sd、ucb（UCAcquisitionFunction，不含惩罚）、var（predict_variance）、
+% ei（expected_Improvement）、pi、hybrid（hunhe_var_EI）、penalty（距离+边界惩罚）、
+% ucb_pen（含惩罚的 UCB）以及按 para.nextpoint_method 选出的 score（越大越好）
+if isstruct(model)
+    [mu, sd] = gp_predict(model, Xc);
+else
+    [mu, sd] = predict(model, Xc);
+end
+sd = max(sd, eps);
+A.mu = mu;
+A.sd = sd;
+A.ucb = para.w_mu*mu + para.w_sigma*sd;
+A.var = para.w_mu*mu + para.w_sigma*sd.^2;
+
+bestObservation = max(model.Y);
+Z = (mu - bestObservation)./sd;
+A.ei = (mu - bestObservation).*normcdf(Z) + sd.*normpdf(Z);
+A.pi = normcdf(Z);
+
+% 混合采集函数：逐点权重，与 ga 逐点调用 hunhe_var_EI 时相同
+yr = range(model.Y);
+sigma = sd/yr;
+improve = max(mu, 0)/yr;
+alpha = sigma./(sigma + improve + 1e-6);
+A.hybrid = alpha.*A.var + (1-alpha).*A.ei;
+
+% 距离惩罚与边界惩罚（同 UCAcquisitionFunction）
+A.penalty = zeros(size(mu));
+if para.Dis_Penalty
+    A.penalty = A.penalty + para.penalty_w1*exp(-min_distance(Xc, X_train)/para.lambda);
+end
+if para.Bounds_Penalty
+    BoundsDis = min(min(Xc - bounds(:,1)',[],2), min(bounds(:,2)' - Xc,[],2));
+    A.penalty = A.penalty + para.penalty_w2*exp(-BoundsDis/para.lambda);
+end
+if para.Multiply
+    A.ucb_pen = A.ucb.*(1-A.penalty);
+else
+    A.ucb_pen = A.ucb - A.penalty;
+end
+
+switch para.nextpoint_method
+    case {1, 5} % EI
+        A.score = A.ei;
+    case 2 % 置信界（不含惩罚）
+        A.score = A.ucb;
+    case 3 % 最大方差
+        A.score = A.var;
+    case 4 % PI
+        A.score = A.pi;
+    case 7 % 方差与 EI 混合
+        A.score = A.hybrid;
+    otherwise % 6：含距离/边界惩罚的 UCB
+        A.score = A.ucb_pen;
+end
+end
+
+function d = min_distance(Xc, X_train)
+% 每个候选点到已知点的最小欧氏距离，分块计算以限制内存
+d = zeros(size(Xc,1),1);
+nt2 = sum(X_train.^2,2)';
+blk = 4096;
+for i0 = 1:blk:size(Xc,1)
+    i = i0:min(i0+blk-1, size(Xc,1));
+    D2 = sum(Xc(i,:).^2,2) + nt2 - 2*Xc(i,:)*X_train';
+    d(i) = sqrt(max(min(D2,[],2), 0));
+end
+end
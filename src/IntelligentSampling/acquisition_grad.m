@@ -0,0 +1,56 @@
+function [a, g] = acquisition_grad(model, x, X_train, bounds, para)
+% 单个点 x（1×D，原始尺度）的采集函数值及解析梯度，编号与 acquisition_batch 相同
+% 混合采集函数（7）不给出梯度（g 为空，由优化器差分）；距离/边界惩罚取最近点、最近边界的次梯度
+if para.nextpoint_method == 7
+    A = acquisition_batch(model, x, X_train, bounds, para);
+    a = A.score;
+    g = [];
+    return
+end
+[mu, sd, dmu, dsd] = gp_predict_grad(model, x);
+sd = max(sd, eps);
+bestObservation = max(model.Y);
+Z = (mu - bestObservation)/sd;
+switch para.nextpoint_method
+    case {1, 5} % EI
+        a = (mu - bestObservation)*normcdf(Z) + sd*normpdf(Z);
+        g = normcdf(Z)*dmu + normpdf(Z)*dsd;
+    case 2 % 置信界
+        a = para.w_mu*mu + para.w_sigma*sd;
+        g = para.w_mu*dmu + para.w_sigma*dsd;
+    case 3 % 最大方差
+        a = para.w_mu*mu + para.w_sigma*sd^2;
+        g = para.w_mu*dmu + 2*para.w_sigma*sd*dsd;
+    case 4 % PI
+        a = normcdf(Z);
+        g = normpdf(Z)*(dmu - Z*dsd)/sd;
+    otherwise % 6：含距离/边界惩罚的 UCB
+        ucb = para.w_mu*mu + para.w_sigma*sd;
+        ducb = para.w_mu*dmu + para.w_sigma*dsd;
+        penalty = 0;
+        dpen = zeros(size(x));
+        if para.Dis_Penalty
+            [dmin, i] = min(vecnorm(X_train - x, 2, 2));
+            p = para.penalty_w1*exp(-dmin/para.lambda);
+            penalty = penalty + p;
+            if dmin > 0
+                dpen = dpen - p/para.lambda*(x - X_train(i,:))/dmin;
+            end
+        end
+        if para.Bounds_Penalty
+            [BoundsDis, i] = min([x - bounds(:,1)', bounds(:,2)' - x]);
+            p = para.penalty_w2*exp(-BoundsDis/para.lambda);
+            penalty = penalty + p;
+            D = numel(x);
+            s = 1 - 2*(i > D); % 下界距离对 x 的导数为 +1，上界为 -1
+            dpen(mod(i-1,D)+1) = dpen(mod(i-1,D)+1) - s*p/para.lambda;
+        end
+        if para.Multiply
+            a = ucb*(1-penalty);
+            g = ducb*(1-penalty) - ucb*dpen;
+        else
+            a = ucb - penalty;
+            g = ducb - dpen;
+        end
+end
+end
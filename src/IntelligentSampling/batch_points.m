@@ -0,0 +1,46 @@
+function next_point_cal = batch_points(x_pre, y_pre_sco, x_train, q, para, bounds)
+% 批量采样（局部惩罚）：每个输出列从预测网格中依次选 q 个点
+% 每选一个点，按与已知点及本批已选点的最小距离对得分施加惩罚（同 UCAcquisitionFunction 的 Dis_Penalty）：
+% penalty = penalty_w1*exp(-d/lambda)，Multiply 为 1 时得分乘以 (1-penalty)，否则减去 penalty
+% 得分先归一化到 [0,1]，距离按网格范围归一化（各输入量纲不同）；lambda<=0 时取 0.1，penalty_w1<=0 时取 1
+% bounds（可选，[下界, 上界]）：距离归一化所用范围，默认取 x_pre 的范围（x_pre 只是候选子集时应给出整个网格的范围）
+% 返回 (ny*q) 行，每个输出列的 q 个点相邻
+if nargin < 6
+    bounds = [min(x_pre,[],1); max(x_pre,[],1)]';
+end
+lo = bounds(:,1)';
+scale = bounds(:,2)' - lo;
+scale(scale==0) = 1;
+xs = (x_pre - lo)./scale;
+xt = (x_train - lo)./scale;
+lambda = para.lambda;
+if lambda <= 0
+    lambda = 0.1;
+end
+w1 = para.penalty_w1;
+if w1 <= 0
+    w1 = 1;
+end
+ny = size(y_pre_sco,2);
+next_point_cal = zeros(ny*q, size(x_pre,2));
+for j = 1:ny
+    s = y_pre_sco(:,j);
+    s = (s - min(s))/max(max(s) - min(s), eps);
+    dmin = inf(size(xs,1),1);
+    for t = 1:size(xt,1) % 与训练点的最小距离
+        dmin = min(dmin, sqrt(sum((xs - xt(t,:)).^2,2)));
+    end
+    for k = 1:q
+        penalty = w1*exp(-dmin/lambda);
+        if para.Multiply
+            acq = s.*(1-penalty);
+        else
+            acq = s - penalty;
+        end
+        acq(dmin==0) = -inf; % 已有点、已选点不再选
+        [~, inext] = max(acq);
+        next_point_cal((j-1)*q+k,:) = x_pre(inext,:);
+        dmin = min(dmin, sqrt(sum((xs - xs(inext,:)).^2,2)));
+    end
+end
+end
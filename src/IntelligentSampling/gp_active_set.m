@@ -0,0 +1,19 @@
+function idx = gp_active_set(kcode, kp, X, m)
+% 活动集选择：贪心选取当前后验方差（无噪声）最大的点，即核矩阵的主元 Cholesky 分解，O(n m^2)
+n = size(X,1);
+m = min(m, n);
+d = exp(2*kp(2))*ones(n,1); % 平稳核对角元 sf^2
+G = zeros(n,m);
+idx = zeros(m,1);
+for k = 1:m
+    [dmax, i] = max(d);
+    if dmax <= 0
+        idx = idx(1:k-1); % 其余点已被完全解释
+        break
+    end
+    idx(k) = i;
+    G(:,k) = (gp_kernel(kcode, kp, X, X(i,:)) - G(:,1:k-1)*G(i,1:k-1)')/sqrt(dmax);
+    d = d - G(:,k).^2;
+    d(idx(1:k)) = -inf;
+end
+end
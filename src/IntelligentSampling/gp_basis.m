@@ -0,0 +1,18 @@
+function H = gp_basis(bcode, X)
+% 显式基函数：bcode 1 无，2 常数，3 线性，4 纯二次，5 自定义（polynomialBasis，2阶）
+n = size(X,1);
+switch bcode
+    case 1
+        H = zeros(n,0);
+    case 2
+        H = ones(n,1);
+    case 3
+        H = [ones(n,1), X];
+    case 4
+        H = [ones(n,1), X, X.^2];
+    case 5
+        H = [ones(n,1), polynomialBasis(X,2)];
+    otherwise
+        error('gp_basis:code', '未知基函数编号 %d', bcode);
+end
+end
@@ -0,0 +1,22 @@
+function dH = gp_basis_grad(bcode, x)
+% 单个点 x（1×D）处基函数行向量对 x 的导数，p×D（与 gp_basis 的列对应）
+D = numel(x);
+switch bcode
+    case 1
+        dH = zeros(0,D);
+    case 2
+        dH = zeros(1,D);
+    case 3
+        dH = [zeros(1,D); eye(D)];
+    case 4
+        dH = [zeros(1,D); eye(D); 2*diag(x)];
+    case 5 % polynomialBasis(x,2)：每个输入 [x, x^2, 0]
+        dH = zeros(1+3*D, D);
+        for j = 1:D
+            dH(1+(j-1)*3+1, j) = 1;
+            dH(1+(j-1)*3+2, j) = 2*x(j);
+        end
+    otherwise
+        error('gp_basis:code', '未知基函数编号 %d', bcode);
+end
+end
@@ -0,0 +1,21 @@
+function m = gp_column(model, j)
+% 多输出模型第 j 列的单输出视图（共用 X、L 等，不复制分解），供预测、采集函数使用
+if size(model.Y,2) == 1
+    m = model;
+    return
+end
+m = model;
+m.Y = model.Y(:,j);
+m.ymu = model.ymu(j);
+m.ysd = model.ysd(j);
+m.alpha = model.alpha(:,j);
+m.beta = model.beta(:,j);
+if isfield(model,'yh')
+    m.yh = model.yh(:,j);
+end
+if ~isempty(model.icm)
+    m.icm.Gm = model.icm.Gm(:,j);
+    m.icm.Bd = model.icm.Bd(j);
+    m.icm.B = model.icm.B(j,j);
+end
+end
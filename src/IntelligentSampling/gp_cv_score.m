@@ -0,0 +1,34 @@
+function s = gp_cv_score(X, y, kcode, bcode, opts)
+% 单个核函数/基函数组合的交叉验证得分 [负对数预测密度, RMSE]（标准化目标尺度）
+% 超参数在全部数据上最大似然估计一次，由同一分解 Ky^-1 = W 闭式得到交叉验证残差：
+% 留一（opts.CvFolds<=1）r_i = alpha_i/W_ii，方差 1/W_ii；k 折（交错分折）r_I = W_II\alpha_I
+% 基函数系数不随折重估（近似）
+o = opts;
+o.sparse = 1;
+o.icm = false;
+try
+    model = gp_fit(X, y, kcode, bcode, o);
+catch
+    s = [inf, inf]; % 拟合失败的组合不参与选择
+    return
+end
+n = size(X,1);
+W = model.L' \ (model.L \ eye(n));
+a = model.alpha;
+if opts.CvFolds <= 1
+    r = a./diag(W);
+    v = 1./diag(W);
+else
+    fold = mod((0:n-1)', opts.CvFolds) + 1;
+    r = zeros(n,1);
+    v = zeros(n,1);
+    for f = 1:opts.CvFolds
+        I = fold == f;
+        WI = W(I,I);
+        r(I) = WI \ a(I);
+        v(I) = diag(inv(WI));
+    end
+end
+v = max(v, eps);
+s = [mean(0.5*log(2*pi*v) + r.^2./(2*v)), sqrt(mean(r.^2))];
+end
@@ -0,0 +1,57 @@
+function models = gp_engine_fit(x_train, y_train, Kfun, Bfun, opts)
+% 增量引擎的模型，在两次调用之间保留：
+% 运行时常驻时用 persistent（按 opts.StateDir 区分，多台架共用一个运行时），另存 StateDir 下的
+% gp_state.mat 供新进程读取（StateDir 为空时不写文件）；gp_sync 决定秩扩展或完整拟合
+% opts.MultiOutput>0 时核/基函数/稀疏编号相同的输出列合为一组，共用一个模型（一次分解）
+% 返回每个输出列一个模型（组模型的单列视图，gp_column）
+persistent states
+if isempty(states)
+    states = containers.Map('KeyType', 'char', 'ValueType', 'any');
+end
+key = ['dir:' opts.StateDir];
+state_file = '';
+if ~isempty(opts.StateDir)
+    state_file = fullfile(opts.StateDir, 'gp_state.mat');
+end
+state = [];
+if isKey(states, key)
+    state = states(key);
+elseif ~isempty(state_file) && exist(state_file, 'file')
+    s = load(state_file, 'state');
+    if isfield(s, 'state')
+        state = s.state;
+    end
+end
+ny = size(y_train,2);
+codes = zeros(ny,3);
+for j = 1:ny
+    codes(j,:) = [Kfun(min(j,end)), Bfun(min(j,end)), opts.Sfun(min(j,end))];
+end
+if opts.MultiOutput
+    [~, ~, g] = unique(codes, 'rows', 'stable');
+else
+    g = (1:ny)';
+end
+groups = arrayfun(@(k) find(g==k)', 1:max(g), 'UniformOutput', false);
+if isempty(state) || ~isequal(state.groups, groups) || state.MultiOutput ~= opts.MultiOutput
+    state = struct('groups', {groups}, 'MultiOutput', opts.MultiOutput, 'models', {cell(1,numel(groups))});
+end
+
+models = cell(1,ny);
+for k = 1:numel(groups)
+    t0 = tic;
+    cols = groups{k};
+    opts.sparse = codes(cols(1),3);
+    state.models{k} = gp_sync(state.models{k}, x_train, y_train(:,cols), codes(cols(1),1), codes(cols(1),2), opts);
+    mk = state.models{k};
+    fprintf('[GP] 第%s列：n=%d（模式%d，m=%d），更新%d次，完整拟合%d次，拟合%.3f s\n', ...
+        mat2str(cols), size(mk.Xraw,1), mk.sparse, size(mk.X,1), mk.nupdate, mk.nrefit, toc(t0));
+    for c = 1:numel(cols)
+        models{cols(c)} = gp_column(mk, c);
+    end
+end
+states(key) = state;
+if ~isempty(state_file)
+    save(state_file, 'state');
+end
+end
@@ -0,0 +1,18 @@
+function fac = gp_factor(X, y, kcode, bcode, hyp)
+% 给定超参数的完整分解：Ky = K + sn^2*I = L*L'，基函数系数 beta 按广义最小二乘求解
+% 返回 L、白化后的基函数 Hh = L\H、白化观测 yh = L\y、beta、alpha = Ky\(y-H*beta)、负对数边缘似然
+n = size(X,1);
+K = gp_kernel(kcode, hyp(1:end-1), X, X);
+sn2 = exp(2*hyp(end));
+jitter = 0;
+[L, p] = chol(K + sn2*eye(n), 'lower');
+while p > 0 % 数值不正定时逐步加对角扰动
+    jitter = max(10*jitter, 1e-10*mean(diag(K)+sn2));
+    [L, p] = chol(K + (sn2+jitter)*eye(n), 'lower');
+end
+fac.L = L;
+fac.jitter = jitter;
+fac.Hh = L \ gp_basis(bcode, X);
+fac.yh = L \ y;
+fac = gp_solve(fac);
+end
@@ -0,0 +1,58 @@
+function model = gp_fit(X, y, kcode, bcode, opts, hyp0)
+% 完整拟合：输入按训练范围缩放到 [0,1]，最大似然估计超参数后完整分解
+% opts: gp_options 的结果；hyp0（可选）为热启动超参数
+% opts.sparse>1 且训练点多于 opts.Inducing 时建立稀疏模型（gp_sparse_fit）
+% y 可为多列（共用核与分解的多输出模型），各列标准化后共用超参数；opts.icm 为真时再做共区域化（gp_icm）
+model.kcode = kcode;
+model.bcode = bcode;
+model.xlo = min(X,[],1);
+model.xscale = max(X,[],1) - model.xlo;
+model.xscale(model.xscale==0) = 1;
+model.Xraw = X;
+model.X = (X - model.xlo)./model.xscale;
+model.Y = y;
+model.ymu = zeros(1,size(y,2));
+model.ysd = ones(1,size(y,2));
+if size(y,2) > 1
+    model.ymu = mean(y,1);
+    model.ysd = std(y,0,1);
+    model.ysd(model.ysd==0) = 1;
+end
+if nargin < 6 || isempty(hyp0)
+    hyp0 = gp_hyp0(kcode, gp_targets(model), opts.Sigma/mean(model.ysd));
+end
+model.fixed = false(size(hyp0));
+model.fixed(end) = opts.ConstantSigma ~= 0;
+model.scode = opts.sparse; % 设定的模式；model.sparse 为实际模式
+model.sparse = 1;
+model.Lb = [];
+model.icm = [];
+if opts.sparse > 1 && size(X,1) > opts.Inducing
+    model = gp_sparse_fit(model, hyp0, opts);
+else
+    model.hyp = gp_optimize(model.X, gp_targets(model), kcode, bcode, hyp0, opts.FullIters, model.fixed);
+    model = gp_refactor(model);
+    if isfield(opts,'icm') && opts.icm && size(y,2) > 1
+        model = gp_icm(model);
+    end
+end
+model.nrefit = 1;
+model.nupdate = 0;
+end
+
+function hyp0 = gp_hyp0(kcode, y, sigma)
+% 初始超参数：长度尺度 0.5（缩放后），信号标准差取 y 的标准差，噪声取 Sigma
+sf = std(y(:));
+if sf == 0
+    sf = 1;
+end
+sn = sigma;
+if sn <= 0
+    sn = sf/10;
+end
+hyp0 = [log(0.5); log(sf)];
+if kcode == 5
+    hyp0 = [hyp0; 0];
+end
+hyp0 = [hyp0; log(sn)];
+end
@@ -0,0 +1,27 @@
+function model = gp_icm(model)
+% 共区域化（ICM）：各输出协方差 B ⊗ Kx + sn^2*I，B 取标准化输出的相关矩阵
+% 由 Kx = Q*diag(lam)*Q' 与 B = U*diag(d)*U' 的特征分解，一次 O(n^3) 分解得到所有输出：
+% 均值权重 alpha（mu = Ks'*alpha + H*beta，同共用分解模型），潜函数方差 sf^2*Bd - ((Q'*Ks).^2)'*Gm
+Yn = gp_targets(model);
+p = size(Yn,2);
+kp = model.hyp(1:end-1);
+sn2 = exp(2*model.hyp(end)) + model.jitter;
+B = corrcoef(Yn);
+B(isnan(B)) = 0;
+B(1:p+1:end) = 1;
+[U, d] = eig((B+B')/2, 'vector');
+d = max(d, 0);
+Kx = gp_kernel(model.kcode, kp, model.X, model.X);
+[Q, lam] = eig((Kx+Kx')/2, 'vector');
+lam = max(lam, 0);
+R = Yn;
+if ~isempty(model.beta)
+    R = Yn - gp_basis(model.bcode, model.X)*model.beta;
+end
+E = 1./(lam*d' + sn2); % n×p，(d ⊗ lam + sn^2) 的倒数
+model.alpha = Q*((Q'*R*U).*E)*U'*B;
+model.icm.Q = Q;
+model.icm.Gm = E*(d.^2 .* (U.^2)'); % Gm(i,j) = sum_l d_l^2*U(j,l)^2/(lam_i*d_l + sn^2)
+model.icm.Bd = diag(B)';
+model.icm.B = B;
+end
@@ -0,0 +1,44 @@
+function [K, dK] = gp_kernel(kcode, kp, X1, X2)
+% 核函数（各向同性）：kcode 1 平方指数，2 指数，3 matern32，4 matern52，5 有理二次
+% kp: 对数核参数 [log(ell); log(sf)]，有理二次另加 log(alpha)
+% dK: 对各对数核参数的导数（cell，与 kp 同序），仅在需要时计算
+ell = exp(kp(1));
+sf2 = exp(2*kp(2));
+D2 = max(sum(X1.^2,2) + sum(X2.^2,2)' - 2*(X1*X2'), 0) / ell^2; % r^2
+switch kcode
+    case 1 % 平方指数
+        K = sf2*exp(-D2/2);
+        if nargout > 1
+            dK = {K.*D2, 2*K};
+        end
+    case 2 % 指数
+        R = sqrt(D2);
+        K = sf2*exp(-R);
+        if nargout > 1
+            dK = {K.*R, 2*K};
+        end
+    case 3 % matern32
+        R = sqrt(3*D2);
+        E = exp(-R);
+        K = sf2*(1+R).*E;
+        if nargout > 1
+            dK = {sf2*R.^2.*E, 2*K};
+        end
+    case 4 % matern52
+        R = sqrt(5*D2);
+        E = exp(-R);
+        K = sf2*(1+R+R.^2/3).*E;
+        if nargout > 1
+            dK = {sf2*R.^2.*(1+R).*E/3, 2*K};
+        end
+    case 5 % 有理二次
+        alpha = exp(kp(3));
+        B = 1 + D2/(2*alpha);
+        K = sf2*B.^(-alpha);
+        if nargout > 1
+            dK = {K.*D2./B, 2*K, K.*(D2./(2*B) - alpha*log(B))};
+        end
+    otherwise
+        error('gp_kernel:code', '未知核函数编号 %d', kcode);
+end
+end
@@ -0,0 +1,27 @@
+function G = gp_kernel_du(kcode, kp, X1, X2)
+% 核函数对 u = r^2/ell^2 的导数 dK/du，用于对输入求梯度：dK/dx1 = dK/du * 2*(x1-x2)/ell^2
+% 编号与 kp 同 gp_kernel
+ell = exp(kp(1));
+sf2 = exp(2*kp(2));
+U = max(sum(X1.^2,2) + sum(X2.^2,2)' - 2*(X1*X2'), 0) / ell^2;
+switch kcode
+    case 1 % 平方指数
+        G = -sf2*exp(-U/2)/2;
+    case 2 % 指数（r=0 处不可导，取 0）
+        R = sqrt(U);
+        G = -sf2*exp(-R)./(2*R);
+        G(R==0) = 0;
+    case 3 % matern32
+        R = sqrt(3*U);
+        G = -1.5*sf2*exp(-R);
+    case 4 % matern52
+        R = sqrt(5*U);
+        G = -5/6*sf2*(1+R).*exp(-R);
+    case 5 % 有理二次
+        alpha = exp(kp(3));
+        B = 1 + U/(2*alpha);
+        G = -sf2*B.^(-alpha-1)/2;
+    otherwise
+        error('gp_kernel:code', '未知核函数编号 %d', kcode);
+end
+end
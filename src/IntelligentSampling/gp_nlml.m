@@ -0,0 +1,21 @@
+function [nlml, grad] = gp_nlml(hyp, X, y, kcode, bcode, fixed)
+% 负对数边缘似然及其对超参数（对数尺度）的梯度；hyp = [对数核参数; log(sn)]
+% fixed: 逻辑向量，为真的超参数保持不变（梯度置零，如 ConstantSigma）
+if nargin < 6
+    fixed = false(size(hyp));
+end
+fac = gp_factor(X, y, kcode, bcode, hyp);
+nlml = fac.nlml;
+if nargout > 1
+    [~, dK] = gp_kernel(kcode, hyp(1:end-1), X, X);
+    n = size(X,1);
+    W = fac.L' \ (fac.L \ eye(n));
+    Q = size(y,2)*W - fac.alpha*fac.alpha'; % 多列 y：各列梯度之和
+    grad = zeros(size(hyp));
+    for k = 1:numel(dK)
+        grad(k) = 0.5*sum(sum(Q.*dK{k}));
+    end
+    grad(end) = exp(2*hyp(end))*trace(Q);
+    grad(fixed) = 0;
+end
+end
@@ -0,0 +1,20 @@
+function hyp = gp_optimize(X, y, kcode, bcode, hyp0, maxit, fixed)
+% 最大似然估计超参数（解析梯度，拟牛顿法），从 hyp0 开始（热启动时为上一轮结果）
+if nargin < 7
+    fixed = false(size(hyp0));
+end
+if maxit <= 0
+    hyp = hyp0;
+    return
+end
+options = optimoptions('fminunc','Algorithm','quasi-newton',...
+    'SpecifyObjectiveGradient',true,'MaxIterations',maxit,'Display','off');
+obj = @(h) gp_nlml(h, X, y, kcode, bcode, fixed);
+try
+    hyp = fminunc(obj, hyp0, options);
+catch
+    hyp = hyp0; % 优化失败时保留原超参数
+end
+hyp = min(max(hyp, -12), 12); % 避免极端的对数超参数
+hyp(fixed) = hyp0(fixed);
+end
@@ -0,0 +1,28 @@
+function opts = gp_options(para)
+% 增量 GP 引擎的设置（para 中未给出的取默认值）
+opts.Sigma = field_or(para, 'sigma', 0);           % 初始噪声标准差
+opts.ConstantSigma = field_or(para, 'ConstantSigma', 0); % 1：噪声不参与估计
+opts.FullIters = field_or(para, 'FullIters', 100);  % 完整拟合时的最大迭代次数
+opts.HypIters = field_or(para, 'HypIters', 15);     % 增量更新时热启动的最大迭代次数
+opts.DriftTol = field_or(para, 'DriftTol', 0.2);    % 对数超参数变化超过该值时完整重建
+opts.GradTol = field_or(para, 'GradTol', 1e-3);     % 似然梯度（按点数归一）小于该值时不搜索超参数
+% 稀疏模式（同 Kernelfun 的四位编码，每位对应一个输出列）：1 精确，2 数据子集，3 FITC，4 VFE
+Sparse_fun = field_or(para, 'Sparsefun', 1111);
+opts.Sfun = [floor(Sparse_fun/1000);floor(mod(Sparse_fun,1000)/100);...
+    floor(mod(Sparse_fun,100)/10);mod(Sparse_fun,10)];
+opts.sparse = opts.Sfun(1);
+opts.Inducing = field_or(para, 'Inducing', 200);   % 活动集/诱导点数
+% 多输出：0 各列独立，1 核/基函数/稀疏编号相同的列共用超参数与一次分解，2 在 1 的基础上共区域化（ICM）
+opts.MultiOutput = field_or(para, 'MultiOutput', 0);
+opts.icm = opts.MultiOutput == 2;
+opts.CvFolds = field_or(para, 'CvFolds', 0);        % 模型选择：0/1 留一，k>1 为 k 折交叉验证
+opts.StateDir = field_or(para, 'StateDir', '');     % 模型状态/缓存文件目录（工况表所在目录），为空不写文件
+end
+
+function v = field_or(s, name, default)
+if isfield(s, name)
+    v = s.(name);
+else
+    v = default;
+end
+end
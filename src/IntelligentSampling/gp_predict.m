@@ -0,0 +1,26 @@
+function [mu, sd, sd_f] = gp_predict(model, Xq)
+% 批量预测：Xq 每行一个点（原始尺度）
+% sd 含观测噪声（与 fitrgp 的 predict 一致），sd_f 为潜函数标准差；多输出模型每列一个输出
+Xs = (Xq - model.xlo)./model.xscale;
+kp = model.hyp(1:end-1);
+Ks = gp_kernel(model.kcode, kp, model.X, Xs);
+mu = Ks'*model.alpha;
+if ~isempty(model.beta)
+    mu = mu + gp_basis(model.bcode, Xs)*model.beta;
+end
+mu = mu.*model.ysd + model.ymu;
+if nargout > 1
+    if isfield(model,'icm') && ~isempty(model.icm) % 共区域化
+        var_f = exp(2*kp(2))*model.icm.Bd - ((model.icm.Q'*Ks).^2)'*model.icm.Gm;
+    else
+        V = model.L \ Ks;
+        var_f = exp(2*kp(2)) - sum(V.^2,1)'; % 平稳核 k(x,x) = sf^2
+        if isfield(model,'Lb') && ~isempty(model.Lb) % FITC/VFE
+            var_f = var_f + sum((model.Lb \ Ks).^2,1)';
+        end
+    end
+    var_f = max(var_f, 0);
+    sd_f = sqrt(var_f).*model.ysd;
+    sd = sqrt(var_f + exp(2*model.hyp(end))).*model.ysd;
+end
+end
@@ -0,0 +1,39 @@
+function [mu, sd, dmu, dsd] = gp_predict_grad(model, x)
+% 单个点 x（1×D，原始尺度）的预测均值、标准差及其对 x 的解析梯度（1×D）
+% sd 含观测噪声，与 gp_predict 一致；多输出模型先取单列视图（gp_column）
+xs = (x - model.xlo)./model.xscale;
+kp = model.hyp(1:end-1);
+k = gp_kernel(model.kcode, kp, model.X, xs);
+dk = (2/exp(2*kp(1))) * gp_kernel_du(model.kcode, kp, model.X, xs) .* (xs - model.X); % n×D
+mu = k'*model.alpha;
+dmu = model.alpha'*dk;
+if ~isempty(model.beta)
+    mu = mu + gp_basis(model.bcode, xs)*model.beta;
+    dmu = dmu + model.beta'*gp_basis_grad(model.bcode, xs);
+end
+if isfield(model,'icm') && ~isempty(model.icm) % 共区域化
+    t = model.icm.Q'*k;
+    var_f = exp(2*kp(2))*model.icm.Bd - (t.^2)'*model.icm.Gm;
+    dvar = -2*(t.*model.icm.Gm)'*(model.icm.Q'*dk);
+else
+    v = model.L \ k;
+    w = model.L' \ v;
+    var_f = exp(2*kp(2)) - v'*v;
+    dvar = -2*(w'*dk);
+end
+if isfield(model,'Lb') && ~isempty(model.Lb) % FITC/VFE 方差修正项
+    vb = model.Lb \ k;
+    var_f = var_f + vb'*vb;
+    dvar = dvar + 2*((model.Lb' \ vb)'*dk);
+end
+if var_f <= 0
+    var_f = 0;
+    dvar = zeros(size(xs));
+end
+sd = sqrt(var_f + exp(2*model.hyp(end)));
+dsd = dvar/(2*sd);
+mu = mu*model.ysd + model.ymu; % 标准化目标 -> 原始尺度
+sd = sd*model.ysd;
+dmu = dmu*model.ysd./model.xscale; % 缩放坐标 -> 原始坐标
+dsd = dsd*model.ysd./model.xscale;
+end
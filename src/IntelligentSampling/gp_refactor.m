@@ -0,0 +1,12 @@
+function model = gp_refactor(model)
+% 按当前超参数对全部训练点重新分解 O(n^3)
+fac = gp_factor(model.X, gp_targets(model), model.kcode, model.bcode, model.hyp);
+model.L = fac.L;
+model.jitter = fac.jitter;
+model.Hh = fac.Hh;
+model.yh = fac.yh;
+model.beta = fac.beta;
+model.alpha = fac.alpha;
+model.nlml = fac.nlml;
+model.W = []; % gp_update 用的 Ky^-1，需要时由 L 重新求出
+end
@@ -0,0 +1,80 @@
+function [Kfun, Bfun, scores] = gp_select_model(x_train, y_train, kcodes, bcodes, opts)
+% 核函数×基函数的交叉验证选择：每个输出列、每个组合拟合一次，闭式交叉验证（gp_cv_score）
+% 候选在并行池（若已启动）上计算；得分按训练数据（输入+该列输出）的 MD5 与编号缓存
+% （persistent + opts.StateDir 下的 gp_cv_cache.mat，StateDir 为空时不写文件），训练集不变时不重算
+% 返回每列得分（负对数预测密度）最小的核函数/基函数编号及全部得分 scores.nlpd/scores.rmse（候选×列）
+persistent cache
+cache_file = '';
+if ~isempty(opts.StateDir)
+    cache_file = fullfile(opts.StateDir, 'gp_cv_cache.mat');
+end
+if isempty(cache)
+    if ~isempty(cache_file) && exist(cache_file, 'file')
+        s = load(cache_file, 'cache');
+        cache = s.cache;
+    else
+        cache = containers.Map('KeyType', 'char', 'ValueType', 'any');
+    end
+end
+[kk, bb] = ndgrid(kcodes, bcodes);
+cand = [kk(:), bb(:)];
+nc = size(cand,1);
+ny = size(y_train,2);
+nlpd = zeros(nc, ny);
+rmse = zeros(nc, ny);
+keys = cell(nc, ny);
+todo = zeros(0,2);
+for j = 1:ny
+    h = array_md5([x_train, y_train(:,j)]);
+    for c = 1:nc
+        keys{c,j} = sprintf('%s_%d_%d_%d', h, cand(c,1), cand(c,2), opts.CvFolds);
+        if isKey(cache, keys{c,j})
+            v = cache(keys{c,j});
+            nlpd(c,j) = v(1);
+            rmse(c,j) = v(2);
+        else
+            todo(end+1,:) = [c, j]; %#ok<AGROW>
+        end
+    end
+end
+
+pool = gcp('nocreate');
+nworkers = 0;
+if ~isempty(pool)
+    nworkers = pool.NumWorkers;
+end
+res = zeros(size(todo,1), 2);
+t0 = tic;
+parfor (t = 1:size(todo,1), nworkers)
+    res(t,:) = gp_cv_score(x_train, y_train(:,todo(t,2)), cand(todo(t,1),1), cand(todo(t,1),2), opts);
+end
+for t = 1:size(todo,1)
+    c = todo(t,1);
+    j = todo(t,2);
+    nlpd(c,j) = res(t,1);
+    rmse(c,j) = res(t,2);
+    cache(keys{c,j}) = res(t,:);
+end
+if ~isempty(todo) && ~isempty(cache_file)
+    save(cache_file, 'cache');
+end
+
+[~, best] = min(nlpd, [], 1);
+Kfun = cand(best,1);
+Bfun = cand(best,2);
+scores.cand = cand;
+scores.nlpd = nlpd;
+scores.rmse = rmse;
+for j = 1:ny
+    fprintf('[GP] 第%d列交叉验证：核函数%d，基函数%d，NLPD %.4g，RMSE %.4g\n', ...
+        j, Kfun(j), Bfun(j), nlpd(best(j),j), rmse(best(j),j));
+end
+fprintf('[GP] 交叉验证：%d个组合，新计算%d个，%.3f s\n', nc*ny, size(todo,1), toc(t0));
+end
+
+function h = array_md5(A)
+% 数组内容（含尺寸）的 MD5（十六进制字符串）
+md = java.security.MessageDigest.getInstance('MD5');
+md.update(typecast([typecast(double(size(A)), 'uint8'), typecast(double(A(:))', 'uint8')], 'int8'));
+h = sprintf('%02x', typecast(md.digest(), 'uint8'));
+end
@@ -0,0 +1,13 @@
+function fac = gp_solve(fac)
+% 由分解（L, Hh, yh）求 beta、alpha 及负对数边缘似然，O(n^2)；yh 多列时各列共用分解，似然为各列之和
+[n, p] = size(fac.yh);
+if isempty(fac.Hh)
+    fac.beta = zeros(0,p);
+    r = fac.yh;
+else
+    fac.beta = pinv(fac.Hh)*fac.yh; % 基函数列线性相关时取最小范数解
+    r = fac.yh - fac.Hh*fac.beta;
+end
+fac.alpha = fac.L' \ r;
+fac.nlml = 0.5*sum(r(:).^2) + p*sum(log(diag(fac.L))) + n*p/2*log(2*pi);
+end
@@ -0,0 +1,61 @@
+function model = gp_sparse_fit(model, hyp0, opts)
+% 稀疏 GP：opts.sparse 2 数据子集（SoD），3 FITC，4 VFE（预测形式同 DTC）；opts.Inducing 为活动集/诱导点数 m
+% 超参数在活动子集上按精确似然估计（O(m^3)），再按新超参数重选活动集；FITC/VFE 的构建为 O(n m^2)
+% 结果沿用精确模型的字段：X 为活动集（缩放后），L、alpha、beta 用于预测，
+% Lb 为 FITC/VFE 的方差修正因子（潜函数方差 = sf^2 - |L\k|^2 + |Lb\k|^2）
+kcode = model.kcode;
+bcode = model.bcode;
+Xs = (model.Xraw - model.xlo)./model.xscale;
+y = gp_targets(model);
+idx = gp_active_set(kcode, hyp0(1:end-1), Xs, opts.Inducing);
+hyp = gp_optimize(Xs(idx,:), y(idx), kcode, bcode, hyp0, opts.FullIters, model.fixed);
+idx = gp_active_set(kcode, hyp(1:end-1), Xs, opts.Inducing);
+model.hyp = hyp;
+model.sparse = opts.sparse;
+model.active = idx;
+model.X = Xs(idx,:);
+if opts.sparse == 2 % 数据子集：活动集上的精确 GP
+    fac = gp_factor(model.X, y(idx), kcode, bcode, hyp);
+    model.L = fac.L;
+    model.jitter = fac.jitter;
+    model.beta = fac.beta;
+    model.alpha = fac.alpha;
+    model.nlml = fac.nlml;
+    model.Lb = [];
+    return
+end
+
+kp = hyp(1:end-1);
+sf2 = exp(2*kp(2));
+sn2 = exp(2*hyp(end));
+m = numel(idx);
+Kmm = gp_kernel(kcode, kp, model.X, model.X);
+jitter = 1e-8*sf2;
+[Lm, p] = chol(Kmm + jitter*eye(m), 'lower');
+while p > 0
+    jitter = 10*jitter;
+    [Lm, p] = chol(Kmm + jitter*eye(m), 'lower');
+end
+V = Lm \ gp_kernel(kcode, kp, model.X, Xs); % m×n，Qnn = V'*V
+if opts.sparse == 3 % FITC：对角修正
+    lam = max(sf2 - sum(V.^2,1)', 0) + sn2;
+else % VFE
+    lam = sn2*ones(size(y));
+end
+Vl = V./sqrt(lam)';
+LB = chol(eye(m) + Vl*Vl', 'lower');
+Cinv = @(Z) Z./lam - (V'*(LB'\(LB\(V*(Z./lam)))))./lam; % (Qnn + diag(lam))^-1 * Z（Woodbury）
+H = gp_basis(bcode, Xs);
+if isempty(H)
+    model.beta = zeros(0,1);
+    r = y;
+else
+    model.beta = pinv(H'*Cinv(H))*(H'*Cinv(y)); % 广义最小二乘
+    r = y - H*model.beta;
+end
+model.L = Lm;
+model.jitter = jitter;
+model.Lb = Lm*LB;
+model.alpha = Lm' \ (LB'\(LB\(V*(r./lam))));
+model.nlml = NaN;
+end
@@ -0,0 +1,26 @@
+function model = gp_sync(model, X, y, kcode, bcode, opts)
+% 使模型与当前训练集一致：
+% 只在末尾新增了点时增量更新；已有点被修改（如 Step4 重做）或核/基函数/稀疏模式变化时完整拟合（热启动）
+% 训练点数超过 opts.Inducing 时精确模型转为稀疏模型（opts.sparse>1）；y 可为多列（共用分解）
+scode = 1;
+if isfield(model,'scode')
+    scode = model.scode;
+end
+if isempty(model) || model.kcode ~= kcode || model.bcode ~= bcode || scode ~= opts.sparse
+    model = gp_fit(X, y, kcode, bcode, opts);
+    return
+end
+n0 = size(model.Xraw,1);
+if size(X,1) < n0 || any(any(abs(X(1:n0,:) - model.Xraw) > 1e-12)) || any(any(abs(y(1:n0,:) - model.Y) > 1e-12))
+    model = gp_fit(X, y, kcode, bcode, opts, model.hyp);
+    return
+end
+if opts.sparse > 1 && model.sparse == 1 && size(X,1) > opts.Inducing
+    counts = [model.nrefit, model.nupdate];
+    model = gp_fit(X, y, kcode, bcode, opts, model.hyp);
+    model.nrefit = counts(1) + 1;
+    model.nupdate = counts(2);
+    return
+end
+model = gp_update(model, X(n0+1:end,:), y(n0+1:end,:), opts);
+end
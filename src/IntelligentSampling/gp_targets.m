@@ -0,0 +1,7 @@
+function Yn = gp_targets(model, Y)
+% 模型内部使用的标准化目标值（多输出共用一个核时各列按拟合时的均值/标准差标准化，单输出不变）
+if nargin < 2
+    Y = model.Y;
+end
+Yn = (Y - model.ymu)./model.ysd;
+end
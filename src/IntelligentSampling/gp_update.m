@@ -0,0 +1,86 @@
+function model = gp_update(model, Xnew, ynew, opts)
+% 增量更新：新增 k 个点时对 Cholesky 因子做秩 k 扩展 O(n^2 k)，不重新分解
+% 超参数从上一轮热启动（少量迭代），变化超过 DriftTol 时才按新超参数完整重建
+% 是否搜索超参数由似然梯度决定，梯度用扩展后的分解计算：W = Ky^-1 按分块求逆随秩 k 扩展（model.W），
+% 不重建 K
+k = size(Xnew,1);
+if k == 0
+    return
+end
+if isfield(model,'sparse') && model.sparse > 1 % 稀疏模型：加入新点后重建（O(n m^2)），超参数热启动
+    model.Xraw = [model.Xraw; Xnew];
+    model.Y = [model.Y; ynew];
+    o = opts;
+    o.sparse = model.sparse;
+    o.FullIters = opts.HypIters;
+    counts = [model.nrefit, model.nupdate];
+    model = gp_sparse_fit(model, model.hyp, o);
+    model.nrefit = counts(1);
+    model.nupdate = counts(2) + 1;
+    return
+end
+Xs = (Xnew - model.xlo)./model.xscale;
+kp = model.hyp(1:end-1);
+sn2 = exp(2*model.hyp(end)) + model.jitter;
+K12 = gp_kernel(model.kcode, kp, model.X, Xs);
+K22 = gp_kernel(model.kcode, kp, Xs, Xs) + sn2*eye(k);
+S = model.L \ K12;
+[L22, p] = chol(K22 - S'*S, 'lower');
+
+model.Xraw = [model.Xraw; Xnew];
+model.X = [model.X; Xs];
+model.Y = [model.Y; ynew];
+if p > 0 % 扩展后数值不正定：完整重建
+    model = gp_refactor(model);
+else
+    n = size(model.L,1);
+    if opts.HypIters > 0 && isfield(model,'W') && size(model.W,1) == n
+        B = model.L' \ S; % W*K12
+        Ci = L22' \ (L22 \ eye(k)); % (K22 - K12'*W*K12)^-1
+        BC = B*Ci;
+        model.W = [model.W + BC*B', -BC; -BC', Ci];
+    end
+    model.L = [model.L, zeros(n,k); S', L22];
+    model.Hh = [model.Hh; L22 \ (gp_basis(model.bcode, Xs) - S'*model.Hh)];
+    model.yh = [model.yh; L22 \ (gp_targets(model, ynew) - S'*model.yh)];
+    fac = gp_solve(struct('L',model.L,'Hh',model.Hh,'yh',model.yh));
+    model.beta = fac.beta;
+    model.alpha = fac.alpha;
+    model.nlml = fac.nlml;
+end
+model.nupdate = model.nupdate + 1;
+
+% 超参数热启动：梯度已很小时跳过搜索
+if opts.HypIters > 0
+    Yn = gp_targets(model);
+    [grad, model] = nlml_grad(model, size(Yn,2));
+    if max(abs(grad)) > opts.GradTol*numel(Yn)
+        hyp = gp_optimize(model.X, Yn, model.kcode, model.bcode, model.hyp, opts.HypIters, model.fixed);
+        if max(abs(hyp - model.hyp)) > opts.DriftTol
+            model.hyp = hyp;
+            model = gp_refactor(model);
+            model.nrefit = model.nrefit + 1;
+        end
+    end
+end
+if isfield(model,'icm') && ~isempty(model.icm) % 共区域化：按更新后的分解重算 O(n^3)
+    model = gp_icm(model);
+end
+end
+
+function [grad, model] = nlml_grad(model, p)
+% 似然对超参数的梯度（同 gp_nlml），由当前分解（W = Ky^-1、alpha）计算 O(n^2)
+% W 在完整重建后首次需要时由 L 求出 O(n^3)，之后随秩扩展更新
+n = size(model.L,1);
+if ~isfield(model,'W') || size(model.W,1) ~= n
+    model.W = model.L' \ (model.L \ eye(n));
+end
+[~, dK] = gp_kernel(model.kcode, model.hyp(1:end-1), model.X, model.X);
+Q = p*model.W - model.alpha*model.alpha';
+grad = zeros(size(model.hyp));
+for k = 1:numel(dK)
+    grad(k) = 0.5*sum(sum(Q.*dK{k}));
+end
+grad(end) = exp(2*model.hyp(end))*trace(Q);
+grad(model.fixed) = 0;
+end
@@ -0,0 +1,18 @@
+function X = grid_rows(grid, idx)
+% 按线性下标取预测网格的行（不展开整个 ndgrid），顺序与 GPR_Pre_core 中 ndgrid(...)(:) 相同
+% grid.axes: {A1, f1, A2, theta, U} 各方向取值；grid.cols: 训练输入在 [A1, f1, A2, f2, theta, U] 中的列
+idx = idx(:);
+sz = cellfun(@numel, grid.axes);
+sub = cell(1,5);
+[sub{:}] = ind2sub(sz, idx);
+A1 = grid.axes{1}(sub{1});
+f1 = grid.axes{2}(sub{2});
+A2 = grid.axes{3}(sub{3});
+if sum(grid.axes{3})==0
+    f2 = A2;
+else
+    f2 = 2*f1;
+end
+X = [A1(:), f1(:), A2(:), f2(:), grid.axes{4}(sub{4}), grid.axes{5}(sub{5})];
+X = X(:, grid.cols);
+end
@@ -1,9 +1,13 @@
-function x_next = optimize_acquisition(acq_fun, lb, ub)
+function x_next = optimize_acquisition(acq_fun, lb, ub, vectorized)
     % 使用遗传算法进行全局优化
+    % vectorized 为真时 acq_fun 一次对整个种群（每行一个个体）求值，如 acquisition_batch 的 score
+    if nargin < 4
+        vectorized = false;
+    end
     obj_fun = @(x) -acq_fun(x);  % 转换为最小化问题
     % lb = x_range(:,1);
     % ub = x_range(:,2);
     options = optimoptions('ga','PopulationSize',30,'MaxGenerations',10,...
-                          'Display','off');
+                          'Display','off','UseVectorized',vectorized);
     x_next = ga(obj_fun, length(lb), [], [], [], [], lb, ub, [], options);
 end
\ No newline at end of file
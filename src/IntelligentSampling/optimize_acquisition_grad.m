@@ -0,0 +1,39 @@
+function [x_best, a_best, info] = optimize_acquisition_grad(model, x_pre, score, X_train, bounds, para, nstart)
+% 多起点梯度优化采集函数（fmincon 内点法 + L-BFGS 近似 Hessian，盒约束 bounds）
+% 起点取预测网格上得分（score，acquisition_batch 的结果）最高的 nstart 个点；
+% 梯度由 acquisition_grad 解析给出，只优化上下界不同的输入
+[~, order] = sort(score, 'descend');
+starts = x_pre(order(1:min(nstart,end)),:);
+free = bounds(:,2)' > bounds(:,1)';
+options = optimoptions('fmincon','Algorithm','interior-point','HessianApproximation','lbfgs',...
+    'SpecifyObjectiveGradient',para.nextpoint_method ~= 7,'MaxIterations',100,'Display','off');
+x_best = starts(1,:);
+a_best = score(order(1));
+info.nstart = size(starts,1);
+info.improved = 0;
+for s = 1:size(starts,1)
+    x0 = starts(s,:);
+    obj = @(z) neg_acquisition(z, x0, free, model, X_train, bounds, para);
+    try
+        [z, fval] = fmincon(obj, x0(free)', [], [], [], [], bounds(free,1), bounds(free,2), [], options);
+    catch
+        continue % 单个起点失败不影响其他起点
+    end
+    if -fval > a_best
+        x_best = x0;
+        x_best(free) = z';
+        a_best = -fval;
+        info.improved = info.improved + 1;
+    end
+end
+end
+
+function [f, g] = neg_acquisition(z, x0, free, model, X_train, bounds, para)
+x = x0;
+x(free) = z';
+[a, ga] = acquisition_grad(model, x, X_train, bounds, para);
+f = -a;
+if nargout > 1
+    g = -ga(free)';
+end
+end
@@ -0,0 +1,20 @@
+function p = param_struct(src)
+% 读取参数：src 为参数 txt 文件名（每行“名称 数值”，由 Python write_txt_kv 写出）
+% 或已构造好的结构体（Python 端直接传入 dict，不经过文件）
+% 按名称访问参数（如 p.YtrainDirection），避免 importdata(...).data(k) 的位置索引
+if isstruct(src)
+    % Python 传入的整数为 int64，统一转为 double，避免整数除法取整
+    p = structfun(@double, src, 'UniformOutput', false);
+    return
+end
+fid = fopen(src, 'r');
+if fid < 0
+    error('param_struct:open', '无法打开参数文件 %s', src);
+end
+c = textscan(fid, '%s %f');
+fclose(fid);
+p = struct();
+for k = 1:length(c{1})
+    p.(c{1}{k}) = c{2}(k);
+end
+end
@@ -0,0 +1,91 @@
+function R = predict_grid_tiled(models, grid, x_train, para, tile, out_dir, topk)
+% 分块预测整个网格（内存有界）：网格按线性下标分块，一批块由并行池（若已启动）同时计算
+% 每批算完后把结果追加写入 out_dir 下的 y_pre_data/y_pre_err/y_pre_sco/x_pre_data.mat（v7.3，matfile），
+% out_dir 为空时不写文件；同时在线归约采集与停止判断所需的统计量：
+% R.top_x{j}/R.top_score(:,j): 第 j 列得分最高的 topk 个点（多起点、批量采样的候选），
+% R.sd_max/R.sd_mean/R.mu_min/R.mu_max: 各列预测标准差、均值的统计，R.n: 网格点数，R.bounds: 输入上下界
+sz = cellfun(@numel, grid.axes);
+n = prod(sz);
+ny = numel(models);
+C = grid_rows(grid, corner_index(sz)); % 各方向取值单调，上下界在网格角点上
+bounds = [min(C,[],1); max(C,[],1)]';
+pool = gcp('nocreate');
+nworkers = 0;
+if ~isempty(pool)
+    nworkers = pool.NumWorkers;
+end
+ntile = ceil(n/tile);
+wave = max(nworkers, 1); % 同时在内存中的块数
+
+names = {'y_pre_data','y_pre_err','y_pre_sco','x_pre_data'};
+files = {};
+if ~isempty(out_dir)
+    files = cell(1,4);
+    for k = 1:4
+        files{k} = fullfile(out_dir, [names{k} '.mat']);
+        if exist(files{k}, 'file')
+            delete(files{k}); % matfile 只能分块写 v7.3 文件
+        end
+        files{k} = matfile(files{k}, 'Writable', true);
+    end
+end
+
+R.n = n;
+R.bounds = bounds;
+R.top_score = -inf(0, ny);
+R.top_idx = zeros(0, ny);
+R.sd_max = -inf(1, ny);
+R.sd_mean = zeros(1, ny);
+R.mu_min = inf(1, ny);
+R.mu_max = -inf(1, ny);
+for w0 = 1:wave:ntile
+    ts = w0:min(w0+wave-1, ntile);
+    out = cell(numel(ts),1);
+    parfor (t = 1:numel(ts), nworkers)
+        idx = ((ts(t)-1)*tile+1):min(ts(t)*tile, n);
+        X = grid_rows(grid, idx);
+        mu = zeros(numel(idx), ny);
+        sd = mu;
+        sco = mu;
+        for j = 1:ny
+            A = acquisition_batch(models{j}, X, x_train, bounds, para);
+            mu(:,j) = A.mu;
+            sd(:,j) = A.sd;
+            sco(:,j) = A.score;
+        end
+        out{t} = struct('idx', idx, 'X', X, 'mu', mu, 'sd', sd, 'sco', sco);
+    end
+    for t = 1:numel(out) % 按顺序写入、归约
+        o = out{t};
+        i0 = o.idx(1);
+        i1 = o.idx(end);
+        vals = {o.mu, o.sd, o.sco, o.X};
+        for k = 1:numel(files)
+            mf = files{k};
+            mf.(names{k})(i0:i1, 1:size(vals{k},2)) = vals{k};
+        end
+        R.sd_max = max(R.sd_max, max(o.sd,[],1));
+        R.sd_mean = R.sd_mean + sum(o.sd,1)/n;
+        R.mu_min = min(R.mu_min, min(o.mu,[],1));
+        R.mu_max = max(R.mu_max, max(o.mu,[],1));
+        [s, i] = maxk([R.top_score; o.sco], topk, 1);
+        cand = [R.top_idx; repmat(o.idx(:), 1, ny)];
+        R.top_score = s;
+        R.top_idx = cand(sub2ind(size(cand), i, repmat(1:ny, size(i,1), 1)));
+    end
+end
+R.top_x = cell(1, ny);
+for j = 1:ny
+    R.top_x{j} = grid_rows(grid, R.top_idx(:,j));
+end
+end
+
+function idx = corner_index(sz)
+% 网格各方向首末取值组合的线性下标（用于求输入上下界）
+c = cell(1,5);
+for k = 1:5
+    c{k} = unique([1, sz(k)]);
+end
+[c{:}] = ndgrid(c{:});
+idx = sub2ind(sz, c{1}(:), c{2}(:), c{3}(:), c{4}(:), c{5}(:));
+end
@@ -0,0 +1,7 @@
+function folder = step_folder(filenamecsv)
+% 步骤中间文件（.mat）所在目录：工况表所在目录（Python 端传入绝对路径），无目录时为当前目录
+% 多台架同时运行时各用各的目录，不依赖 cd（进程当前目录由各台架线程共享）
+folder = fileparts(char(filenamecsv));
+if isempty(folder)
+    folder = '.';
+end
@@ -0,0 +1,311 @@
+"""
+End-to-end throughput benchmark of the control loop against the simulated device fleet.
+
+Modules integrated:
+- make_conditions: synthetic condition table of N cases in the campaign CSV layout
+- run_benchmark: FeedbackService + SimFleet on local ports, device links registered in the
+  shared pool, then run_experiments_from_csv (serial) or run_experiments_pipelined
+- Per-case phases from the protocol log: reset / servo / settle / static / start / run
+- Cases per hour, dead time per case and protocol round trips (link counters + device frames)
+- One JSON line per benchmark run (with the git commit) to follow the loop from commit to commit
+
+Notes:
+- Optimizer steps are not run. Without the MATLAB Runtime the compiled package is replaced
+  by optimizer_session.StubPackage so that main_command1V2 can be imported.
+- The loop's own waits (pre_enable_wait_s, static interval, readiness poll period) are
+  scaled by the same time_scale as the simulated devices; cases_per_hour is converted back
+  to physical time, so fixed protocol latencies weigh 1/time_scale times more than on the tank.
+- Readiness waits are on by default; --fixed-waits restores the fixed sleeps and
+  --no-status simulates device programs without STATUS replies / READY events.
+- Dropped finish messages need --mode pipelined with --feedback-timeout (the serial loop
+  waits without a timeout).
+- Usage: python bench_control_loop.py --cases 20 --mode pipelined --time-scale 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from device_sim import DeviceFaults, DeviceTiming, ProtocolEvent, SimFleet
+from optimizer_session import StubPackage
+from readiness import ReadinessConfig
+
+
+PHASES = ("reset", "servo", "settle", "static", "start", "run")
+CONDITION_COLUMNS = ("Name", "A1", "f1", "A2", "f2", "Theta", "Count", "Speed", "Direction", "Finished")
+
+
+def make_conditions(filename: str, cases: int, *, speed: float = 0.2) -> None:
+    """
+    Condition CSV with `cases` pending cases (amplitudes / frequencies cycled over a small grid).
+    """
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CONDITION_COLUMNS)
+        for k in range(cases):
+            writer.writerow([f"bench{k:04d}", 0.1 + 0.1 * (k % 5), 0.1 + 0.05 * (k % 3), 0.1, 0, 30 * (k % 12), 10,
+                             speed + 0.01 * (k % 4), k % 2, 0])
+
+
+def import_control():
+    """
+    main_command1V2, with the stand-in optimizer package when the compiled one is missing.
+    """
+    try:
+        import AnalysisOptimize  # noqa: F401
+    except ImportError:
+        sys.modules["AnalysisOptimize"] = StubPackage()  # type: ignore[assignment]
+    import main_command1V2
+
+    return main_command1V2
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ----------------------------- Protocol log analysis -----------------------------
+
+
+def _marker(ev: ProtocolEvent) -> Optional[str]:
+    if ev.kind != "recv":
+        return None
+    msg = ev.message
+    if ev.device == "carriage":
+        if msg == "INIT":
+            return "INIT"
+        if msg == "ENABLE_SERVO":
+            return "ENABLE_SERVO"
+        if "MOVE_POS" in msg or "MOVE_NEG" in msg:
+            return "MOVE"
+    if ev.device == "oscillator" and "ENABLE_CONTROL" in msg:
+        return "ENABLE_CONTROL"
+    if ev.device == "camera" and msg.startswith("AUTOPHOTO"):
+        return "AUTOPHOTO"
+    return None
+
+
+def case_phases(log: List[ProtocolEvent], t_start: float) -> List[Dict[str, float]]:
+    """
+    Per-case phase durations (s) between the protocol markers of each case.
+
+    The dead time between the end of case k-1 (its last finish message) and the carriage
+    MOVE of case k is split at INIT, ENABLE_SERVO, ENABLE_CONTROL and AUTOPHOTO. Markers
+    that are missing or fell before the previous end (overlapped by the pipelined loop)
+    give a zero phase, so the phases of a case always add up to its wall time.
+    """
+    events = sorted(log, key=lambda e: e.t)
+    moves = [i for i, e in enumerate(events) if _marker(e) == "MOVE"]
+    order = ("INIT", "ENABLE_SERVO", "ENABLE_CONTROL", "AUTOPHOTO")
+    cases: List[Dict[str, float]] = []
+    prev_end, prev_move = t_start, -1
+    for k, mi in enumerate(moves):
+        next_move = moves[k + 1] if k + 1 < len(moves) else len(events)
+        finishes = [e.t for e in events[mi:next_move] if e.kind == "finish"]
+        end = max(finishes) if finishes else events[mi].t
+        # Commands sent together with the move may reach their device just after it
+        first_finish = next((j for j in range(mi, next_move) if events[j].kind == "finish"), next_move)
+        seen: Dict[str, float] = {}
+        for e in events[prev_move + 1 : first_finish]:
+            m = _marker(e)
+            if m in order and m not in seen:
+                seen[m] = min(e.t, events[mi].t)
+        bounds = [seen.get(m, prev_end) for m in order] + [events[mi].t]
+        phases: Dict[str, float] = {}
+        reached = prev_end
+        for name, b in zip(PHASES[:-1], bounds):
+            phases[name] = max(b - reached, 0.0)
+            reached = max(reached, b)
+        phases["run"] = end - events[mi].t
+        cases.append(phases)
+        prev_end, prev_move = end, mi
+    return cases
+
+
+# ----------------------------- Benchmark -----------------------------
+
+
+def run_benchmark(
+    cases: int = 10,
+    *,
+    mode: str = "serial",
+    time_scale: float = 0.01,
+    persistent: bool = True,
+    supports_config: bool = True,
+    supports_status: bool = True,
+    readiness: Optional[ReadinessConfig] = None,
+    distance: float = 12.0,
+    pre_enable_wait_s: float = 10.0,
+    static_interval_s: float = 10.0,
+    feedback_timeout_s: Optional[float] = None,
+    timing: Optional[DeviceTiming] = None,
+    faults: Optional[DeviceFaults] = None,
+    workdir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Drive `cases` cases through the simulated fleet; returns the result record.
+    """
+    mc = import_control()
+    timing = timing or DeviceTiming(time_scale=time_scale)
+    timing.time_scale = time_scale
+    readiness = readiness or ReadinessConfig()
+    scaled = ReadinessConfig(
+        enabled=readiness.enabled,
+        poll_s=readiness.poll_s * time_scale,
+        status_timeout_s=readiness.status_timeout_s * time_scale,
+        water_std_n=readiness.water_std_n,
+        arm_wait_s=readiness.arm_wait_s * time_scale,
+        camera_wait_s=readiness.camera_wait_s * time_scale,
+    )
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_control_")
+    filename = os.path.join(workdir, "bench_conditions.csv")
+    make_conditions(filename, cases)
+
+    tow = mc.TowingCarriage(ip="127.0.0.1", port=0)
+    cam = mc.CameraController(ip="127.0.0.1", port=0)
+    osc = mc.ForcedOscillationController(ip="127.0.0.1", port=0)
+    feedback = mc.make_feedback_service(tow, cam, osc, host="127.0.0.1", port=0).start()
+    fleet = SimFleet(("127.0.0.1", feedback.port), timing=timing, faults=faults or DeviceFaults(),
+                     supports_config=supports_config, supports_status=supports_status).start()
+    tow.port, cam.port, osc.port = fleet.carriage.port, fleet.camera.port, fleet.oscillator.port
+    links = {d.kind: mc.device_pool.register(d.host, d.port, persistent=persistent) for d in fleet.devices}
+
+    error = None
+    completed: List[str] = []
+    t_start = time.perf_counter()
+    try:
+        tow.changedistance(distance)
+        if mode == "pipelined":
+            completed = mc.run_experiments_pipelined(
+                filename, tow, cam, osc, 0, static_interval_s * time_scale,
+                pre_enable_wait_s=pre_enable_wait_s * time_scale, feedback=feedback,
+                feedback_timeout_s=feedback_timeout_s, readiness=scaled,
+            )
+        else:
+            completed = mc.run_experiments_from_csv(
+                filename, tow, cam, osc, 0, static_interval_s * time_scale,
+                pre_enable_wait_s=pre_enable_wait_s * time_scale, feedback=feedback, readiness=scaled,
+            )
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        print(f"[ERROR] Benchmark run failed: {error}")
+    wall_s = time.perf_counter() - t_start
+    feedback.stop()
+    fleet.stop()
+    mc.device_pool.close_all()
+
+    phases = case_phases(fleet.log, t_start)
+    n = max(len(completed), 1)
+    mean = {p: sum(c[p] for c in phases) / len(phases) if phases else 0.0 for p in PHASES}
+    dead_s = sum(mean[p] for p in PHASES if p != "run")
+    link_counts = {
+        kind: {"sends": l.sends, "round_trips": l.round_trips, "connects": l.connects, "reconnects": l.reconnects}
+        for kind, l in links.items()
+    }
+    device_counts = fleet.counters()
+    return {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "mode": mode,
+        "persistent": persistent,
+        "config": supports_config,
+        "status": supports_status,
+        "readiness": readiness.enabled,
+        "time_scale": time_scale,
+        "cases": cases,
+        "completed": len(completed),
+        "error": error,
+        "wall_s": wall_s,
+        "cases_per_hour": 3600.0 * len(completed) / (wall_s / time_scale) if wall_s > 0 else 0.0,
+        "phase_mean_s": {p: v / time_scale for p, v in mean.items()},  # physical-time equivalent
+        "dead_time_s": dead_s / time_scale,
+        "round_trips_per_case": sum(c["round_trips"] for c in link_counts.values()) / n,
+        "sends_per_case": sum(c["sends"] for c in link_counts.values()) / n,
+        "connects_per_case": sum(c["connects"] for c in link_counts.values()) / n,
+        "frames_per_case": sum(c["frames"] for c in device_counts.values()) / n,
+        "links": link_counts,
+        "devices": device_counts,
+    }
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    lines = [
+        f"commit {result['commit']}  mode {result['mode']}  persistent {result['persistent']}  "
+        f"config {result['config']}  status {result.get('status')}  readiness {result.get('readiness')}  "
+        f"time_scale {result['time_scale']}",
+        f"cases {result['completed']}/{result['cases']}  wall {result['wall_s']:.2f} s  "
+        f"cases/hour {result['cases_per_hour']:.1f}  dead time/case {result['dead_time_s']:.2f} s",
+        f"{'phase':<10}{'mean_s':>10}",
+    ]
+    for p, v in result["phase_mean_s"].items():
+        lines.append(f"{p:<10}{v:>10.3f}")
+    lines.append(
+        f"per case: {result['sends_per_case']:.1f} sends, {result['round_trips_per_case']:.1f} round trips, "
+        f"{result['connects_per_case']:.1f} connects, {result['frames_per_case']:.1f} device frames"
+    )
+    if result["error"]:
+        lines.append(f"error: {result['error']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Control-loop benchmark against simulated devices")
+    parser.add_argument("--cases", type=int, default=10)
+    parser.add_argument("--mode", choices=("serial", "pipelined"), default="serial")
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--one-shot", action="store_true", help="one connection per command (persistent=False)")
+    parser.add_argument("--legacy", action="store_true", help="devices without CONFIG support")
+    parser.add_argument("--no-status", action="store_true", help="devices without STATUS replies / READY events")
+    parser.add_argument("--fixed-waits", action="store_true", help="fixed pre-enable sleep instead of readiness waits")
+    parser.add_argument("--water-tol", type=float, default=0.02, help="water settled at this force std (N)")
+    parser.add_argument("--pre-enable-wait", type=float, default=10.0, help="upper bound of the settle wait (s)")
+    parser.add_argument("--delay", type=float, default=0.0, help="extra finish delay (simulated s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="finish time jitter (simulated s)")
+    parser.add_argument("--drop", type=float, default=0.0, help="probability of a dropped finish message")
+    parser.add_argument("--nak", type=float, default=0.0, help="probability of a NAKed CONFIG frame")
+    parser.add_argument("--disconnect", type=float, default=0.0, help="probability of a dropped connection")
+    parser.add_argument("--ack-delay", type=float, default=0.0, help="CONFIG ack delay (wall s)")
+    parser.add_argument("--feedback-timeout", type=float, default=None, help="pipelined: finish flag timeout (wall s)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default="bench_control_loop.jsonl", help="results file (one JSON line per run)")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(
+        args.cases,
+        mode=args.mode,
+        time_scale=args.time_scale,
+        persistent=not args.one_shot,
+        supports_config=not args.legacy,
+        supports_status=not args.no_status,
+        readiness=ReadinessConfig(enabled=not args.fixed_waits, water_std_n=args.water_tol),
+        pre_enable_wait_s=args.pre_enable_wait,
+        feedback_timeout_s=args.feedback_timeout,
+        timing=DeviceTiming(delay_s=args.delay, jitter_s=args.jitter),
+        faults=DeviceFaults(
+            drop_finish=args.drop, nak_config=args.nak, ack_delay_s=args.ack_delay, disconnect=args.disconnect,
+            seed=args.seed,
+        ),
+    )
+    print(format_report(result))
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
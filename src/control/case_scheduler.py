@@ -0,0 +1,214 @@
+"""
+Dependency-aware step scheduler for pipelining experiment cases.
+
+Modules integrated:
+- StepScheduler: runs named steps on a thread pool as soon as their dependencies finished
+- Per-step timing and per-case dead-time report (serial time vs. wall time actually added)
+- Every step is traced as a span (tracing.tracer) tagged with its case and the step's tags
+
+Notes:
+- Steps that must stay serial (physical waits, device ordering) are expressed as
+  dependencies; everything else is free to overlap, also across cases.
+- Steps of one case sharing a `group` were already concurrent in the serial loop
+  (e.g. the three finish-flag waits), so they count once (the longest) in the serial time.
+- An interrupted run() (Ctrl-C) returns without waiting for steps still blocked (e.g. on
+  feedback); a failed step lets the running ones finish, so blocking steps need timeouts.
+- cancel(cases) skips the not yet started steps of those cases (e.g. once the campaign has
+  converged); their dependents proceed as if they had finished.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from tracing import tracer
+
+
+@dataclass
+class Step:
+    name: str
+    fn: Callable[[], Any]
+    deps: Tuple[str, ...] = ()
+    case: Optional[str] = None
+    group: Optional[str] = None
+    tags: Dict[str, Any] = field(default_factory=dict)  # extra trace tags (direction, iteration)
+
+    start_s: float = float("nan")
+    end_s: float = float("nan")
+    error: Optional[BaseException] = None
+    skipped: bool = False
+
+    @property
+    def duration_s(self) -> float:
+        return self.end_s - self.start_s
+
+
+@dataclass
+class CaseTiming:
+    case: str
+    serial_s: float  # time the strictly serial loop spends on this case
+    added_wall_s: float  # how much this case extended the pipelined makespan
+
+    @property
+    def dead_time_saved_s(self) -> float:
+        return self.serial_s - self.added_wall_s
+
+
+class StepScheduler:
+    """
+    Run a DAG of steps; a failing step stops new submissions and is re-raised by run().
+    """
+
+    def __init__(self, max_workers: int = 8) -> None:
+        self.max_workers = max_workers
+        self.steps: Dict[str, Step] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._cancelled: Set[str] = set()
+        self._tags: Dict[str, Any] = {}  # tracer tags of the thread calling run() (e.g. rig)
+        self._t0 = 0.0
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        deps: Sequence[Optional[str]] = (),
+        *,
+        case: Optional[str] = None,
+        group: Optional[str] = None,
+        tags: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Add a step; deps must already be added (None entries are ignored). Returns name.
+        """
+        if name in self.steps:
+            raise ValueError(f"Duplicate step: {name}")
+        clean = tuple(d for d in deps if d is not None)
+        for d in clean:
+            if d not in self.steps:
+                raise ValueError(f"Step {name} depends on unknown step {d}")
+        self.steps[name] = Step(name=name, fn=fn, deps=clean, case=case, group=group, tags=dict(tags or {}))
+        self._children[name] = []
+        for d in clean:
+            self._children[d].append(name)
+        return name
+
+    def cancel(self, cases: Iterable[str]) -> None:
+        """
+        Skip the steps of these cases that have not started yet (callable from a running step).
+        """
+        self._cancelled.update(cases)
+
+    @property
+    def cancelled(self) -> Set[str]:
+        return set(self._cancelled)
+
+    def _execute(self, step: Step) -> None:
+        step.start_s = time.monotonic() - self._t0
+        try:
+            tags = {**self._tags, "case": step.case, **step.tags}
+            with tracer.tags(**tags), tracer.span("step", step.name.split("/")[-1]):
+                step.fn()
+        except BaseException as e:
+            step.error = e
+            raise
+        finally:
+            step.end_s = time.monotonic() - self._t0
+
+    def run(self) -> None:
+        self._t0 = time.monotonic()
+        self._tags = tracer.current_tags()
+        remaining = {name: len(step.deps) for name, step in self.steps.items()}
+        ready = [name for name, n in remaining.items() if n == 0]
+        running: Dict[Future, str] = {}
+        failed: Optional[BaseException] = None
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="step")
+        clean = False
+        try:
+            while ready or running:
+                while failed is None and ready:
+                    name = ready.pop(0)
+                    step = self.steps[name]
+                    if step.case in self._cancelled:
+                        step.skipped = True
+                        ready.extend(self._release(name, remaining))
+                    else:
+                        running[pool.submit(self._execute, step)] = name
+                ready = []
+                if not running:
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    if fut.exception() is not None:
+                        if failed is None:
+                            failed = fut.exception()
+                            print(f"[ERROR] Step {name} failed: {failed}")
+                        continue
+                    ready.extend(self._release(name, remaining))
+            clean = True
+        finally:
+            # interrupted (Ctrl-C): do not block on steps still waiting, e.g. for feedback;
+            # the caller cancels what they wait on
+            pool.shutdown(wait=clean, cancel_futures=True)
+
+        if failed is not None:
+            raise failed
+
+    def _release(self, name: str, remaining: Dict[str, int]) -> List[str]:
+        """
+        Children of a finished (or skipped) step whose dependencies are now all done.
+        """
+        ready = []
+        for child in self._children[name]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready.append(child)
+        return ready
+
+    # ----------------------------- Report -----------------------------
+
+    def case_timings(self) -> List[CaseTiming]:
+        """
+        Serial time vs. makespan increment for every case (in insertion order).
+        """
+        order: List[str] = []
+        by_case: Dict[str, List[Step]] = {}
+        for step in self.steps.values():
+            if step.case is None:
+                continue
+            if step.case not in by_case:
+                order.append(step.case)
+                by_case[step.case] = []
+            by_case[step.case].append(step)
+
+        timings: List[CaseTiming] = []
+        prev_end = 0.0
+        for case in order:
+            steps = [s for s in by_case[case] if s.end_s == s.end_s]  # skip never-run steps
+            if not steps:
+                continue
+            groups: Dict[Optional[str], float] = {}
+            serial = 0.0
+            for s in steps:
+                if s.group is None:
+                    serial += s.duration_s
+                else:
+                    groups[s.group] = max(groups.get(s.group, 0.0), s.duration_s)
+            serial += sum(groups.values())
+            end = max(s.end_s for s in steps)
+            timings.append(CaseTiming(case=case, serial_s=serial, added_wall_s=end - prev_end))
+            prev_end = max(prev_end, end)
+        return timings
+
+
+def format_case_report(timings: Sequence[CaseTiming]) -> str:
+    lines = [f"{'case':<24}{'serial_s':>10}{'wall_s':>10}{'saved_s':>10}"]
+    for t in timings:
+        lines.append(f"{t.case:<24}{t.serial_s:>10.2f}{t.added_wall_s:>10.2f}{t.dead_time_saved_s:>10.2f}")
+    total = sum(t.dead_time_saved_s for t in timings)
+    lines.append(f"{'total dead time saved':<44}{total:>10.2f}")
+    return "\n".join(lines)
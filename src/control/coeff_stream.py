@@ -0,0 +1,331 @@
+"""
+Streaming hydrodynamic-coefficient extraction from the oscillator data file.
+
+Modules integrated:
+- data_deal: NumPy/SciPy port of DataDeal.m (filtering, stable segment, FFT, Hilbert phase)
+- CoefficientStream: tails 'yyyyMMddHHmmss<name>.txt' while the case runs and keeps the
+  parsed samples in memory
+- CoefficientStreams: per-campaign factory (output folder, riser constants, static interval),
+  optionally archiving every finished run into a RunStore (no second text parse)
+
+Notes:
+- Columns follow DataDeal.m (1-based): 4 dis CF, 5 dis IL, 6 vel CF, 7/8 F_x1/F_y1 upper end,
+  9/10 F_x2/F_y2 lower end; sampled at 1 kHz.
+- filtfilt / FFT band-pass / Hilbert phase are non-causal and the stable segment is only known
+  once the run is complete, so all coefficients are computed once on the buffered samples when
+  FINISHCONTROL arrived (no file re-read or text parsing left at that point).
+- bpass is an FFT band-pass (bins outside [flow, fhigh] zeroed), as bpass_CF / bpass_IL.
+- Step4_DealCreatCoe stays the reference for the forward/backward consistency check and redo.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import butter, filtfilt, hilbert
+
+from run_store import RunStore, parse_run_filename
+
+
+FS = 1000.0  # sampling frequency (Hz)
+RHO = 1000.0
+PULSE_TO_M = 0.125 / 50000  # displacement pulses -> m
+COE_NAMES = ("Cv1", "Ca1", "Cv2", "Ca2", "Cdm")
+
+# 0-based data columns
+DIS_CF, DIS_IL, FX1, FY1, FX2, FY2 = 3, 4, 6, 7, 8, 9
+
+
+# ----------------------------- DataDeal port -----------------------------
+
+
+def bpass(x: np.ndarray, dt: float, flow: float, fhigh: float) -> np.ndarray:
+    """
+    FFT band-pass: keep components with flow <= |f| <= fhigh.
+    """
+    spec = np.fft.fft(x)
+    freqs = np.abs(np.fft.fftfreq(len(x), dt))
+    spec[(freqs < flow) | (freqs > fhigh)] = 0.0
+    return np.real(np.fft.ifft(spec))
+
+
+def _dominant_frequency(x: np.ndarray, fs: float) -> float:
+    m = len(x)
+    ff = fs * np.arange(m // 2 + 1) / m
+    p1 = np.abs(np.fft.fft(x) / m)[: m // 2 + 1]
+    p1[1:-1] *= 2
+    return float(ff[int(np.argmax(p1))])
+
+
+def _acceleration(x: np.ndarray, h: float) -> np.ndarray:
+    """
+    Second-order central difference; end points copy their neighbours.
+    """
+    a = np.zeros_like(x)
+    a[1:-1] = (x[2:] - 2 * x[1:-1] + x[:-2]) / h**2
+    a[0], a[-1] = a[1], a[-2]
+    return a
+
+
+def _span(n: int, lo: float, hi: float) -> slice:
+    """
+    MATLAB lo:hi (1-based, inclusive) on a vector of length n.
+    """
+    return slice(max(int(round(lo)) - 1, 0), min(int(round(hi)), n))
+
+
+def static_windows(tinterval: float, fs: float = FS) -> Tuple[slice, slice]:
+    """
+    Static-segment windows of DataDeal.m (range0, range0il): the middle half of the
+    static interval, and 8x that range for the lower-end forces.
+    """
+    w0, w1 = fs / 4 * tinterval, fs * 3 / 4 * tinterval
+    return (
+        slice(int(round(w0)) - 1, int(round(w1))),
+        slice(int(round(8 * w0)) - 1, int(round(8 * w1))),
+    )
+
+
+def data_deal(
+    data: np.ndarray,
+    U: float,
+    L: float,
+    D: float,
+    M: float,
+    tinterval: float,
+    cf_cl: int = 1,
+    il_cl: int = 1,
+    fs: float = FS,
+) -> List[float]:
+    """
+    Coefficients [Cv1, Ca1, Cv2, Ca2, Cdm] of one run (same steps as DataDeal.m).
+    """
+    dt = 1.0 / fs
+    data = np.array(data[:-1], dtype=float)  # last line may be incomplete
+    b, a = butter(4, 1.0 / (fs / 2), "low")
+    for col in (FX1, FY1, FX2, FY2):
+        data[:, col] = filtfilt(b, a, data[:, col], padlen=3 * (max(len(a), len(b)) - 1))
+
+    a4, a5 = data[:, DIS_CF], data[:, DIS_IL]
+    a7, a8, a9, a10 = data[:, FX1], data[:, FY1], data[:, FX2], data[:, FY2]
+    N = len(data)
+
+    # Static (initial) segment means
+    r0, r0il = static_windows(tinterval, fs)
+    # range0il is 8x longer than range0, so the sums are taken as sums of means
+    fxm0 = np.mean(a7[r0]) + np.mean(a9[r0il])
+    fym0 = np.mean(-a8[r0]) + np.mean(a10[r0il])
+    dism0_cf = np.mean(a4[r0])
+    dism0_il = np.mean(a5[r0])
+
+    # Stable segment: 20%-80% of the run, then the span where F_x1 stays within 0.01 of its mean
+    n0 = fs * tinterval
+    n = round((N - n0) / 10)
+    r1 = np.arange(int(n0 + 2 * n), int(n0 + 9 * n) + 1) - 1
+    fx1mean = np.mean(a7[r1])
+    keep = r1[np.abs(a7[r1] - fx1mean) <= 0.01]
+    seg = slice(int(keep.min()), int(keep.max()) + 1)
+
+    fx = a7[seg] + a9[seg] - fxm0
+    fy = -a8[seg] + a10[seg] - fym0
+    dis_cf = a4[seg] - dism0_cf
+    dis_il = a5[seg] - dism0_il
+
+    q = 0.5 * U * U * L * D * RHO
+    cdm = float(np.mean(fy) / q)
+
+    disp_cf = bpass(dis_cf, dt, 0.001, 5)
+    disp_il = bpass(dis_il, dt, 0.001, 5)
+    f_sway_cf = _dominant_frequency(disp_cf, fs)
+    f_sway_il = _dominant_frequency(disp_il, fs)
+
+    f_uper_cf = f_sway_cf * 5
+    f_uper_il = f_sway_il * 5
+    x_cf = bpass(disp_cf, dt, 0, f_uper_cf) * PULSE_TO_M
+    y_il = bpass(disp_il, dt, 0, f_uper_il) * PULSE_TO_M
+
+    # Hydrodynamic force minus inertia force, within 0.9-1.1 x vibration frequency
+    fxr = bpass(fx, dt, 0.0001, f_uper_cf) - M * _acceleration(x_cf, dt)
+    fyr = bpass(fy, dt, 0.0001, f_uper_il) - M * _acceleration(y_il, dt)
+    fx_main = bpass(fxr, dt, f_sway_cf * 0.9, f_sway_cf * 1.1)
+    fy_main = bpass(fyr, dt, f_sway_il * 0.9, f_sway_il * 1.1)
+
+    def rms(v: np.ndarray) -> float:
+        return float(np.sqrt(np.mean(v**2)))
+
+    def coefficients(x: np.ndarray, force: np.ndarray, f_sway: float) -> tuple:
+        amp = rms(x) * np.sqrt(2) / D
+        cl0 = rms(force) * np.sqrt(2) / q
+        dphase = np.unwrap(np.angle(hilbert(force))) - np.unwrap(np.angle(hilbert(x)))
+        phi = float(np.mean(dphase[_span(len(dphase), len(dphase) * 0.1, len(dphase) * 0.9)]))
+        clv = cl0 * np.sin(phi)
+        cla = -cl0 * np.cos(phi)
+        f0non = f_sway * D / U
+        cma = -1 / (2 * np.pi**3) * cla / (amp * f0non**2)
+        return float(clv), float(cma)
+
+    clv_cf, cma_cf = coefficients(x_cf, fx_main, f_sway_cf) if cf_cl else (0.0, 0.0)
+    clv_il, cma_il = coefficients(y_il, fy_main, f_sway_il) if il_cl else (0.0, 0.0)
+    return [clv_cf, cma_cf, clv_il, cma_il, cdm]
+
+
+# ----------------------------- Stream -----------------------------
+
+
+@dataclass
+class CoefficientStream:
+    """
+    Tail one case's oscillator file and compute its coefficients when the run finished.
+    """
+
+    name: str
+    U: float
+    L: float
+    D: float
+    M: float
+    tinterval: float
+    cf_cl: int = 1
+    il_cl: int = 1
+    run_dir: Optional[str] = None
+    path: Optional[str] = None  # explicit file; otherwise newest '*<name>.txt' in run_dir
+    poll_s: float = 0.05
+    direction: Optional[int] = None
+    store: Optional[RunStore] = None
+
+    samples: int = 0
+    coefficients: Optional[List[float]] = None
+
+    def __post_init__(self) -> None:
+        self._chunks: List[np.ndarray] = []
+        self._partial = ""
+        self._ncols = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._opened_at = time.time()
+        self._last_growth = time.monotonic()
+
+    # -- tailing --
+
+    def start(self) -> "CoefficientStream":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._tail, name=f"coeff-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _find_file(self) -> Optional[str]:
+        if self.path:
+            return self.path if os.path.exists(self.path) else None
+        files = glob.glob(os.path.join(self.run_dir or ".", f"*{self.name}.txt"))
+        files = [f for f in files if os.path.getmtime(f) >= self._opened_at - 1.0]  # this run only
+        return max(files, key=os.path.getmtime) if files else None
+
+    def _tail(self) -> None:
+        path = None
+        while path is None and not self._stop.is_set():
+            path = self._find_file()
+            if path is None:
+                time.sleep(self.poll_s)
+        if path is None:
+            return
+        self.path = path
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            while True:
+                text = f.read()
+                if text:
+                    self.feed(text)
+                    self._last_growth = time.monotonic()
+                elif self._stop.is_set():
+                    break
+                else:
+                    time.sleep(self.poll_s)
+
+    def feed(self, text: str) -> None:
+        """
+        Parse appended text; only complete lines are taken, the remainder waits for more data.
+        """
+        with self._lock:
+            text = self._partial + text
+            cut = text.rfind("\n")
+            if cut < 0:
+                self._partial = text
+                return
+            self._partial = text[cut + 1 :]
+            rows = [ln.split() for ln in text[:cut].splitlines() if ln.strip()]
+            if not rows:
+                return
+            if not self._ncols:
+                self._ncols = len(rows[0])
+            block = np.array([r for r in rows if len(r) == self._ncols], dtype=float)
+            self._chunks.append(block)
+            self.samples += len(block)
+
+    def data(self) -> np.ndarray:
+        with self._lock:
+            if len(self._chunks) > 1:
+                self._chunks = [np.vstack(self._chunks)]
+            return self._chunks[0] if self._chunks else np.empty((0, self._ncols))
+
+    def finish(self, *, settle_s: float = 0.3, missing_s: float = 2.0, timeout_s: float = 10.0) -> List[float]:
+        """
+        Call after FINISHCONTROL: wait until the file stopped growing, then compute.
+        """
+        waited_from = time.monotonic()
+        deadline = waited_from + timeout_s
+        while time.monotonic() < deadline:
+            if self.path is None:
+                if time.monotonic() - waited_from >= missing_s:  # the file exists long before FINISHCONTROL
+                    break
+            elif time.monotonic() - self._last_growth >= settle_s:
+                break
+            time.sleep(self.poll_s)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(deadline - time.monotonic(), 1.0))
+        self.feed("\n")  # a complete last line without its newline (as readmatrix reads it)
+        if self.path is None:
+            raise RuntimeError(f"No oscillator data file for case {self.name}")
+        t0 = time.perf_counter()
+        self.coefficients = data_deal(
+            self.data(), self.U, self.L, self.D, self.M, self.tinterval, self.cf_cl, self.il_cl
+        )
+        print(
+            f"[COEFF] {self.name}: {self.samples} samples -> "
+            + ", ".join(f"{k}={v:.4g}" for k, v in zip(COE_NAMES, self.coefficients))
+            + f" ({time.perf_counter() - t0:.3f} s)"
+        )
+        if self.store is not None:
+            started, _ = parse_run_filename(self.path)
+            self.store.add(self.data(), self.name, started=started, direction=self.direction, source=self.path)
+        return self.coefficients
+
+    def cancel(self) -> None:
+        self._stop.set()
+
+
+@dataclass
+class CoefficientStreams:
+    """
+    Campaign settings shared by every case stream.
+    """
+
+    run_dir: str
+    L: float
+    D: float
+    M: float
+    tinterval: float
+    store: Optional[RunStore] = None
+
+    def open(
+        self, name: str, U: float, *, cf_cl: int = 1, il_cl: int = 1, direction: Optional[int] = None
+    ) -> CoefficientStream:
+        return CoefficientStream(
+            name=name, U=U, L=self.L, D=self.D, M=self.M, tinterval=self.tinterval,
+            cf_cl=cf_cl, il_cl=il_cl, run_dir=self.run_dir, direction=direction, store=self.store,
+        ).start()
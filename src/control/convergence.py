@@ -0,0 +1,394 @@
+"""
+Streaming convergence monitor, logged next to the campaign stop decision of Step0 step 6.
+
+Modules integrated:
+- ConvergenceMonitor: ErrFinal / Conv_thresh / Windowvalue evaluated incrementally, fed with
+  every finished case (coefficients) and every GPR prediction summary
+- Forward/backward case pairs -> training targets exactly as GPR_Pre_core builds y_train
+  (YtrainDirection, YtrainType)
+- PredictionSummary / load_step5: per-column predicted sd and mean range (y_pre_stats.mat of
+  tiled runs, or reduced from y_pre_data / y_pre_err) and the predictions at the proposed
+  next points; summarize_step5 does the same for in-memory GPR outputs
+- save_step5: the .mat files of Step5_GPR_Pre.m written from in-memory GPR outputs (read by
+  step 6)
+- Decision with phase 'explore' -> 'refine' -> 'stop' and an on_phase callback
+
+Notes:
+- ErrFinal: the largest predicted sd of every checked output column, relative to the scale of
+  the predicted mean (max |mu| over the grid), is at most ErrFinal.
+- Conv_thresh over Windowvalue: each update is one relative change per column, either of the
+  prediction summary (sd_max, mean scale) between two GPR steps or the residual of a measured
+  case pair against the mean predicted for that point. The last Windowvalue changes must all
+  be at most the column threshold.
+- Conv_thresh is a digit code like Kernelfun (one digit per output column, d percent, 0 skips
+  the column; a 5th column uses the 4th digit); values below 1 are one fraction for all columns.
+- Stop when both hold. An update costs microseconds (last_eval_s).
+- Advisory only: the Step6 source is not in this tree, so these criteria (the Conv_thresh
+  digit code, ErrFinal against max |mu|) are read from the parameter names. judge_next
+  decides; run_campaign logs the monitor's decision next to it so the two can be compared.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.io import loadmat, savemat
+except ImportError:  # numpy-only installs: no Step5 file reading / writing
+    loadmat = savemat = None
+
+
+# YtrainType -> Cv1..Cdm columns of the training target (as in GPR_Pre_core.m)
+YTRAIN_COLUMNS: Dict[int, Tuple[int, ...]] = {1: (0, 1), 2: (2, 3), 3: (0, 1, 2, 3), 4: (0, 1, 2, 3, 4)}
+
+
+def pair_target(forward: Sequence[float], backward: Sequence[float], direction: int) -> List[float]:
+    """
+    Training target of one forward/backward pair (YtrainDirection of GPR_Pre_core.m).
+    """
+    if direction == 2:
+        return [(a + b) / 2 for a, b in zip(forward, backward)]
+    if direction == 1:
+        return list(forward)
+    if direction == 0:
+        return list(backward)
+    if direction == 3:
+        return list(forward) if forward[0] > backward[0] else list(backward)
+    raise ValueError(f"Unknown YtrainDirection: {direction}")
+
+
+def conv_thresholds(code: float, ncol: int) -> List[Optional[float]]:
+    """
+    Per-column relative thresholds from Conv_thresh (None: column not checked).
+    """
+    code = float(code)
+    if code < 1:
+        return [code if code > 0 else None] * ncol
+    digits = f"{int(round(code)):04d}"
+    out: List[Optional[float]] = []
+    for j in range(ncol):
+        d = int(digits[min(j, len(digits) - 1)])
+        out.append(d / 100 if d else None)
+    return out
+
+
+# ----------------------------- Predictions -----------------------------
+
+
+@dataclass
+class PredictionSummary:
+    sd_max: List[float]
+    sd_mean: List[float]
+    mu_min: List[float]
+    mu_max: List[float]
+
+    @property
+    def scale(self) -> List[float]:
+        return [max(abs(a), abs(b), 1e-12) for a, b in zip(self.mu_min, self.mu_max)]
+
+    def rel_err(self) -> List[float]:
+        return [sd / s for sd, s in zip(self.sd_max, self.scale)]
+
+    @classmethod
+    def from_arrays(cls, y_pre_data: Any, y_pre_err: Any) -> "PredictionSummary":
+        mu = np.atleast_2d(np.asarray(y_pre_data, dtype=float))
+        sd = np.atleast_2d(np.asarray(y_pre_err, dtype=float))
+        return cls(
+            sd_max=sd.max(axis=0).tolist(),
+            sd_mean=sd.mean(axis=0).tolist(),
+            mu_min=mu.min(axis=0).tolist(),
+            mu_max=mu.max(axis=0).tolist(),
+        )
+
+
+@dataclass
+class Expectation:
+    x: Tuple[float, ...]  # proposed next point (model inputs)
+    mu: List[float]
+    sd: List[float]
+
+
+def _mat(path: str, name: str) -> Any:
+    return loadmat(path, squeeze_me=True, struct_as_record=False)[name]
+
+
+def _field(stats: Any, name: str) -> List[float]:
+    value = stats[name] if isinstance(stats, dict) else getattr(stats, name)
+    return np.atleast_1d(np.asarray(value, dtype=float)).ravel().tolist()
+
+
+def summarize_step5(
+    y_pre_data: Any,
+    y_pre_err: Any,
+    x_pre_data: Any = None,
+    next_point_cal: Any = None,
+    stats: Any = None,
+) -> Tuple[Optional[PredictionSummary], List[Expectation]]:
+    """
+    Summary of one Step5 prediction and the predictions at the proposed grid points.
+
+    `stats` (tiled runs: struct or dict of sd_max / sd_mean / mu_min / mu_max) replaces the
+    grid arrays, which tiled runs do not return.
+    """
+    if stats is not None and np.size(stats) > 0:
+        rows = [_field(stats, k) for k in ("sd_max", "sd_mean", "mu_min", "mu_max")]
+        return PredictionSummary(*rows), []
+    if y_pre_err is None or np.size(y_pre_err) == 0:
+        return None, []
+
+    mu = np.atleast_2d(np.asarray(y_pre_data, dtype=float))
+    sd = np.atleast_2d(np.asarray(y_pre_err, dtype=float))
+    if mu.shape[0] == 1 and sd.shape[0] == 1 and mu.shape != sd.shape:
+        mu, sd = mu.T, sd.T
+    summary = PredictionSummary.from_arrays(mu, sd)
+    expected: List[Expectation] = []
+    if x_pre_data is not None and next_point_cal is not None and np.size(next_point_cal) > 0:
+        X = np.atleast_2d(np.asarray(x_pre_data, dtype=float))
+        P = np.atleast_2d(np.asarray(next_point_cal, dtype=float))
+        if X.shape[0] == mu.shape[0] and P.shape[1] == X.shape[1]:
+            for p in P:
+                dev = np.abs(X - p).max(axis=1)
+                k = int(np.argmin(dev))
+                if dev[k] <= 1e-9 * (1.0 + float(np.abs(p).max())):  # grid point (not a continuous optimum)
+                    expected.append(Expectation(tuple(p.tolist()), mu[k].tolist(), sd[k].tolist()))
+    return summary, expected
+
+
+def load_step5(folder: str = ".") -> Tuple[Optional[PredictionSummary], List[Expectation]]:
+    """
+    Summary of the last Step5 prediction and its predictions at next_point_cal.
+
+    Tiled runs (y_pre_stats.mat newer than y_pre_err.mat) give the summary only, their
+    v7.3 grid arrays are not read here.
+    """
+    if loadmat is None:
+        raise RuntimeError("scipy is required to read the Step5 .mat files")
+
+    def path(name: str) -> str:
+        return os.path.join(folder, f"{name}.mat")
+
+    def mtime(name: str) -> float:
+        return os.path.getmtime(path(name)) if os.path.exists(path(name)) else -1.0
+
+    if mtime("y_pre_stats") > mtime("y_pre_err"):
+        return summarize_step5(None, None, stats=_mat(path("y_pre_stats"), "stats"))
+    if mtime("y_pre_err") < 0:
+        return None, []
+
+    def optional(name: str) -> Any:
+        return _mat(path(name), name) if mtime(name) >= 0 else None
+
+    return summarize_step5(
+        _mat(path("y_pre_data"), "y_pre_data"),
+        _mat(path("y_pre_err"), "y_pre_err"),
+        optional("x_pre_data"),
+        optional("next_point_cal"),
+    )
+
+
+def save_step5(folder: str, outputs: Dict[str, Any]) -> None:
+    """
+    Write the files Step5_GPR_Pre.m saves (step 6 and load_step5 read them) from the outputs
+    of an in-memory GPR_Pre_core call (name -> array, 'stats' set for tiled runs).
+    """
+    if savemat is None:
+        raise RuntimeError("scipy is required to write the Step5 .mat files")
+
+    def path(name: str) -> str:
+        return os.path.join(folder, f"{name}.mat")
+
+    def save(name: str, value: Any, var: Optional[str] = None) -> None:
+        savemat(path(name), {var or name: np.asarray(value, dtype=float)})
+
+    stats = outputs.get("stats")
+    tiled = stats is not None and np.size(stats) > 0
+    y_train = np.atleast_2d(np.asarray(outputs["y_train"], dtype=float))
+    save("y_train", y_train)
+    if tiled:  # grid arrays already written tile by tile into `folder` by GPR_Pre_core
+        summary = ("sd_max", "sd_mean", "mu_min", "mu_max")  # the fields load_step5 reads
+        savemat(path("y_pre_stats"), {"stats": {k: np.asarray(_field(stats, k)) for k in summary}})
+    else:
+        for name in ("y_pre_data", "y_pre_err", "y_pre_sco", "x_pre_data"):
+            save(name, outputs[name])
+    save("next_point_write", outputs["next_point_write"])
+    save("next_point_cal", outputs["next_point_cal"])
+    n_test = max(y_train.shape)  # length(y_train)
+    for name in ("y_pre_data", "y_pre_err"):
+        if tiled:
+            if os.path.exists(path(name)):
+                shutil.copyfile(path(name), path(f"{name}{n_test}"))
+        else:
+            save(f"{name}{n_test}", outputs[name], name)
+
+
+# ----------------------------- Monitor -----------------------------
+
+
+@dataclass
+class Decision:
+    stop: bool = False
+    phase: str = "explore"  # 'explore' (error above ErrFinal), 'refine' (window not converged), 'stop'
+    err: List[float] = field(default_factory=list)  # relative predicted error per column
+    change: List[float] = field(default_factory=list)  # largest relative change per column in the window
+    window: int = 0  # updates in the window
+    reason: str = ""
+
+
+class ConvergenceMonitor:
+    def __init__(
+        self,
+        err_final: float,
+        conv_thresh: float,
+        window: int,
+        *,
+        ytrain_direction: int = 2,
+        ytrain_type: int = 4,
+        inputs: Sequence[str] = (),
+        match_tol: float = 1e-6,
+        on_phase: Optional[Callable[[str, str, Decision], None]] = None,
+    ) -> None:
+        self.err_final = float(err_final)
+        self.columns = YTRAIN_COLUMNS[int(ytrain_type)]
+        self.ytrain_direction = int(ytrain_direction)
+        self.inputs = list(inputs)  # condition-table columns of the model inputs (XtrainType)
+        self.thresholds = conv_thresholds(conv_thresh, len(self.columns))
+        self.window = max(int(window), 1)
+        self.match_tol = match_tol
+        self.on_phase = on_phase
+
+        self.cases = 0  # completed pairs
+        self.matched = 0  # pairs compared against a prediction
+        self.predictions = 0
+        self.last_eval_s = 0.0
+
+        self.decision = Decision()
+        self._changes: Deque[List[float]] = deque(maxlen=self.window)
+        self._summary: Optional[PredictionSummary] = None
+        self._expected: List[Expectation] = []
+        self._halves: Dict[Any, Tuple[bool, Tuple[float, ...], Optional[List[float]]]] = {}
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any], **kwargs: Any) -> "ConvergenceMonitor":
+        """
+        Monitor from the Input0 parameters (ErrFinal, Conv_thresh, Windowvalue, YtrainDirection, YtrainType).
+        """
+        return cls(
+            params["ErrFinal"],
+            params["Conv_thresh"],
+            params.get("Windowvalue", 10),
+            ytrain_direction=int(params.get("YtrainDirection", 2)),
+            ytrain_type=int(params.get("YtrainType", 4)),
+            **kwargs,
+        )
+
+    @property
+    def stop(self) -> bool:
+        return self.decision.stop
+
+    # ----------------------------- Updates -----------------------------
+
+    def add_prediction(self, summary: PredictionSummary, expected: Sequence[Expectation] = ()) -> Decision:
+        """
+        New GPR step: relative change of the summary enters the window; `expected` replaces
+        the predictions used for the residuals of the coming cases.
+        """
+        self.predictions += 1
+        prev = self._summary
+        if prev is not None:
+            self._changes.append(
+                [
+                    max(abs(a - b) / max(abs(b), 1e-12), abs(sa - sb) / sb)
+                    for a, b, sa, sb in zip(summary.sd_max, prev.sd_max, summary.scale, prev.scale)
+                ]
+            )
+        self._summary = summary
+        self._expected = list(expected)
+        return self._evaluate()
+
+    def add_coefficients(
+        self, pair: Any, forward: bool, x: Sequence[float], coe: Optional[Sequence[float]]
+    ) -> Decision:
+        """
+        One finished case: Cv1..Cdm (None when extraction failed) of the forward or backward
+        run of `pair`, with its model inputs x. The second run of a pair forms the training
+        target; when the last prediction expected that point its residual enters the window.
+        """
+        other = self._halves.pop(pair, None)
+        if other is None or other[0] == forward:
+            self._halves[pair] = (forward, tuple(float(v) for v in x), None if coe is None else list(coe))
+            return self.decision
+        _, _, other_coe = other
+        if coe is None or other_coe is None:
+            return self.decision
+        fwd, bwd = (coe, other_coe) if forward else (other_coe, coe)
+        target = pair_target(fwd, bwd, self.ytrain_direction)
+        y = [float(target[k]) for k in self.columns]
+        self.cases += 1
+
+        exp = self._match(tuple(float(v) for v in x))
+        if exp is None or self._summary is None:
+            return self.decision
+        self.matched += 1
+        self._changes.append([abs(a - m) / s for a, m, s in zip(y, exp.mu, self._summary.scale)])
+        return self._evaluate()
+
+    def _match(self, x: Tuple[float, ...]) -> Optional[Expectation]:
+        if not self._expected:
+            return None
+        dims = len(self._expected[0].x)
+        if len(x) == dims + 1:
+            # GPR_Pre_core drops f2non (4th input) when CF and IL amplitudes are both on the grid
+            x = x[:3] + x[4:]
+        if len(x) != dims:
+            return None
+        for exp in self._expected:
+            if all(abs(a - b) <= self.match_tol * (1.0 + abs(b)) for a, b in zip(x, exp.x)):
+                return exp
+        return None
+
+    # ----------------------------- Decision -----------------------------
+
+    def _evaluate(self) -> Decision:
+        t0 = time.perf_counter()
+        ncol = len(self.columns)
+        checked = [j for j, t in enumerate(self.thresholds) if t is not None]
+        err = self._summary.rel_err() if self._summary is not None else [float("inf")] * ncol
+        change = [max(c[j] for c in self._changes) for j in range(ncol)] if self._changes else [float("inf")] * ncol
+
+        if not checked:
+            stop, phase, reason = False, "explore", "Conv_thresh checks no column"
+        else:
+            err_ok = self._summary is not None and all(err[j] <= self.err_final for j in checked)
+            conv_ok = len(self._changes) >= self.window and all(change[j] <= self.thresholds[j] for j in checked)
+            stop = err_ok and conv_ok
+            phase = "stop" if stop else "refine" if err_ok else "explore"
+            if stop:
+                reason = f"error <= {self.err_final:g} and last {self.window} changes within Conv_thresh"
+            elif err_ok:
+                reason = f"error <= {self.err_final:g}, {len(self._changes)}/{self.window} changes in window"
+            else:
+                reason = f"error {max(err[j] for j in checked):.4g} > {self.err_final:g}"
+
+        old = self.decision.phase
+        self.decision = Decision(stop, phase, err, change, len(self._changes), reason)
+        self.last_eval_s = time.perf_counter() - t0
+        if phase != old and self.on_phase is not None:
+            self.on_phase(old, phase, self.decision)
+        return self.decision
+
+    def report(self) -> str:
+        d = self.decision
+        err = " ".join(f"{x:.4g}" for x in d.err)
+        change = " ".join(f"{x:.4g}" for x in d.change)
+        return (
+            f"[CONV] phase {d.phase} ({d.reason}) | err [{err}] | change [{change}] | "
+            f"{self.cases} pairs, {self.matched} vs prediction, {self.predictions} predictions | "
+            f"eval {self.last_eval_s * 1e6:.1f} us"
+        )
@@ -0,0 +1,471 @@
+"""
+Persistent TCP links to the experiment devices (towing carriage / camera PC / oscillator).
+
+Modules integrated:
+- Newline message framing (encode + incremental decode of partial reads)
+- Batched CONFIG frames with a single acknowledgement carrying the applied values
+- DeviceLink: one long-lived socket per device with health check and transparent reconnect
+- ConnectionPool: per-(ip, port) registry of links shared by all controllers
+- STATUS queries: one request/reply round trip per device state (readiness waits)
+
+Notes:
+- A persistent link writes every command as one frame terminated by '\\n' and keeps the
+  socket open. The device must read frames in a loop on the same connection.
+- A non-persistent link keeps the original one-shot protocol (connect, send raw string,
+  close) for device programs that still do a single read per connection.
+- CONFIG:K1=v1;K2=v2;DO=ACTION is answered by ACK:CONFIG:K1=v1;K2=v2 (values as applied).
+  Devices that do not answer fall back to the single-command protocol SET_K:v + ACTION.
+- STATUS:KEY is answered by STATUS:KEY=value on the same persistent link; devices that never
+  answer are remembered (supports_status = False) and not queried again.
+"""
+
+from __future__ import annotations
+
+import select
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from tracing import tracer
+
+
+FRAME_TERMINATOR = b"\n"
+CONFIG_PREFIX = "CONFIG:"
+CONFIG_ACK_PREFIX = "ACK:CONFIG:"
+CONFIG_NAK_PREFIX = "NAK:CONFIG"
+CONFIG_ACTION_KEY = "DO"
+STATUS_PREFIX = "STATUS:"
+
+
+class ConfigError(RuntimeError):
+    """
+    Raised when a device acknowledges different values than requested, or stops answering.
+    """
+
+
+# ----------------------------- Framing -----------------------------
+
+
+def encode_frame(command: str, encoding: str = "ascii") -> bytes:
+    """
+    Encode one command as a newline-terminated frame.
+    """
+    return command.strip().encode(encoding) + FRAME_TERMINATOR
+
+
+class FrameBuffer:
+    """
+    Incremental decoder for newline-framed messages.
+
+    Bytes from partial reads are accumulated; complete frames are returned as stripped
+    strings (empty frames and '\\r' are dropped).
+    """
+
+    def __init__(self, encoding: str = "utf-8") -> None:
+        self.encoding = encoding
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> List[str]:
+        self._buf.extend(data)
+        frames: List[str] = []
+        while True:
+            idx = self._buf.find(FRAME_TERMINATOR)
+            if idx < 0:
+                break
+            raw = bytes(self._buf[:idx])
+            del self._buf[: idx + 1]
+            msg = raw.decode(self.encoding, errors="ignore").strip()
+            if msg:
+                frames.append(msg)
+        return frames
+
+    def flush(self) -> List[str]:
+        """
+        Return the unterminated remainder as a final frame (legacy one-shot senders).
+        """
+        msg = bytes(self._buf).decode(self.encoding, errors="ignore").strip()
+        self._buf.clear()
+        return [msg] if msg else []
+
+
+def encode_config(params: Mapping[str, Any], actions: Sequence[str] = ()) -> str:
+    """
+    Build one CONFIG frame: CONFIG:K1=v1;K2=v2;DO=ACTION1;DO=ACTION2
+    """
+    items = [f"{k}={v}" for k, v in params.items()]
+    items += [f"{CONFIG_ACTION_KEY}={a}" for a in actions]
+    return CONFIG_PREFIX + ";".join(items)
+
+
+def parse_config(message: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Parse the body of a CONFIG (or ACK:CONFIG) frame into (params, actions).
+    """
+    for prefix in (CONFIG_ACK_PREFIX, CONFIG_PREFIX):
+        if message.startswith(prefix):
+            message = message[len(prefix):]
+            break
+    params: Dict[str, str] = {}
+    actions: List[str] = []
+    for item in message.split(";"):
+        if "=" not in item:
+            continue
+        k, v = item.split("=", 1)
+        k, v = k.strip(), v.strip()
+        if k == CONFIG_ACTION_KEY:
+            actions.append(v)
+        else:
+            params[k] = v
+    return params, actions
+
+
+def legacy_commands(params: Mapping[str, Any], actions: Sequence[str] = ()) -> List[str]:
+    """
+    Single-command equivalent of a CONFIG frame: SET_K:v for each parameter, then actions.
+    """
+    return [f"SET_{k}:{v}" for k, v in params.items()] + list(actions)
+
+
+def config_mismatches(requested: Mapping[str, Any], applied: Mapping[str, str]) -> Dict[str, Tuple[Any, Optional[str]]]:
+    """
+    Compare requested against acknowledged values (numbers with relative tolerance).
+    """
+    bad: Dict[str, Tuple[Any, Optional[str]]] = {}
+    for k, want in requested.items():
+        got = applied.get(k)
+        if got is None:
+            bad[k] = (want, None)
+            continue
+        try:
+            a, b = float(want), float(got)
+            if abs(a - b) > 1e-9 * max(1.0, abs(a), abs(b)):
+                bad[k] = (want, got)
+        except (TypeError, ValueError):
+            if str(want).strip() != got.strip():
+                bad[k] = (want, got)
+    return bad
+
+
+# ----------------------------- Device link -----------------------------
+
+
+@dataclass
+class DeviceLink:
+    ip: str
+    port: int
+
+    persistent: bool = True
+    timeout_s: float = 5.0
+    retries: int = 2
+    retry_delay_s: float = 0.3
+    encoding: str = "ascii"
+
+    ack_timeout_s: float = 1.0
+    supports_config: Optional[bool] = None  # None = not probed yet
+    supports_status: Optional[bool] = None  # None = not probed yet
+
+    # Counters (inspected by benchmarks / status printing)
+    connects: int = 0
+    sends: int = 0
+    reconnects: int = 0
+    round_trips: int = 0
+
+    _sock: Optional[socket.socket] = field(default=None, init=False, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+    _frames: FrameBuffer = field(default_factory=FrameBuffer, init=False, repr=False)
+    _replies: Deque[str] = field(default_factory=deque, init=False, repr=False)
+
+    @property
+    def endpoint(self) -> Tuple[str, int]:
+        return (self.ip, int(self.port))
+
+    def _connect(self) -> socket.socket:
+        with tracer.span("connect", f"{self.ip}:{self.port}"):
+            sock = socket.create_connection(self.endpoint, timeout=self.timeout_s)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.persistent:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.connects += 1
+        return sock
+
+    def _drop(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+            self._sock = None
+            self._frames = FrameBuffer()
+            self._replies.clear()
+
+    def is_healthy(self) -> bool:
+        """
+        Non-blocking liveness check of the pooled socket.
+
+        A readable socket that returns b"" has been closed by the peer.
+        """
+        with self._lock:
+            sock = self._sock
+            if sock is None:
+                return False
+            try:
+                readable, _, errored = select.select([sock], [], [sock], 0)
+                if errored:
+                    return False
+                if readable:
+                    peek = sock.recv(1, socket.MSG_PEEK)
+                    return bool(peek)
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def _ensure(self) -> socket.socket:
+        if self._sock is not None and not self.is_healthy():
+            self._drop()
+            self.reconnects += 1
+        if self._sock is None:
+            self._sock = self._connect()
+        return self._sock
+
+    def send(self, command: str) -> None:
+        """
+        Send one command; reconnect and retry on transient failures.
+
+        Raises the last OSError when all attempts fail.
+        """
+        last_err: Optional[Exception] = None
+        with self._lock, tracer.span("send", command, device=f"{self.ip}:{self.port}"):
+            for attempt in range(self.retries + 1):
+                try:
+                    if self.persistent:
+                        self._ensure().sendall(encode_frame(command, self.encoding))
+                    else:
+                        with self._connect() as sock:
+                            sock.sendall(command.encode(self.encoding))
+                    self.sends += 1
+                    return
+                except OSError as e:
+                    last_err = e
+                    self._drop()
+                    if attempt < self.retries:
+                        time.sleep(self.retry_delay_s)
+        assert last_err is not None
+        raise last_err
+
+    def _discard_pending(self) -> None:
+        # Late replies to an earlier (timed-out) request must not answer the next one.
+        self._replies.clear()
+        sock = self._sock
+        try:
+            while sock is not None and select.select([sock], [], [], 0)[0]:
+                if not sock.recv(4096):
+                    self._drop()
+                    break
+        except OSError:
+            self._drop()
+        self._frames = FrameBuffer()
+
+    def _read_reply(self, timeout_s: float) -> Optional[str]:
+        if self._replies:
+            return self._replies.popleft()
+        sock = self._sock
+        if sock is None:
+            return None
+        deadline = time.monotonic() + timeout_s
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                sock.settimeout(remaining)
+                data = sock.recv(1024)
+                if not data:
+                    self._drop()
+                    return None
+                self._replies.extend(self._frames.feed(data))
+                if self._replies:
+                    return self._replies.popleft()
+        except socket.timeout:
+            return None
+        finally:
+            if self._sock is not None:
+                self._sock.settimeout(self.timeout_s)
+
+    def request(self, command: str, *, timeout_s: Optional[float] = None) -> Optional[str]:
+        """
+        Send one frame on the persistent socket and wait for one reply frame (None on timeout).
+        """
+        if not self.persistent:
+            raise ConfigError(f"{self.ip}:{self.port} is a one-shot link; request/reply needs persistent=True")
+        with self._lock:
+            self._discard_pending()
+            self.send(command)
+            reply = self._read_reply(self.ack_timeout_s if timeout_s is None else timeout_s)
+            self.round_trips += 1
+            return reply
+
+    def configure(self, params: Mapping[str, Any], actions: Sequence[str] = ()) -> Dict[str, str]:
+        """
+        Apply all parameters (then actions) in one CONFIG round trip and verify the ack.
+
+        Falls back to the single-command protocol when the link is one-shot or the device
+        never acknowledged a CONFIG frame; a NAK or a mismatching ack raises ConfigError.
+        Returns the applied values (the requested values, unverified, in fallback mode).
+        """
+        with self._lock, tracer.span("config", f"{self.ip}:{self.port}", actions=" ".join(actions)):
+            if self.persistent and self.supports_config is not False:
+                frame = encode_config(params, actions)
+                for attempt in range(2):
+                    reply = self.request(frame)
+                    if reply is not None and reply.startswith(CONFIG_ACK_PREFIX):
+                        applied, _ = parse_config(reply)
+                        bad = config_mismatches(params, applied)
+                        if bad:
+                            raise ConfigError(f"{self.ip}:{self.port} applied different values: {bad}")
+                        self.supports_config = True
+                        return applied
+                    if reply is not None and reply.startswith(CONFIG_NAK_PREFIX):
+                        raise ConfigError(f"{self.ip}:{self.port} rejected configuration: {reply}")
+                    if self.supports_config is None:
+                        # Never acknowledged: treat as a legacy device program.
+                        self.supports_config = False
+                        break
+                    # Known CONFIG device but no ack: frame (or ack) lost, resend once on a fresh socket.
+                    self._drop()
+                else:
+                    raise ConfigError(f"{self.ip}:{self.port} did not acknowledge: {frame}")
+
+            for command in legacy_commands(params, actions):
+                self.send(command)
+            return {k: str(v) for k, v in params.items()}
+
+    def status(self, key: str, *, timeout_s: Optional[float] = None) -> Optional[str]:
+        """
+        Query one device state (STATUS:KEY -> STATUS:KEY=value) and return the value.
+
+        None when the link is one-shot or down, the reply timed out, or the device is known
+        not to answer status queries (first unanswered query of an unprobed device).
+        """
+        if not self.persistent or self.supports_status is False:
+            return None
+        key = key.strip().upper()
+        prefix = f"{STATUS_PREFIX}{key}="
+        with self._lock:
+            try:
+                reply = self.request(f"{STATUS_PREFIX}{key}", timeout_s=timeout_s)
+            except OSError:
+                return None
+            if reply is None or not reply.startswith(prefix):
+                if self.supports_status is None:
+                    self.supports_status = False
+                return None
+            self.supports_status = True
+            return reply[len(prefix):].strip()
+
+    def ping(self) -> bool:
+        """
+        Health check: make sure a live connection exists (connecting if needed).
+        """
+        if not self.persistent:
+            try:
+                with self._connect():
+                    return True
+            except OSError:
+                return False
+        with self._lock:
+            try:
+                self._ensure()
+                return True
+            except OSError:
+                self._drop()
+                return False
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
+
+
+# ----------------------------- Pool -----------------------------
+
+
+class ConnectionPool:
+    """
+    Registry of DeviceLink objects keyed by (ip, port).
+
+    Links are created on first use with the pool defaults; use register() to choose
+    persistent / one-shot mode per device.
+    """
+
+    def __init__(
+        self,
+        *,
+        persistent: bool = True,
+        timeout_s: float = 5.0,
+        retries: int = 2,
+        retry_delay_s: float = 0.3,
+    ) -> None:
+        self.persistent = persistent
+        self.timeout_s = timeout_s
+        self.retries = retries
+        self.retry_delay_s = retry_delay_s
+        self._links: Dict[Tuple[str, int], DeviceLink] = {}
+        self._lock = threading.Lock()
+
+    def _new_link(self, ip: str, port: int, persistent: Optional[bool], kwargs: Dict[str, Any]) -> DeviceLink:
+        return DeviceLink(
+            ip=ip,
+            port=int(port),
+            persistent=self.persistent if persistent is None else bool(persistent),
+            timeout_s=kwargs.pop("timeout_s", self.timeout_s),
+            retries=kwargs.pop("retries", self.retries),
+            retry_delay_s=kwargs.pop("retry_delay_s", self.retry_delay_s),
+            **kwargs,
+        )
+
+    def register(self, ip: str, port: int, *, persistent: Optional[bool] = None, **kwargs) -> DeviceLink:
+        key = (ip, int(port))
+        with self._lock:
+            old = self._links.pop(key, None)
+            if old is not None:
+                old.close()
+            link = self._links[key] = self._new_link(ip, port, persistent, kwargs)
+            return link
+
+    def link(self, ip: str, port: int, *, persistent: Optional[bool] = None, **kwargs) -> DeviceLink:
+        """
+        Return the link for (ip, port); persistent / kwargs only apply when it is created here.
+        Lookup and creation share the lock, so concurrent callers get the same link.
+        """
+        key = (ip, int(port))
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                link = self._links[key] = self._new_link(ip, port, persistent, kwargs)
+            return link
+
+    def send(self, ip: str, port: int, command: str) -> None:
+        self.link(ip, port).send(command)
+
+    def health_check(self) -> Dict[Tuple[str, int], bool]:
+        """
+        Ping every registered link (reconnecting dead ones) and report liveness.
+        """
+        with self._lock:
+            links = list(self._links.values())
+        return {link.endpoint: link.ping() for link in links}
+
+    def close(self, ip: str, port: int) -> None:
+        with self._lock:
+            link = self._links.pop((ip, int(port)), None)
+        if link is not None:
+            link.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            links = list(self._links.values())
+            self._links.clear()
+        for link in links:
+            link.close()
@@ -0,0 +1,441 @@
+"""
+Local stand-in servers for the towing carriage, camera PC and oscillator.
+
+Modules integrated:
+- SimDevice: threaded TCP server speaking the device protocol (newline frames on persistent
+  links, one unterminated command per one-shot connection, CONFIG frames with ACK:CONFIG)
+- SimCarriage / SimCamera / SimOscillator: command handling and FINISHMOVE / FINISHPHOTO /
+  FINISHCONTROL sent back to the controller's feedback listener after the simulated run time
+- Readiness: STATUS:KEY replies (SERVO, CONTROL, PHOTO, WATER) and READY:<KEY> events, with
+  a servo enable delay and water motion decaying after each run
+- DeviceTiming / DeviceFaults: configurable delays, jitter, time scale and fault injection
+  (dropped finish messages, NAKed or slow CONFIG acks, dropped connections)
+- SimFleet: the three devices plus a shared, time-stamped protocol log
+
+Notes:
+- Simulated durations are the physical ones times `time_scale` (0.01: a 60 s tow takes 0.6 s).
+- Carriage run time = travel distance / speed; camera = CHANGETIME duration; oscillator =
+  the carriage run time of the same case (both are started together).
+- Finish messages are sent as one frame on a new connection, like the device programs do.
+- Water: force std water_std_n while towing, decaying with water_tau_s after the run ends;
+  the oscillator answers STATUS:WATER and pushes READY:WATER:<std> once below water_ready_n.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from device_link import (
+    CONFIG_ACK_PREFIX,
+    CONFIG_NAK_PREFIX,
+    CONFIG_PREFIX,
+    STATUS_PREFIX,
+    FrameBuffer,
+    encode_config,
+    encode_frame,
+    parse_config,
+)
+from feedback_service import split_message
+
+
+@dataclass
+class DeviceTiming:
+    time_scale: float = 0.01  # simulated seconds per physical second
+    delay_s: float = 0.0  # extra latency before each finish message (simulated seconds)
+    jitter_s: float = 0.0  # uniform +- jitter on the finish time (simulated seconds)
+    servo_s: float = 1.0  # ENABLE_SERVO until the servo is ready (simulated seconds)
+    water_std_n: float = 0.2  # force std while the carriage tows (N)
+    water_tau_s: float = 2.0  # decay time of the water motion after a run (simulated seconds)
+    water_ready_n: float = 0.02  # force std at which the oscillator pushes READY:WATER:<std> (N)
+
+
+@dataclass
+class DeviceFaults:
+    drop_finish: float = 0.0  # probability that a finish message is never sent
+    nak_config: float = 0.0  # probability that a CONFIG frame is answered with NAK:CONFIG
+    ack_delay_s: float = 0.0  # delay before each CONFIG ack (wall seconds)
+    disconnect: float = 0.0  # probability that the connection is closed after a frame
+    seed: Optional[int] = None
+
+
+@dataclass
+class ProtocolEvent:
+    t: float  # time.perf_counter()
+    device: str
+    kind: str  # 'recv' (command from the controller), 'finish' / 'ready' (feedback sent) or 'dropped'
+    message: str
+
+
+# ----------------------------- Server -----------------------------
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 64  # one-shot links open a connection per command
+
+
+class SimDevice:
+    """
+    One simulated device program; subclasses implement handle(action, payload).
+    """
+
+    kind = "device"
+
+    def __init__(
+        self,
+        feedback: Tuple[str, int],
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        timing: Optional[DeviceTiming] = None,
+        faults: Optional[DeviceFaults] = None,
+        supports_config: bool = True,
+        supports_status: bool = True,
+        log: Optional[List[ProtocolEvent]] = None,
+        log_lock: Optional[threading.Lock] = None,
+    ) -> None:
+        self.feedback = feedback
+        self.host = host
+        self.port = port
+        self.timing = timing or DeviceTiming()
+        self.faults = faults or DeviceFaults()
+        self.supports_config = supports_config
+        self.supports_status = supports_status  # STATUS replies and READY events
+        self.params: Dict[str, str] = {}
+        self.log = log if log is not None else []
+        self._log_lock = log_lock or threading.Lock()
+        self._rng = random.Random(self.faults.seed)
+
+        self.connections = 0
+        self.frames = 0
+        self.configs = 0
+        self.finishes_sent = 0
+        self.finishes_dropped = 0
+        self.status_queries = 0
+
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._timers: List[threading.Timer] = []
+        self._lock = threading.Lock()
+
+    # ----------------------------- Lifecycle -----------------------------
+
+    @property
+    def endpoint(self) -> Tuple[str, int]:
+        return (self.host, self.port)
+
+    def start(self) -> "SimDevice":
+        if self._server is not None:
+            return self
+        device = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self) -> None:
+                device._serve(self.request)
+
+        self._server = _Server((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"sim-{self.kind}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._lock:
+            timers, self._timers = self._timers, []
+        for t in timers:
+            t.cancel()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    # ----------------------------- Protocol -----------------------------
+
+    def _serve(self, sock: socket.socket) -> None:
+        self.connections += 1
+        frames = FrameBuffer("utf-8")
+        try:
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                for msg in frames.feed(data):
+                    if not self._on_frame(sock, msg):
+                        return
+            for msg in frames.flush():  # one-shot sender: unterminated command, then close
+                self._on_frame(sock, msg)
+        except OSError:
+            pass
+
+    def _on_frame(self, sock: socket.socket, message: str) -> bool:
+        """
+        Handle one command; returns False when the connection was dropped (fault injection).
+        """
+        self.frames += 1
+        self._record("recv", message)
+        if message.startswith(CONFIG_PREFIX) and self.supports_config:
+            self.configs += 1
+            params, actions = parse_config(message)
+            if self.faults.ack_delay_s:
+                time.sleep(self.faults.ack_delay_s)
+            if self._rng.random() < self.faults.nak_config:
+                sock.sendall(encode_frame(f"{CONFIG_NAK_PREFIX}:injected", "utf-8"))
+            else:
+                self.params.update(params)
+                sock.sendall(encode_frame(CONFIG_ACK_PREFIX + encode_config(params)[len(CONFIG_PREFIX):], "utf-8"))
+                for action in actions:
+                    self.handle(*split_message(action))
+        elif message.startswith(STATUS_PREFIX):
+            if self.supports_status:  # older device programs ignore status queries
+                self.status_queries += 1
+                key = message[len(STATUS_PREFIX):].strip().upper()
+                sock.sendall(encode_frame(f"{STATUS_PREFIX}{key}={self.status(key)}", "utf-8"))
+        elif message.startswith("SET_"):
+            action, payload = split_message(message)
+            self.params[action[len("SET_"):]] = payload or ""
+        elif not message.startswith(CONFIG_PREFIX):  # legacy device: CONFIG frames are ignored
+            self.handle(*split_message(message))
+        if self._rng.random() < self.faults.disconnect:
+            sock.close()
+            return False
+        return True
+
+    def handle(self, action: str, payload: Optional[str]) -> None:
+        raise NotImplementedError
+
+    def status(self, key: str) -> str:
+        """
+        Value of STATUS:<key> ('' for unknown keys).
+        """
+        return ""
+
+    def param(self, key: str, default: float = 0.0) -> float:
+        try:
+            return float(self.params.get(key, default))
+        except ValueError:
+            return default
+
+    # ----------------------------- Feedback -----------------------------
+
+    def _record(self, kind: str, message: str) -> None:
+        with self._log_lock:
+            self.log.append(ProtocolEvent(time.perf_counter(), self.kind, kind, message))
+
+    def finish_after(self, run_s: float, message: str) -> None:
+        """
+        Send `message` to the feedback listener after run_s simulated seconds (plus delay / jitter).
+        """
+        t = self.timing
+        delay = max(run_s + t.delay_s + self._rng.uniform(-t.jitter_s, t.jitter_s), 0.0) * t.time_scale
+        self._notify_later(delay, message, "finish")
+
+    def ready_after(self, run_s: float, key: str) -> None:
+        """
+        Push READY:<key> after run_s simulated seconds (devices with status support only).
+        """
+        if self.supports_status:
+            self._notify_later(max(run_s, 0.0) * self.timing.time_scale, f"READY:{key}", "ready")
+
+    def _notify_later(self, delay: float, message: str, kind: str) -> None:
+        timer = threading.Timer(delay, self._notify, args=(message, kind))
+        timer.daemon = True
+        with self._lock:
+            self._timers = [x for x in self._timers if x.is_alive()] + [timer]
+        timer.start()
+
+    def _notify(self, message: str, kind: str) -> None:
+        if kind == "finish" and self._rng.random() < self.faults.drop_finish:
+            self.finishes_dropped += 1
+            self._record("dropped", message)
+            return
+        try:
+            with socket.create_connection(self.feedback, timeout=5.0) as sock:
+                sock.sendall(encode_frame(message, "utf-8"))
+            if kind == "finish":
+                self.finishes_sent += 1
+            self._record(kind, message)
+        except OSError as e:
+            print(f"[WARN] Simulated {self.kind} could not send {message}: {e}")
+
+    def counters(self) -> Dict[str, int]:
+        return {
+            "connections": self.connections, "frames": self.frames, "configs": self.configs,
+            "finishes_sent": self.finishes_sent, "finishes_dropped": self.finishes_dropped,
+            "status_queries": self.status_queries,
+        }
+
+
+# ----------------------------- Devices -----------------------------
+
+
+class SimCarriage(SimDevice):
+    kind = "carriage"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.distance = 1.0
+        self.position = 0.0
+        self.enabled = False
+        self.run_s = 0.0  # simulated duration of the last move
+        self.servo_at = 0.0  # time.monotonic() at which the enabled servo is ready
+        self.run_end = -math.inf  # time.monotonic() at which the last move ends
+
+    def handle(self, action: str, payload: Optional[str]) -> None:
+        if action == "DISTANCE":
+            self.distance = float(payload or self.distance)
+        elif action in ("INIT", "RESET", "SETZERO"):
+            self.position = 0.0
+        elif action == "ENABLE_SERVO":
+            self.enabled = True
+            self.servo_at = time.monotonic() + self.timing.servo_s * self.timing.time_scale
+            self.ready_after(self.timing.servo_s, "SERVO")
+        elif action == "DISABLE_SERVO":
+            self.enabled = False
+        elif action in ("MOVE_POS", "MOVE_NEG"):
+            speed = max(abs(self.param("SPEED", 0.1)), 1e-6)
+            self.run_s = self.distance / speed
+            self.run_end = time.monotonic() + self.run_s * self.timing.time_scale
+            self.position = self.distance if action == "MOVE_POS" else -self.distance
+            self.finish_after(self.run_s, f"FINISHMOVE:{self.position}")
+
+    def status(self, key: str) -> str:
+        if key == "SERVO":
+            return "1" if self.enabled and time.monotonic() >= self.servo_at else "0"
+        return ""
+
+    def water_std(self) -> float:
+        """
+        Force std of the water motion: water_std_n while towing, exponential decay after the run.
+        """
+        t = self.timing
+        after_s = (time.monotonic() - self.run_end) / t.time_scale
+        if after_s < 0:
+            return t.water_std_n
+        return t.water_std_n * math.exp(-after_s / max(t.water_tau_s, 1e-9))
+
+
+class SimCamera(SimDevice):
+    kind = "camera"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.duration_s = 0.0
+        self.record_end = 0.0  # time.monotonic() at which the current recording ends
+
+    def handle(self, action: str, payload: Optional[str]) -> None:
+        if action == "CHANGETIME":
+            self.duration_s = float(payload or 0.0)
+        elif action == "AUTOPHOTO":
+            self.record_end = time.monotonic() + self.duration_s * self.timing.time_scale
+            self.ready_after(0.0, f"PHOTO:{payload}")
+            self.finish_after(self.duration_s, f"FINISHPHOTO:{payload}")
+        elif action == "STOPPHOTO":
+            name = (payload or "").strip()
+            self.record_end = 0.0
+            self.finish_after(0.0, f"FINISHPHOTO:{name}" if name else "FINISHPHOTO")
+
+    def status(self, key: str) -> str:
+        if key == "PHOTO":
+            return "1" if time.monotonic() < self.record_end else "0"
+        return ""
+
+
+class SimOscillator(SimDevice):
+    kind = "oscillator"
+
+    def __init__(
+        self,
+        *args: Any,
+        run_s: Optional[Callable[[], float]] = None,
+        water_std: Optional[Callable[[], float]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.run_s = run_s or (lambda: 1.0)  # simulated run duration of one case
+        self.water_std = water_std or (lambda: 0.0)  # force std over the last sampling window (N)
+        self.armed = False
+
+    def handle(self, action: str, payload: Optional[str]) -> None:
+        if action == "ENABLE_CONTROL":
+            self.armed = True
+            self.ready_after(0.0, "CONTROL")
+        elif action == "DISABLE_CONTROL":
+            self.armed = False
+        elif action == "MOVE":
+            if not self.armed:
+                print("[WARN] Simulated oscillator: MOVE before ENABLE_CONTROL")
+            run_s = self.run_s()
+            self.finish_after(run_s, f"FINISHCONTROL:{self.params.get('NAME', '')}")
+            t = self.timing
+            if 0 < t.water_ready_n < t.water_std_n:
+                settle_s = t.water_tau_s * math.log(t.water_std_n / t.water_ready_n)
+                self.ready_after(run_s + settle_s, f"WATER:{t.water_ready_n:.6g}")
+
+    def status(self, key: str) -> str:
+        if key == "CONTROL":
+            return "1" if self.armed else "0"
+        if key == "WATER":
+            return f"{self.water_std():.6g}"
+        return ""
+
+
+# ----------------------------- Fleet -----------------------------
+
+
+@dataclass
+class SimFleet:
+    """
+    Carriage, camera and oscillator on local ports, all reporting to one feedback listener.
+    """
+
+    feedback: Tuple[str, int]
+    host: str = "127.0.0.1"
+    timing: DeviceTiming = field(default_factory=DeviceTiming)
+    faults: DeviceFaults = field(default_factory=DeviceFaults)
+    supports_config: bool = True
+    supports_status: bool = True
+    log: List[ProtocolEvent] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        lock = threading.Lock()
+        common = dict(
+            host=self.host, timing=self.timing, faults=self.faults, supports_config=self.supports_config,
+            supports_status=self.supports_status, log=self.log, log_lock=lock,
+        )
+        self.carriage = SimCarriage(self.feedback, **common)
+        self.camera = SimCamera(self.feedback, **common)
+        self.oscillator = SimOscillator(
+            self.feedback, run_s=lambda: self.carriage.run_s, water_std=self.carriage.water_std, **common
+        )
+
+    @property
+    def devices(self) -> Tuple[SimDevice, ...]:
+        return (self.carriage, self.camera, self.oscillator)
+
+    def start(self) -> "SimFleet":
+        for d in self.devices:
+            d.start()
+        return self
+
+    def stop(self) -> None:
+        for d in self.devices:
+            d.stop()
+
+    def __enter__(self) -> "SimFleet":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        return {d.kind: d.counters() for d in self.devices}
@@ -0,0 +1,301 @@
+"""
+Transactional experiment ledger (embedded SQLite) for the condition table.
+
+Modules integrated:
+- One row per case keyed by its row number in the condition table, indexed by status
+- Append-only status events (pending -> running -> done / failed) with timestamps
+- Coefficients (Cv1, Ca1, Cv2, Ca2, Cdm) and run-file references per case
+- CSV import (upsert, one transaction) and atomic CSV export for the MATLAB steps
+
+Notes:
+- Status updates and pending lookups touch one indexed row instead of rewriting the
+  whole CSV; an interrupted campaign leaves the ledger consistent (WAL journal).
+- The CSV stays the exchange format with the compiled steps: export before a step,
+  import after it (new rows appended, coefficients refreshed).
+- Finished = 1 in the exported CSV means status 'done'. In a CSV written back by a step
+  (import_csv(..., from_step=True)) Finished is authoritative: Step4 resets it to 0 to ask
+  for a redo of a pair whose coefficients fail Errcoe, which reopens the case as pending.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATUSES = (PENDING, RUNNING, DONE, FAILED)
+
+COE_COLUMNS = ("Cv1", "Ca1", "Cv2", "Ca2", "Cdm")
+TEXT_COLUMNS = ("Name",)  # identifiers kept verbatim ('001' names the run file '*001.txt')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS cases (
+    row INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_s REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cases_status ON cases (status, row);
+CREATE INDEX IF NOT EXISTS cases_name ON cases (name);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    row INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    t_s REAL NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_row ON events (row);
+CREATE TABLE IF NOT EXISTS run_files (
+    row INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (row, kind)
+);
+"""
+
+
+def _parse(value: str) -> Any:
+    try:
+        f = float(value)
+    except ValueError:
+        return value
+    return int(f) if f.is_integer() and "." not in value and "e" not in value.lower() else f
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.15g}"
+    return "" if value is None else str(value)
+
+
+class ExperimentLedger:
+    """
+    SQLite-backed condition table shared by the serial and pipelined case runners.
+    """
+
+    def __init__(self, path: str, *, run_dir: Optional[str] = None) -> None:
+        self.path = path
+        self.run_dir = run_dir  # oscillator output folder; done cases get a '*<name>.txt' reference
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ExperimentLedger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        """
+        Explicit transaction on the autocommit connection: BEGIN IMMEDIATE ... COMMIT / ROLLBACK.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # ----------------------------- Columns -----------------------------
+
+    @property
+    def columns(self) -> List[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key='columns'").fetchone()
+        return json.loads(row["value"]) if row else []
+
+    def _merge_columns(self, conn: sqlite3.Connection, header: Sequence[str]) -> None:
+        cols = self.columns
+        merged = cols + [c for c in header if c not in cols]
+        if merged != cols:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('columns', ?)", (json.dumps(merged),))
+
+    # ----------------------------- CSV exchange -----------------------------
+
+    def import_csv(self, filename: str, *, from_step: bool = False) -> int:
+        """
+        Upsert the condition table: new rows are appended as pending (done if Finished != 0),
+        existing rows get their columns refreshed. Their status is kept, unless `from_step`
+        (the file is the export_csv output edited by a compiled step): then Finished decides,
+        done -> pending for 0 and -> done for 1, with an event. Returns new row count.
+        """
+        with open(filename, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            header = list(reader.fieldnames or [])
+            records = [
+                {k: v if k in TEXT_COLUMNS else _parse(v) for k, v in r.items() if k is not None} for r in reader
+            ]
+
+        now = time.time()
+        added = 0
+        with self._tx() as conn:
+            self._merge_columns(conn, header)
+            for row, rec in enumerate(records):
+                finished = rec.pop("Finished", 0)
+                status = DONE if finished not in (0, "", None) else PENDING
+                data = json.dumps(rec)
+                cur = conn.execute(
+                    "UPDATE cases SET name=?, data=? WHERE row=?", (str(rec.get("Name", row)), data, row)
+                )
+                if cur.rowcount and from_step:
+                    old = conn.execute("SELECT status FROM cases WHERE row=?", (row,)).fetchone()["status"]
+                    if (old == DONE) != (status == DONE):
+                        conn.execute("UPDATE cases SET status=?, updated_s=? WHERE row=?", (status, now, row))
+                        conn.execute(
+                            "INSERT INTO events (row, status, t_s, detail) VALUES (?, ?, ?, ?)",
+                            (row, status, now, f"Finished={finished} in {os.path.basename(filename)}"),
+                        )
+                if cur.rowcount == 0:
+                    conn.execute(
+                        "INSERT INTO cases (row, name, status, updated_s, data) VALUES (?, ?, ?, ?, ?)",
+                        (row, str(rec.get("Name", row)), status, now, data),
+                    )
+                    conn.execute(
+                        "INSERT INTO events (row, status, t_s, detail) VALUES (?, ?, ?, ?)",
+                        (row, status, now, f"import {os.path.basename(filename)}"),
+                    )
+                    added += 1
+        return added
+
+    def export_csv(self, filename: str) -> None:
+        """
+        Write the full table (Finished derived from status); replaced atomically.
+        """
+        cols = self.columns
+        tmp = f"{filename}.tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(cols)
+            for rec in self.rows():
+                writer.writerow([_fmt(rec.get(c)) for c in cols])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+
+    # ----------------------------- Queries -----------------------------
+
+    def _record(self, r: sqlite3.Row) -> Dict[str, Any]:
+        rec = json.loads(r["data"])
+        rec["Finished"] = 1 if r["status"] == DONE else 0
+        rec["row"] = r["row"]
+        rec["status"] = r["status"]
+        return rec
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """
+        All cases in table order; each dict has the CSV columns plus 'row' and 'status'.
+        """
+        with self._lock:
+            cur = self._conn.execute("SELECT row, status, data FROM cases ORDER BY row")
+            return [self._record(r) for r in cur.fetchall()]
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Cases not done yet (pending / failed / interrupted running), in table order.
+        """
+        sql = "SELECT row, status, data FROM cases WHERE status IN (?, ?, ?) ORDER BY row"
+        args: tuple = (PENDING, RUNNING, FAILED)
+        if limit is not None:
+            sql += " LIMIT ?"
+            args += (int(limit),)
+        with self._lock:
+            return [self._record(r) for r in self._conn.execute(sql, args).fetchall()]
+
+    def next_pending(self) -> Optional[Dict[str, Any]]:
+        found = self.pending(limit=1)
+        return found[0] if found else None
+
+    def status(self, row: int) -> Optional[str]:
+        with self._lock:
+            r = self._conn.execute("SELECT status FROM cases WHERE row=?", (int(row),)).fetchone()
+        return r["status"] if r else None
+
+    def events(self, row: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT status, t_s, detail FROM events WHERE row=? ORDER BY id", (int(row),)
+            )
+            return [dict(r) for r in cur.fetchall()]
+
+    def run_files(self, row: int) -> Dict[str, str]:
+        with self._lock:
+            cur = self._conn.execute("SELECT kind, path FROM run_files WHERE row=?", (int(row),))
+            return {r["kind"]: r["path"] for r in cur.fetchall()}
+
+    # ----------------------------- Updates -----------------------------
+
+    def set_status(self, row: int, status: str, detail: Optional[str] = None) -> None:
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status: {status}")
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute("UPDATE cases SET status=?, updated_s=? WHERE row=?", (status, now, int(row)))
+            if cur.rowcount == 0:
+                raise KeyError(f"No case at row {row}")
+            conn.execute(
+                "INSERT INTO events (row, status, t_s, detail) VALUES (?, ?, ?, ?)", (int(row), status, now, detail)
+            )
+
+    def start(self, row: int) -> None:
+        self.set_status(row, RUNNING)
+
+    def finish(self, row: int, name: Optional[str] = None) -> None:
+        """
+        Mark a case done; with run_dir set, also reference its oscillator output file.
+        """
+        self.set_status(row, DONE)
+        if self.run_dir and name:
+            self.add_run_file(row, "forceback", os.path.join(self.run_dir, f"*{name}.txt"))
+
+    def fail(self, row: int, detail: Optional[str] = None) -> None:
+        self.set_status(row, FAILED, detail)
+
+    def fail_running(self, detail: Optional[str] = None) -> List[int]:
+        """
+        Mark every case still 'running' as failed (after an interrupted batch).
+        """
+        with self._lock:
+            rows = [r["row"] for r in self._conn.execute("SELECT row FROM cases WHERE status=?", (RUNNING,))]
+        for row in rows:
+            self.fail(row, detail)
+        return rows
+
+    def set_coefficients(self, row: int, values: Dict[str, Any]) -> None:
+        unknown = set(values) - set(COE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown coefficient columns: {sorted(unknown)}")
+        with self._tx() as conn:
+            self._merge_columns(conn, COE_COLUMNS)
+            r = conn.execute("SELECT data FROM cases WHERE row=?", (int(row),)).fetchone()
+            if r is None:
+                raise KeyError(f"No case at row {row}")
+            rec = json.loads(r["data"])
+            rec.update({k: float(v) for k, v in values.items()})
+            conn.execute("UPDATE cases SET data=? WHERE row=?", (json.dumps(rec), int(row)))
+
+    def add_run_file(self, row: int, kind: str, path: str) -> None:
+        with self._tx() as conn:
+            conn.execute("INSERT OR REPLACE INTO run_files (row, kind, path) VALUES (?, ?, ?)", (int(row), kind, path))
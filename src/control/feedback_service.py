@@ -0,0 +1,238 @@
+"""
+Long-lived asyncio feedback service for device status messages.
+
+Modules integrated:
+- One listening socket for the whole campaign (bound once, no per-case rebind)
+- Concurrent device connections, framed messages assembled from partial reads
+- Dispatch of FINISHMOVE / FINISHPHOTO / FINISHCONTROL to per-case futures keyed by case name
+- READY:<KEY>[:value] readiness events recorded on a ReadinessBoard (readiness waits)
+
+Notes:
+- Messages are newline framed; a legacy sender that writes one unterminated message and
+  closes the connection is handled as one frame at EOF.
+- A finish message whose payload is a case name goes to that case; otherwise (e.g.
+  FINISHMOVE:<position>) it goes to the oldest case still waiting for that flag.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future, wait as wait_futures
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from device_link import FrameBuffer
+from readiness import ReadinessBoard
+from tracing import tracer
+
+
+FINISH_FLAGS: Tuple[str, ...] = ("FINISHMOVE", "FINISHPHOTO", "FINISHCONTROL")
+
+
+def split_message(message: str) -> Tuple[str, Optional[str]]:
+    """
+    'ACTION:payload' -> ('ACTION', 'payload'); 'ACTION' -> ('ACTION', None)
+    """
+    if ":" in message:
+        action, payload = message.split(":", 1)
+        return action.strip().upper(), payload.strip()
+    return message.strip().upper(), None
+
+
+@dataclass
+class CaseFeedback:
+    """
+    Finish flags of one case; each future resolves to the message payload (or None).
+    """
+
+    name: str
+    futures: Dict[str, Future] = field(default_factory=dict)
+
+    def pending(self, flag: str) -> bool:
+        fut = self.futures.get(flag)
+        return fut is not None and not fut.done()
+
+    def done(self) -> bool:
+        return all(f.done() for f in self.futures.values())
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """
+        Block until every flag arrived. Raises TimeoutError listing the missing flags.
+        """
+        with tracer.span("wait", "feedback", flags=" ".join(self.futures)):
+            _, not_done = wait_futures(list(self.futures.values()), timeout=timeout)
+        if not_done:
+            missing = [k for k, f in self.futures.items() if not f.done()]
+            raise TimeoutError(f"Case {self.name}: no {', '.join(missing)} within {timeout} s")
+        return {k: f.result() for k, f in self.futures.items()}
+
+
+class FeedbackService:
+    """
+    Asyncio TCP server running in a background thread for the lifetime of a campaign.
+    """
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 55001,
+        *,
+        on_message: Optional[Callable[[str], None]] = None,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.host = host
+        self.port = int(port)
+        self.on_message = on_message
+        self.encoding = encoding
+
+        self.messages_received = 0
+        self.connections_accepted = 0
+
+        self.ready = ReadinessBoard()
+        self._cases: List[CaseFeedback] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._start_error: Optional[BaseException] = None
+
+    # ----------------------------- Lifecycle -----------------------------
+
+    def start(self) -> "FeedbackService":
+        if self._thread is not None:
+            return self
+        self._ready.clear()
+        self._start_error = None
+        self._thread = threading.Thread(target=self._run, name="feedback-service", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._start_error is not None:
+            self._thread.join()
+            self._thread = None
+            raise self._start_error
+        return self
+
+    def stop(self) -> None:
+        loop, thread = self._loop, self._thread
+        if loop is None or thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        self._thread = None
+        print("[LISTEN] Feedback service closed.")
+
+    def __enter__(self) -> "FeedbackService":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, reuse_address=True)
+            )
+            sockets = self._server.sockets or []
+            if sockets:
+                self.port = sockets[0].getsockname()[1]
+            print(f"[LISTEN] Feedback service on {self.host}:{self.port}")
+        except BaseException as e:  # bind failure is reported to start()
+            self._start_error = e
+            self._ready.set()
+            loop.close()
+            self._loop = None
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            loop.run_until_complete(self._server.wait_closed())
+            tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+            for t in tasks:
+                t.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self._loop = None
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        addr = peer[0] if peer else "?"
+        self.connections_accepted += 1
+        frames = FrameBuffer(self.encoding)
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                for msg in frames.feed(data):
+                    self._on_frame(addr, msg)
+            for msg in frames.flush():
+                self._on_frame(addr, msg)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _on_frame(self, addr: str, message: str) -> None:
+        self.messages_received += 1
+        print(f"[RECV] {addr} -> {message}")
+        if self.on_message is not None:
+            try:
+                self.on_message(message)
+            except Exception as e:
+                print(f"[ERROR] Feedback handler failed for {message!r}: {e}")
+        if self.ready.feed(message):
+            tracer.instant("ready", message)
+            return
+        target = self.dispatch(message)
+        tracer.instant("feedback", split_message(message)[0], message=message, to=None if target is None else target.name)
+
+    # ----------------------------- Case futures -----------------------------
+
+    def expect(self, case_name: str, flags: Tuple[str, ...] = FINISH_FLAGS) -> CaseFeedback:
+        """
+        Register a case before its motion starts; returns the futures to wait on.
+        """
+        case = CaseFeedback(name=str(case_name), futures={flag: Future() for flag in flags})
+        with self._lock:
+            self._cases.append(case)
+        return case
+
+    def dispatch(self, message: str) -> Optional[CaseFeedback]:
+        """
+        Resolve the matching finish flag of the addressed (or oldest waiting) case.
+        """
+        action, payload = split_message(message)
+        flag = next((f for f in FINISH_FLAGS if action.startswith(f)), None)
+        if flag is None:
+            return None
+        with self._lock:
+            waiting = [c for c in self._cases if c.pending(flag)]
+            target = next((c for c in waiting if payload is not None and c.name == payload), None)
+            if target is None and waiting:
+                target = waiting[0]
+            if target is not None:
+                target.futures[flag].set_result(payload)
+                if target.done():
+                    self._cases.remove(target)
+        if target is None:
+            print(f"[WARN] {flag} received with no case waiting for it.")
+        return target
+
+    def cancel(self, case: CaseFeedback) -> None:
+        """
+        Drop a case that will not complete (e.g. after a timeout).
+        """
+        with self._lock:
+            if case in self._cases:
+                self._cases.remove(case)
+        for fut in case.futures.values():
+            fut.cancel()
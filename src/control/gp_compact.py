@@ -0,0 +1,325 @@
+"""
+Compact GPR surrogate files and a NumPy predictor (no MATLAB needed at query time).
+
+Modules integrated:
+- CompactGP: memory-mapped reader of the '.gpc' files written by data/export_gp_compact.m
+  (fitrgp models of data/GPR_Model_*.mat or incremental-engine models), opened on first query
+- Vectorized batched mean / sd prediction in bounded-size kernel blocks
+- LRU cache of recently queried points (repeated points are answered without kernel work)
+- write_compact: writes the same layout from NumPy arrays
+
+Notes:
+- Layout: MAGIC | arrays (column-major, little-endian float32/float64) | footer JSON |
+  footer offset (uint64) | MAGIC, like the '.fsirun' run files.
+- Inputs are in the original units and column order of the model (e.g. [Vr, MassRatio, Damp, Re]
+  for GPR_Model_Free_4DIM); sd includes the noise term like predict() of fitrgp.
+- Triangular solves use scipy when it is installed; otherwise the inverse of the Cholesky
+  factor is formed once on first use.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from scipy.linalg import solve_triangular
+except ImportError:  # numpy-only installs
+    solve_triangular = None
+
+
+MAGIC = b"FSIGPC1\0"
+SUFFIX = ".gpc"
+KERNELS = ("squaredexponential", "exponential", "matern32", "matern52", "rationalquadratic")
+BASES = ("none", "constant", "linear", "purequadratic", "poly2")
+
+
+# ----------------------------- Kernels / bases -----------------------------
+
+
+def kernel(name: str, X1: np.ndarray, X2: np.ndarray, ell: np.ndarray, sf: float, rq_alpha: float = 1.0) -> np.ndarray:
+    """
+    Stationary kernel matrix (len(X1), len(X2)); ell is one length scale or one per input (ARD).
+    """
+    A = X1 / ell
+    B = X2 / ell
+    D2 = np.maximum((A * A).sum(1)[:, None] + (B * B).sum(1)[None, :] - 2.0 * (A @ B.T), 0.0)
+    sf2 = sf * sf
+    if name == "squaredexponential":
+        return sf2 * np.exp(-0.5 * D2)
+    if name == "exponential":
+        return sf2 * np.exp(-np.sqrt(D2))
+    if name == "matern32":
+        R = np.sqrt(3.0 * D2)
+        return sf2 * (1.0 + R) * np.exp(-R)
+    if name == "matern52":
+        R = np.sqrt(5.0 * D2)
+        return sf2 * (1.0 + R + R * R / 3.0) * np.exp(-R)
+    if name == "rationalquadratic":
+        return sf2 * (1.0 + D2 / (2.0 * rq_alpha)) ** (-rq_alpha)
+    raise ValueError(f"Unknown kernel: {name}")
+
+
+def basis(name: str, X: np.ndarray) -> np.ndarray:
+    """
+    Explicit basis rows; 'poly2' matches [1, polynomialBasis(X, 2)] of the MATLAB engine.
+    """
+    n, d = X.shape
+    one = np.ones((n, 1))
+    if name == "none":
+        return np.zeros((n, 0))
+    if name == "constant":
+        return one
+    if name == "linear":
+        return np.hstack([one, X])
+    if name == "purequadratic":
+        return np.hstack([one, X, X * X])
+    if name == "poly2":
+        blocks = np.stack([X, X * X, np.zeros_like(X)], axis=2)  # per input: x, x^2, 0
+        return np.hstack([one, blocks.reshape(n, 3 * d)])
+    raise ValueError(f"Unknown basis: {name}")
+
+
+# ----------------------------- Writer -----------------------------
+
+
+def write_compact(
+    path: str,
+    *,
+    X: np.ndarray,
+    alpha: np.ndarray,
+    L: np.ndarray,
+    kernel: str,
+    ell: Any,
+    sf: float,
+    sn: float,
+    beta: Optional[np.ndarray] = None,
+    basis: str = "none",
+    rq_alpha: float = 1.0,
+    xloc: Any = 0.0,
+    xscale: Any = 1.0,
+    ymu: Any = 0.0,
+    ysd: Any = 1.0,
+    Lb: Optional[np.ndarray] = None,
+    dtype: str = "float64",
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Write a '.gpc' file (same layout as export_gp_compact.m); returns the footer.
+    """
+    if kernel not in KERNELS or basis not in BASES:
+        raise ValueError(f"Unsupported kernel/basis: {kernel}/{basis}")
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    alpha = np.asarray(alpha, dtype=float).reshape(X.shape[0], -1)
+    beta = np.zeros((0, alpha.shape[1])) if beta is None else np.asarray(beta, dtype=float).reshape(-1, alpha.shape[1])
+    arrays = {"X": X, "alpha": alpha, "beta": beta, "L": np.asarray(L, dtype=float)}
+    if Lb is not None:
+        arrays["Lb"] = np.asarray(Lb, dtype=float)
+    code = "<f4" if dtype == "float32" else "<f8"
+    table: Dict[str, Dict[str, Any]] = {}
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for name, A in arrays.items():
+            table[name] = {"offset": f.tell(), "shape": list(A.shape)}
+            f.write(np.asarray(A, dtype=code).tobytes(order="F"))
+            f.write(b"\0" * (-f.tell() % 8))  # 8-byte alignment
+        footer = dict(meta or {})
+        footer.update({
+            "format": "fsigpc", "version": 1, "kernel": kernel, "ell": np.ravel(ell).tolist(), "sf": float(sf),
+            "rq_alpha": float(rq_alpha), "sn": float(sn), "basis": basis,
+            "xloc": np.ravel(xloc).tolist(), "xscale": np.ravel(xscale).tolist(),
+            "ymu": np.ravel(ymu).tolist(), "ysd": np.ravel(ysd).tolist(),
+            "n": int(X.shape[0]), "d": int(X.shape[1]), "outputs": int(alpha.shape[1]),
+            "dtype": "float32" if code == "<f4" else "float64", "order": "F", "arrays": table,
+        })
+        offset = f.tell()
+        f.write(json.dumps(footer).encode("utf-8"))
+        f.write(struct.pack("<Q", offset))
+        f.write(MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return footer
+
+
+# ----------------------------- Predictor -----------------------------
+
+
+class CompactGP:
+    """
+    NumPy predictor for one '.gpc' file; predict() takes a (m, d) batch of points.
+    """
+
+    def __init__(self, path: str, *, cache_size: int = 4096, block: int = 2048) -> None:
+        self.path = path
+        self.cache_size = cache_size
+        self.block = block  # query points per kernel block (bounds the (n, block) temporaries)
+        self.hits = 0
+        self.misses = 0
+        self.meta: Dict[str, Any] = {}
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._Linv: Dict[str, np.ndarray] = {}
+        self._cache: "OrderedDict[bytes, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    # ----------------------------- File -----------------------------
+
+    def open(self) -> "CompactGP":
+        """
+        Map the file and parse the footer (done automatically on the first query).
+        """
+        with self._lock:
+            if self._map is not None:
+                return self
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            tail = len(MAGIC) + 8
+            if self._map[: len(MAGIC)] != MAGIC or self._map[-len(MAGIC) :] != MAGIC:
+                self.close()
+                raise RuntimeError(f"Not a complete compact GP file: {self.path}")
+            (offset,) = struct.unpack("<Q", self._map[-tail : -len(MAGIC)])
+            meta = json.loads(self._map[offset:-tail].decode("utf-8"))
+            code = "<f4" if meta["dtype"] == "float32" else "<f8"
+            arrays = {}
+            for name, entry in meta["arrays"].items():
+                shape = tuple(int(s) for s in entry["shape"])
+                A = np.ndarray(shape, dtype=code, buffer=self._map, offset=int(entry["offset"]), order="F")
+                arrays[name] = A if code == "<f8" else A.astype(float)  # float32 files are widened once
+            self.meta, self._arrays = meta, arrays
+            self.kernel = meta["kernel"]
+            self.basis = meta["basis"]
+            self.ell = np.atleast_1d(np.asarray(meta["ell"], dtype=float))
+            self.sf = float(meta["sf"])
+            self.sn = float(meta["sn"])
+            self.rq_alpha = float(meta.get("rq_alpha", 1.0))
+            self.xloc = np.atleast_1d(np.asarray(meta["xloc"], dtype=float))
+            self.xscale = np.atleast_1d(np.asarray(meta["xscale"], dtype=float))
+            self.ymu = np.atleast_1d(np.asarray(meta["ymu"], dtype=float))
+            self.ysd = np.atleast_1d(np.asarray(meta["ysd"], dtype=float))
+            self.n, self.d, self.outputs = int(meta["n"]), int(meta["d"]), int(meta.get("outputs", 1))
+            return self
+
+    def close(self) -> None:
+        with self._lock:
+            self._arrays, self._Linv = {}, {}
+            if self._map is not None:
+                try:
+                    self._map.close()
+                except BufferError:  # arrays handed out by predict() still reference the map
+                    pass
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "CompactGP":
+        return self.open()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ----------------------------- Prediction -----------------------------
+
+    def _tri_solve(self, name: str, B: np.ndarray) -> np.ndarray:
+        """
+        L \\ B for a stored lower Cholesky factor.
+        """
+        L = self._arrays[name]
+        if solve_triangular is not None:
+            return solve_triangular(L, B, lower=True, check_finite=False)
+        if name not in self._Linv:
+            self._Linv[name] = np.linalg.inv(L)
+        return self._Linv[name] @ B
+
+    def _compute(self, Xq: np.ndarray, with_sd: bool) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        a = self._arrays
+        X, alpha, beta = a["X"], a["alpha"], a["beta"]
+        mu = np.empty((len(Xq), self.outputs))
+        sd = np.empty((len(Xq), self.outputs)) if with_sd else None
+        sf2, sn2 = self.sf * self.sf, self.sn * self.sn
+        for s in range(0, len(Xq), self.block):
+            Xs = (Xq[s : s + self.block] - self.xloc) / self.xscale
+            Ks = kernel(self.kernel, X, Xs, self.ell, self.sf, self.rq_alpha)  # (n, block)
+            m = Ks.T @ alpha
+            if beta.size:
+                m += basis(self.basis, Xs) @ beta
+            mu[s : s + len(Xs)] = m * self.ysd + self.ymu
+            if with_sd:
+                var_f = sf2 - (self._tri_solve("L", Ks) ** 2).sum(0)  # stationary kernel: k(x,x) = sf^2
+                if "Lb" in a:  # FITC / VFE
+                    var_f += (self._tri_solve("Lb", Ks) ** 2).sum(0)
+                sd[s : s + len(Xs)] = np.sqrt(np.maximum(var_f, 0.0) + sn2)[:, None] * self.ysd
+        return mu, sd
+
+    def predict(self, Xq: Any, *, return_sd: bool = True, use_cache: bool = True) -> Any:
+        """
+        Mean (and sd) at the rows of Xq -> (m,) arrays, or (m, outputs) for multi-output models.
+
+        Cached points are looked up by their exact float64 values; only the misses are
+        computed, in one vectorized batch.
+        """
+        self.open()
+        Xq = np.atleast_2d(np.asarray(Xq, dtype=float))
+        if Xq.shape[1] != self.d:
+            raise ValueError(f"Expected {self.d} input columns, got {Xq.shape[1]}")
+        if not use_cache or self.cache_size <= 0:
+            mu, sd = self._compute(Xq, return_sd)
+        else:
+            mu, sd = self._cached(Xq)
+        if self.outputs == 1:
+            mu = mu[:, 0]
+            sd = None if sd is None else sd[:, 0]
+        return (mu, sd) if return_sd else mu
+
+    def _cached(self, Xq: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        Xq = np.ascontiguousarray(Xq)
+        keys = [row.tobytes() for row in Xq]
+        mu = np.empty((len(Xq), self.outputs))
+        sd = np.empty((len(Xq), self.outputs))
+        missing: Dict[bytes, list] = {}
+        with self._lock:
+            for i, k in enumerate(keys):
+                hit = self._cache.get(k)
+                if hit is None:
+                    missing.setdefault(k, []).append(i)
+                else:
+                    self._cache.move_to_end(k)
+                    mu[i], sd[i] = hit
+            self.hits += len(keys) - sum(len(v) for v in missing.values())
+            self.misses += len(missing)
+        if missing:
+            rows = [v[0] for v in missing.values()]
+            new_mu, new_sd = self._compute(Xq[rows], True)
+            with self._lock:
+                for j, (k, idx) in enumerate(missing.items()):
+                    mu[idx], sd[idx] = new_mu[j], new_sd[j]
+                    self._cache[k] = (new_mu[j].copy(), new_sd[j].copy())
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return mu, sd
+
+    def cache_info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache), "max_size": self.cache_size}
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+
+def load_compact(path: str, **kwargs: Any) -> CompactGP:
+    """
+    CompactGP for a '.gpc' file (mapped on first query).
+    """
+    return CompactGP(path, **kwargs)
@@ -2,34 +2,70 @@
 Automated experimental control program for rigid-cylinder FSI experiments.
 
 Modules integrated:
-- TCP command sender (towing / camera / actuator)
-- TCP listener (status feedback from devices)
+- TCP command sender (towing / camera / actuator) over pooled persistent links
+- Batched CONFIG frames (one acknowledged round trip per device per case)
+- Campaign-long asyncio feedback service (status feedback from devices)
+- Pipelined case scheduler (device preparation overlapped across cases)
 - Towing carriage control
 - Camera control
 - Forced oscillation control
-- MATLAB-compiled optimization interface (AnalysisOptimize)
+- MATLAB-compiled optimization interface (AnalysisOptimize) on a warm runtime session
+- In-memory GPR step (parameter dicts + training arrays in, next points out)
+- SQLite experiment ledger (per-case status transitions instead of whole-CSV rewrites)
+- Streaming coefficient extraction (oscillator file tailed during the run)
+- Per-case phase tracing (commands, waits, feedback, CSV saves, MATLAB steps) with a
+  Chrome trace-file export and a per-phase summary table
+- Readiness-driven waits (servo enabled + water settled instead of a fixed pre-enable
+  sleep; optional oscillator-armed / camera-recording holds), old waits as upper bounds
+- Streaming convergence monitor (ErrFinal / Conv_thresh / Windowvalue updated with every
+  finished case pair and GPR step; advisory, logged next to the judge_next decision)
+- Rig builder and per-rig campaign (own devices, listener port, case table and folder) for
+  the multi-rig Orchestrator
 
 Notes:
 - Input tables and parameters are written as plain text and CSV.
-- The listener waits for three finish flags: FINISHMOVE / FINISHPHOTO / FINISHCONTROL.
+- Each case waits for three finish flags: FINISHMOVE / FINISHPHOTO / FINISHCONTROL.
 """
 
 from __future__ import annotations
 
-import socket
-import threading
+import os
 import time
-from dataclasses import dataclass
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import asdict, dataclass
+from functools import partial
 from typing import Any, Dict, Optional, Tuple, List
 
 import pandas as pd
 
 import AnalysisOptimize as AnalyOpti
 
+from case_scheduler import StepScheduler, format_case_report
+from coeff_stream import COE_NAMES, CoefficientStream, CoefficientStreams
+from convergence import (
+    ConvergenceMonitor,
+    Expectation,
+    PredictionSummary,
+    load_step5,
+    save_step5,
+    summarize_step5,
+)
+from device_link import ConnectionPool, DeviceLink
+from experiment_ledger import ExperimentLedger
+from run_store import RunStore
+from feedback_service import CaseFeedback, FeedbackService, split_message
+from optimizer_session import GPR_PRE_CORE, READ_RUN, OptimizerSession
+from readiness import ReadinessConfig, ReadinessProbe
+from rig import Orchestrator, Rig
+from tracing import tracer
+
 
 # ----------------------------- Low-level TCP sender -----------------------------
 
 
+device_pool = ConnectionPool()
+
+
 def send_command(
     ip: str,
     port: int,
@@ -41,183 +77,196 @@ def send_command(
     encoding: str = "ascii",
 ) -> None:
     """
-    Send a single TCP command to (ip, port).
-
-    - Adds socket timeout
-    - Adds small retry to reduce transient network failures
-    """
-    last_err: Optional[Exception] = None
-    for attempt in range(retries + 1):
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(timeout_s)
-                sock.connect((ip, port))
-                sock.sendall(command.encode(encoding))
-                print(f"[SEND] {ip}:{port} -> {command}")
-                return
-        except Exception as e:
-            last_err = e
-            if attempt < retries:
-                time.sleep(retry_delay_s)
-            else:
-                print(f"[ERROR] Sending failed: {ip}:{port} -> {command} | {e}")
-                return
+    Send a single TCP command to (ip, port) through the shared device pool.
 
+    - Reuses one long-lived socket per device (see device_link.DeviceLink)
+    - Reconnects transparently, with small retry, when the link is broken
+    - Options only apply when the device link is created on first use
+    """
+    link = device_pool.link(
+        ip, port, timeout_s=timeout_s, retries=retries, retry_delay_s=retry_delay_s, encoding=encoding
+    )
+    try:
+        link.send(command)
+        print(f"[SEND] {ip}:{port} -> {command}")
+    except OSError as e:
+        print(f"[ERROR] Sending failed: {ip}:{port} -> {command} | {e}")
 
-# ----------------------------- Listener / Feedback -----------------------------
+
+def configure_command(
+    ip: str,
+    port: int,
+    params: Dict[str, Any],
+    actions: Tuple[str, ...] = (),
+) -> Dict[str, str]:
+    """
+    Send all parameters (then actions) as one batched CONFIG frame and verify the ack.
+
+    - One round trip per device instead of one connect per SET_* command
+    - Falls back to SET_<key>:<value> commands when the device does not acknowledge CONFIG
+    - Raises ConfigError when the device applied different values
+    """
+    link = device_pool.link(ip, port)
+    try:
+        applied = link.configure(params, actions)
+    except OSError as e:
+        print(f"[ERROR] Config failed: {ip}:{port} -> {params} {list(actions)} | {e}")
+        return {}
+    mode = "CONFIG" if link.supports_config else "SEND"
+    print(f"[{mode}] {ip}:{port} -> {applied} {list(actions)}")
+    return applied
 
 
-stopMoving_event = threading.Event()
-stopRecoding_event = threading.Event()
-stopControl_event = threading.Event()
+def register_endpoint(endpoint: Dict[str, Any]) -> DeviceLink:
+    """
+    Register a device link ({"ip", "port", "persistent"}).
+
+    CONFIG acknowledgements need a persistent link: a one-shot link sends the same setup as
+    SET_* commands without verifying the applied values, and says so here once.
+    """
+    link = device_pool.register(endpoint["ip"], int(endpoint["port"]), persistent=endpoint["persistent"])
+    if not link.persistent:
+        print(f"[WARN] {link.ip}:{link.port} is a one-shot link: CONFIG acks are not verified (SET_* commands)")
+    return link
 
 
-def start_server(
+# ----------------------------- Listener / Feedback -----------------------------
+
+
+def make_feedback_service(
     tuoche_obj: "TowingCarriage",
     shexiang_obj: "CameraController",
     forceback_obj: "ForcedOscillationController",
     *,
     host: str = "0.0.0.0",
     port: int = 55001,
-    accept_timeout_s: float = 5.0,
-) -> None:
+) -> FeedbackService:
     """
-    TCP listener for device status feedback.
+    Campaign-long feedback listener; every message also updates the controller states.
 
-    Expected messages:
+    Expected messages (the service resolves the finish flags of the waiting case):
       - FINISHPHOTO
       - FINISHMOVE:<position>
       - FINISHCONTROL
     """
-    stopMoving_event.clear()
-    stopRecoding_event.clear()
-    stopControl_event.clear()
 
-    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    try:
-        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_sock.bind((host, port))
-        server_sock.listen(5)
-        server_sock.settimeout(accept_timeout_s)
-
-        print(f"[LISTEN] Listening on {host}:{port}")
-
-        while not (
-            stopMoving_event.is_set()
-            and stopRecoding_event.is_set()
-            and stopControl_event.is_set()
-        ):
-            print(
-                f"[STATUS] towing={stopMoving_event.is_set()} | "
-                f"recording={stopRecoding_event.is_set()} | "
-                f"control={stopControl_event.is_set()}"
-            )
-            try:
-                client_socket, client_address = server_sock.accept()
-                with client_socket:
-                    msg = client_socket.recv(1024).decode("utf-8", errors="ignore").strip()
-                    if msg:
-                        print(f"[RECV] {client_address[0]} -> {msg}")
-                        process_command(msg, tuoche_obj, shexiang_obj, forceback_obj)
-            except socket.timeout:
-                continue
+    def on_message(message: str) -> None:
+        action, payload = split_message(message)
+        if action.startswith("FINISHPHOTO"):
+            shexiang_obj.photostatus = False
+        elif action.startswith("FINISHMOVE"):
+            tuoche_obj.movestatus = False
+            if payload is not None:
+                try:
+                    tuoche_obj.position = float(payload)
+                except ValueError:
+                    pass
+        elif action.startswith("FINISHCONTROL"):
+            forceback_obj.movestatus = False
 
-        print("[LISTEN] Listener closed (all finish flags received).")
-
-    except Exception as e:
-        print(f"[ERROR] Listener error: {e}")
-    finally:
-        try:
-            server_sock.close()
-        except Exception:
-            pass
+    return FeedbackService(host, port, on_message=on_message)
 
 
-def process_command(
-    message: str,
-    tuoche_obj: "TowingCarriage",
-    shexiang_obj: "CameraController",
-    forceback_obj: "ForcedOscillationController",
-) -> None:
-    """
-    Parse feedback messages and set finish flags + update states.
-    """
-    if ":" in message:
-        action, payload = message.split(":", 1)
-        payload = payload.strip()
-    else:
-        action, payload = message.strip(), None
-
-    action_u = action.upper()
-
-    if action_u.startswith("FINISHPHOTO"):
-        shexiang_obj.photostatus = False
-        stopRecoding_event.set()
-
-    elif action_u.startswith("FINISHMOVE"):
-        tuoche_obj.movestatus = False
-        if payload is not None:
-            try:
-                tuoche_obj.position = float(payload)
-            except ValueError:
-                pass
-        stopMoving_event.set()
+# ----------------------------- MATLAB-compiled interface -----------------------------
 
-    elif action_u.startswith("FINISHCONTROL"):
-        forceback_obj.movestatus = False
-        stopControl_event.set()
 
+# What the installed AnalysisOptimize build was compiled with (optimizer_session.GPR_PRE_CORE,
+# READ_RUN, STEP_FOLDER); none means the file-based steps of older builds.
+PACKAGE_CAPABILITIES: Tuple[str, ...] = ()
 
-# ----------------------------- MATLAB-compiled interface -----------------------------
+optimizer = OptimizerSession(AnalyOpti, capabilities=PACKAGE_CAPABILITIES)  # runtime started once, kept warm
 
 
 def create_input0(stepn: int, filenametxt: str, filenamecsv: str) -> None:
     """
     Generate initial condition table (CSV) using MATLAB-compiled package.
     """
-    pkg = AnalyOpti.initialize()
-    try:
-        pkg.Step0_Total_program(stepn, filenametxt, filenamecsv, "", "")
-    finally:
-        pkg.terminate()
+    optimizer.step(stepn, filenametxt, filenamecsv)
 
 
 def deal_create_coeff(stepn: int, filenametxt: str, filenamecsv: str, filenamestorematlab: str) -> None:
     """
     Process experiment data, compute coefficients, write back to CSV, etc.
     """
-    pkg = AnalyOpti.initialize()
-    try:
-        pkg.Step0_Total_program(stepn, filenametxt, filenamecsv, filenamestorematlab, "")
-    finally:
-        pkg.terminate()
+    optimizer.step(stepn, filenametxt, filenamecsv, filenamestorematlab)
 
 
 def gpr_predict(stepn: int, filenametxt: str, filenamecsv: str, file_pretxt1: str) -> None:
     """
     Run GPR prediction using MATLAB-compiled package.
     """
-    pkg = AnalyOpti.initialize()
-    try:
-        pkg.Step0_Total_program(stepn, filenametxt, filenamecsv, "", file_pretxt1)
-    finally:
-        pkg.terminate()
+    optimizer.step(stepn, filenametxt, filenamecsv, "", file_pretxt1)
 
 
 def judge_next(stepn: int, filenametxt: str, filenamecsv: str) -> int:
     """
     Decide whether to stop (return flag).
     """
-    pkg = AnalyOpti.initialize()
+    stop_flag = optimizer.step(stepn, filenametxt, filenamecsv)
+    # Some MATLAB runtimes return non-python int; cast robustly:
     try:
-        stop_flag = pkg.Step0_Total_program(stepn, filenametxt, filenamecsv, "", "")
-        # Some MATLAB runtimes return non-python int; cast robustly:
-        try:
-            return int(stop_flag)
-        except Exception:
-            return 0
-    finally:
-        pkg.terminate()
+        return int(stop_flag)
+    except Exception:
+        return 0
+
+
+# ----------------------------- In-memory exchange -----------------------------
+
+
+COE_COLUMNS = ["Cv1", "Ca1", "Cv2", "Ca2", "Cdm"]
+X_COLUMNS = ["A1non", "f1non", "A2non", "f2non", "Theta", "Speed"]
+
+# XtrainType -> training input columns (same map as xtrain_columns in GPR_Pre_core.m)
+XTRAIN_COLUMNS: Dict[int, List[str]] = {
+    1: ["A1non", "f1non"],
+    2: ["A2non", "f2non"],
+    3: ["A1non", "f1non", "A2non", "f2non", "Theta"],
+    4: ["A1non", "f1non", "Speed"],
+    5: ["A2non", "f2non", "Speed"],
+    6: X_COLUMNS,
+}
+
+
+@dataclass
+class GprPrediction:
+    next_point_write: List[List[float]]  # rows of [A1, f1, A2, f2, theta, U]
+    next_point_cal: List[List[float]]
+    y_pre_data: List[List[float]]
+    y_pre_err: List[List[float]]
+    y_pre_sco: List[List[float]]
+    x_pre_data: List[List[float]]
+    y_train: List[List[float]]
+    stats: Any = None  # tiled runs: summary statistics (grid arrays written to out_dir instead)
+
+
+def training_arrays(conditionlist: pd.DataFrame, xtrain_type: int) -> Tuple[List[List[float]], List[List[float]]]:
+    """
+    (csv_coe, x_train) straight from the condition table:
+    csv_coe = Cv1..Cdm of all rows (forward/backward alternating),
+    x_train = inputs of the forward rows (one per condition pair).
+    """
+    coe = conditionlist[COE_COLUMNS].astype(float).values.tolist()
+    forward = conditionlist.iloc[0::2]
+    x_train = forward[XTRAIN_COLUMNS[int(xtrain_type)]].astype(float).values.tolist()
+    return coe, x_train
+
+
+def gpr_predict_arrays(
+    params0: Dict[str, Any],
+    params1: Dict[str, Any],
+    conditionlist: pd.DataFrame,
+    out_dir: str = "",
+    session: Optional[OptimizerSession] = None,
+) -> GprPrediction:
+    """
+    GPR step without file round-trips: dicts become MATLAB structs, arrays matlab.double.
+    Tiled runs (GridTile > 0) write their grid arrays into out_dir.
+    """
+    csv_coe, x_train = training_arrays(conditionlist, params1["XtrainType"])
+    out = (session or optimizer).call_arrays(
+        "GPR_Pre_core", params0, params1, csv_coe, x_train, out_dir, nargout=8, label="step5"
+    )
+    return GprPrediction(*out)
 
 
 # ----------------------------- Utilities -----------------------------
@@ -240,8 +289,139 @@ def changedata(df: pd.DataFrame, row_idx: int, col_names: List[str], col_values:
         df.loc[row_idx, name] = val
 
 
-def timeinterval(seconds: float) -> None:
-    time.sleep(seconds)
+def timeinterval(seconds: float, label: str = "sleep") -> None:
+    with tracer.span("wait", label, seconds=seconds):
+        time.sleep(seconds)
+
+
+def link_of(device: Any) -> DeviceLink:
+    return device_pool.link(device.ip, device.port)
+
+
+def wait_settled(
+    probe: ReadinessProbe,
+    tow: "TowingCarriage",
+    osc: "ForcedOscillationController",
+    since: float,
+    moved: float,
+    timeout_s: float,
+) -> bool:
+    """
+    Servo enabled after `since` and water settled after the last carriage move (`moved`);
+    pre_enable_wait_s is the upper bound.
+    """
+    tow_link, osc_link = link_of(tow), link_of(osc)
+    return probe.wait(
+        lambda: probe.servo_enabled(tow_link, since) and probe.water_settled(osc_link, moved),
+        timeout_s,
+        "servo_settle",
+    )
+
+
+def wait_device(probe: ReadinessProbe, condition, device: Any, since: float, timeout_s: float, label: str) -> None:
+    """
+    Optional hold until a device reports ready (timeout_s <= 0: no hold, as before).
+    """
+    if timeout_s > 0:
+        link = link_of(device)
+        probe.wait(lambda: condition(link, since), timeout_s, label)
+
+
+def load_conditions(filename: str, ledger: Optional[ExperimentLedger] = None) -> pd.DataFrame:
+    """
+    Condition table from the ledger (index = ledger row) or, without a ledger, from the CSV.
+    """
+    if ledger is None:
+        return pd.read_csv(filename, dtype={"Name": str})
+    return pd.DataFrame(ledger.rows()).set_index("row")
+
+
+def mark_finished(
+    conditionlist: pd.DataFrame, row_idx: int, name: str, filename: str, ledger: Optional[ExperimentLedger] = None
+) -> None:
+    """
+    Finished=1 for one case: one ledger row update, or (no ledger) rewrite of the whole CSV.
+    """
+    changedata(conditionlist, row_idx, ["Finished"], [1])
+    with tracer.span("save", "ledger" if ledger is not None else "csv"):
+        if ledger is not None:
+            ledger.finish(row_idx, name)
+        else:
+            conditionlist.to_csv(filename, index=False, encoding="utf-8")
+
+
+def open_coeff_stream(
+    streams: Optional[CoefficientStreams], conditionlist: pd.DataFrame, row_idx: int
+) -> Optional[CoefficientStream]:
+    """
+    Start tailing the oscillator file of a case (before ENABLE_CONTROL creates it).
+    """
+    if streams is None:
+        return None
+    condition = conditionlist.loc[row_idx]
+    cf_cl = int(any(float(conditionlist.loc[k, "A1"]) != 0 for k in conditionlist.index))
+    il_cl = int(any(float(conditionlist.loc[k, "A2"]) != 0 for k in conditionlist.index))
+    direction = condition.get("Direction")
+    return streams.open(
+        str(condition["Name"]),
+        float(condition["Speed"]),
+        cf_cl=cf_cl,
+        il_cl=il_cl,
+        direction=None if direction is None else int(float(direction)),
+    )
+
+
+def store_coefficients(
+    stream: Optional[CoefficientStream],
+    conditionlist: pd.DataFrame,
+    row_idx: int,
+    ledger: Optional[ExperimentLedger] = None,
+) -> Optional[List[float]]:
+    """
+    Finish a case stream (after FINISHCONTROL) and keep Cv1..Cdm; Step4 recomputes on failure.
+    Returns the coefficients (None without a stream or when extraction failed).
+    """
+    if stream is None:
+        return None
+    try:
+        with tracer.span("coeff", stream.name):
+            coe = stream.finish()
+    except Exception as e:
+        stream.cancel()
+        print(f"[WARN] Streaming coefficients of {stream.name} failed: {e}")
+        return None
+    changedata(conditionlist, row_idx, list(COE_NAMES), coe)
+    if ledger is not None:
+        ledger.set_coefficients(row_idx, dict(zip(COE_NAMES, coe)))
+    return coe
+
+
+def monitor_case(
+    monitor: Optional[ConvergenceMonitor], conditionlist: pd.DataFrame, row_idx: int, coe: Optional[List[float]]
+) -> None:
+    """
+    Feed a finished case to the convergence monitor (rows alternate forward / backward per pair).
+    """
+    if monitor is None:
+        return
+    pos = conditionlist.index.get_loc(row_idx)
+    row = conditionlist.loc[row_idx]
+    # without the non-dimensional columns (not yet written by Step1) the pair is not compared to a prediction
+    x = [float(row[c]) for c in monitor.inputs] if all(c in row.index for c in monitor.inputs) else []
+    monitor.add_coefficients(pos // 2, pos % 2 == 0, x, coe)
+
+
+def ledger_step(ledger: Optional[ExperimentLedger], filenamecsv: str, fn, *args: Any) -> Any:
+    """
+    Run a compiled step on the CSV: export the ledger before, import the step's edits after
+    (including Finished = 0 redo requests of Step4).
+    """
+    if ledger is not None:
+        ledger.export_csv(filenamecsv)
+    result = fn(*args)
+    if ledger is not None:
+        ledger.import_csv(filenamecsv, from_step=True)
+    return result
 
 
 # ----------------------------- Controllers -----------------------------
@@ -301,16 +481,16 @@ class TowingCarriage:
         direction = "NEG" if self.movedirection == 0 else "POS"
 
         if self.enablestatus and self.position == 0:
-            send_command(self.ip, self.port, f"SET_SPEED:{absvel}")
+            # Speed / acceleration / deceleration and the move trigger in one CONFIG round trip
+            configure_command(
+                self.ip,
+                self.port,
+                {"SPEED": absvel, "ACC": acc, "DEC": dec},
+                (f"MOVE_{direction}",),
+            )
             self.movespeed = absvel
-
-            send_command(self.ip, self.port, f"SET_ACC:{acc}")
             self.moveacc = float(acc)
-
-            send_command(self.ip, self.port, f"SET_DEC:{dec}")
             self.movedec = float(dec)
-
-            send_command(self.ip, self.port, f"MOVE_{direction}")
             self.movestatus = True
         else:
             raise RuntimeError("Towing carriage cannot move (servo not enabled or position not zero).")
@@ -329,7 +509,13 @@ class CameraController:
     photostatus: bool = False
 
     def auto(self, duration_s: float, name: str) -> None:
-        send_command(self.ip, self.port, f"CHANGETIME:{duration_s}")
+        self.changetime(duration_s)
+        self.autostart(name)
+
+    def autostart(self, name: str) -> None:
+        """
+        Start recording with the duration set before by changetime (auto stop).
+        """
         send_command(self.ip, self.port, f"AUTOPHOTO:{name}")
         self.photostatus = True
 
@@ -367,15 +553,47 @@ class ForcedOscillationController:
         Fixed issues vs original:
         - self.f2 should be f2 (not f1)
         """
+        # All case parameters plus ENABLE_CONTROL in one acknowledged CONFIG frame
+        self._configure(name, a1, f1, a2, f2, theta, cycletime, ("ENABLE_CONTROL",))
+        self.enablestatus = True
+
+    def upload(self, name: str, a1: float, f1: float, a2: float, f2: float, theta: float, cycletime: float) -> None:
+        """
+        Upload case parameters only; recording starts later with arm().
+        """
+        self._configure(name, a1, f1, a2, f2, theta, cycletime, ())
+
+    def arm(self) -> None:
+        send_command(self.ip, self.port, "ENABLE_CONTROL")
+        self.enablestatus = True
+
+    def _configure(
+        self,
+        name: str,
+        a1: float,
+        f1: float,
+        a2: float,
+        f2: float,
+        theta: float,
+        cycletime: float,
+        actions: Tuple[str, ...],
+    ) -> None:
         self.name = str(name)
 
-        send_command(self.ip, self.port, f"SET_NAME:{self.name}")
-        send_command(self.ip, self.port, f"SET_A1:{a1}")
-        send_command(self.ip, self.port, f"SET_F1:{f1}")
-        send_command(self.ip, self.port, f"SET_A2:{a2}")
-        send_command(self.ip, self.port, f"SET_F2:{f2}")
-        send_command(self.ip, self.port, f"SET_THETA:{theta}")
-        send_command(self.ip, self.port, f"SET_CYCLE:{cycletime}")
+        configure_command(
+            self.ip,
+            self.port,
+            {
+                "NAME": self.name,
+                "A1": a1,
+                "F1": f1,
+                "A2": a2,
+                "F2": f2,
+                "THETA": theta,
+                "CYCLE": cycletime,
+            },
+            actions,
+        )
 
         self.a1 = float(a1)
         self.f1 = float(f1)
@@ -384,9 +602,6 @@ class ForcedOscillationController:
         self.theta = float(theta)
         self.cycletime = float(cycletime)
 
-        send_command(self.ip, self.port, "ENABLE_CONTROL")
-        self.enablestatus = True
-
     def disable(self) -> None:
         if self.enablestatus:
             send_command(self.ip, self.port, "DISABLE_CONTROL")
@@ -414,16 +629,63 @@ def run_experiments_from_csv(
     listener_host: str = "0.0.0.0",
     listener_port: int = 55001,
     pre_enable_wait_s: float = 10.0,
+    feedback: Optional[FeedbackService] = None,
+    ledger: Optional[ExperimentLedger] = None,
+    streams: Optional[CoefficientStreams] = None,
+    readiness: Optional[ReadinessConfig] = None,
+    monitor: Optional[ConvergenceMonitor] = None,
 ) -> List[str]:
     """
     Execute experiments defined in CSV.
-    Marks each finished case in-place by setting Finished=1 and saving CSV.
+    Marks each finished case by setting Finished=1 (ledger row update, or saving the CSV).
+
+    Pass a running FeedbackService to keep one listener for the whole campaign; otherwise
+    a service is started on (listener_host, listener_port) for this batch only.
+    pre_enable_wait_s ends early once the servo is enabled and the water settled (readiness).
+    With a monitor, every finished case is fed to it (advisory: the cases run regardless).
 
     Returns: list of completed case names.
     """
     completed_names: List[str] = []
-    conditionlist = pd.read_csv(filename)
+    conditionlist = load_conditions(filename, ledger)
 
+    own_feedback = feedback is None
+    if own_feedback:
+        feedback = make_feedback_service(tow, cam, osc, host=listener_host, port=listener_port).start()
+    try:
+        _run_cases(
+            conditionlist, filename, tow, cam, osc, static_interval_s, pre_enable_wait_s, feedback, completed_names,
+            ledger, streams, run_index, readiness, monitor,
+        )
+    finally:
+        if own_feedback:
+            feedback.stop()
+
+    return completed_names
+
+
+def _run_cases(
+    conditionlist: pd.DataFrame,
+    filename: str,
+    tow: TowingCarriage,
+    cam: CameraController,
+    osc: ForcedOscillationController,
+    static_interval_s: float,
+    pre_enable_wait_s: float,
+    feedback: FeedbackService,
+    completed_names: List[str],
+    ledger: Optional[ExperimentLedger] = None,
+    streams: Optional[CoefficientStreams] = None,
+    run_index: int = 0,
+    readiness: Optional[ReadinessConfig] = None,
+    monitor: Optional[ConvergenceMonitor] = None,
+) -> None:
+    """
+    Case loop of run_experiments_from_csv (feedback service already running).
+    Every case is traced as one span; its commands and waits carry case / direction / iteration tags.
+    """
+    probe = ReadinessProbe(feedback.ready, readiness)
+    moved = -float("inf")  # time of the last carriage move (water disturbance)
     for i in conditionlist.index:
         # Toggle direction each run (as in original logic)
         tow.movedirection = 0 if tow.movedirection == 1 else 1
@@ -444,82 +706,239 @@ def run_experiments_from_csv(
 
         runtime_s = tow.total_distance / max(abs(speed), 1e-12)
 
-        if (not cam.photostatus) and (not tow.movestatus):
-            if tow.position == 0:
-                tow.initial()
-                tow.enable()
-
-            timeinterval(pre_enable_wait_s)
-
-            # Enable oscillation program, then optional static interval, then camera + towing + oscillation move.
-            osc.enable(name, amp1, f1, amp2, f2, theta, cycletime)
+        with tracer.tags(case=name, direction=tow.movedirection, iteration=run_index), tracer.span("case", name):
+            if (not cam.photostatus) and (not tow.movestatus):
+                since = time.monotonic()
+                if tow.position == 0:
+                    tow.initial()
+                    tow.enable()
+
+                wait_settled(probe, tow, osc, since, moved, pre_enable_wait_s)
+
+                # Enable oscillation program, then optional static interval, then camera + towing + oscillation move.
+                stream = open_coeff_stream(streams, conditionlist, i)
+                since = time.monotonic()
+                osc.enable(name, amp1, f1, amp2, f2, theta, cycletime)
+                wait_device(probe, probe.oscillator_armed, osc, since, probe.config.arm_wait_s, "osc_armed")
+
+                # Static sampling / waiting (kept consistent with your original usage)
+                timeinterval(static_interval_s, "static_wait")
+
+                since = time.monotonic()
+                cam.auto(runtime_s, name)
+                wait_device(probe, probe.camera_recording, cam, since, probe.config.camera_wait_s, "camera_ready")
+
+                # Register the case BEFORE motion commands to avoid race conditions
+                case_feedback = feedback.expect(name)
+                if ledger is not None:
+                    ledger.start(i)
+
+                # Start motions
+                moved = time.monotonic()
+                tow.move(speed)
+                osc.move()
+
+                # Wait until all finish flags received
+                try:
+                    case_feedback.wait()
+                except BaseException as e:
+                    if stream is not None:
+                        stream.cancel()
+                    if ledger is not None:
+                        ledger.fail(i, str(e) or type(e).__name__)
+                    raise
+                coe = store_coefficients(stream, conditionlist, i, ledger)
+
+                # Reset and disable
+                tow.setzero()
+                tow.disable()
+                osc.disable()
+
+                # Mark completed
+                mark_finished(conditionlist, i, name, filename, ledger)
+                monitor_case(monitor, conditionlist, i, coe)
+
+                completed_names.append(name)
+
+
+def run_experiments_pipelined(
+    filename: str,
+    tow: TowingCarriage,
+    cam: CameraController,
+    osc: ForcedOscillationController,
+    run_index: int,
+    static_interval_s: float,
+    *,
+    pre_enable_wait_s: float = 10.0,
+    feedback: Optional[FeedbackService] = None,
+    feedback_timeout_s: Optional[float] = None,
+    feedback_margin_s: float = 60.0,
+    max_workers: int = 8,
+    ledger: Optional[ExperimentLedger] = None,
+    streams: Optional[CoefficientStreams] = None,
+    readiness: Optional[ReadinessConfig] = None,
+    monitor: Optional[ConvergenceMonitor] = None,
+) -> List[str]:
+    """
+    Same cases as run_experiments_from_csv, scheduled as a dependency graph.
+
+    Kept serial (physically required):
+      carriage reset -> servo enable -> servo / water ready (at most pre_enable_wait) -> ENABLE_CONTROL
+      -> static interval -> start
+    Overlapped:
+      - oscillator parameter upload of case N+1 as soon as FINISHCONTROL of case N arrived
+      - camera duration arming of case N+1 as soon as FINISHPHOTO of case N arrived
+      - carriage reset, oscillator release, coefficient extraction and bookkeeping of case N
+        run concurrently
+
+    Each case registers for its finish flags in its own start step, right before its motion,
+    so an unaddressed finish message can only resolve the case that is running. Every flag
+    wait is bounded: feedback_timeout_s, or the case run time plus feedback_margin_s.
+
+    Prints the per-case dead time saved against the serial loop.
+    Returns: list of completed case names.
+    """
+    completed_names: List[str] = []
+    conditionlist = load_conditions(filename, ledger)
+
+    own_feedback = feedback is None
+    if own_feedback:
+        feedback = make_feedback_service(tow, cam, osc).start()
+
+    sched = StepScheduler(max_workers=max_workers)
+    probe = ReadinessProbe(feedback.ready, readiness)
+    moved = {"t": -float("inf")}  # time of the last carriage move (water disturbance)
+    expected: List[CaseFeedback] = []
+    feedbacks: Dict[str, CaseFeedback] = {}
+    streams_by_case: Dict[str, Optional[CoefficientStream]] = {}
+    coes: Dict[str, Optional[List[float]]] = {}
+    prev: Dict[str, Optional[str]] = {"tow": None, "osc": None, "cam": None, "record": None}
+    direction = tow.movedirection
 
-            # Static sampling / waiting (kept consistent with your original usage)
-            timeinterval(static_interval_s)
+    for i in conditionlist.index:
+        # Toggle direction each run (as in original logic)
+        direction = 0 if direction == 1 else 1
 
-            cam.auto(runtime_s, name)
+        condition = conditionlist.loc[i]
+        if int(condition.get("Finished", 0)) != 0:
+            continue
 
-            # Start listener thread BEFORE motion commands to avoid race conditions
-            listener_thread = threading.Thread(
-                target=start_server,
-                args=(tow, cam, osc),
-                kwargs={"host": listener_host, "port": listener_port},
-                daemon=True,
-            )
-            listener_thread.start()
+        name = str(condition["Name"])
+        speed = float(condition["Speed"])
+        params = (
+            float(condition["A1"]),
+            float(condition["f1"]),
+            float(condition["A2"]),
+            float(condition["f2"]),
+            float(condition["Theta"]),
+            float(condition["Count"]),
+        )
+        runtime_s = tow.total_distance / max(abs(speed), 1e-12)
 
-            # Start motions
+        marks: Dict[str, float] = {}
+
+        def tow_prep(marks=marks) -> None:
+            marks["servo"] = time.monotonic()
+            tow.initial()
+            tow.enable()
+
+        def settle(marks=marks) -> None:
+            wait_settled(probe, tow, osc, marks["servo"], moved["t"], pre_enable_wait_s)
+
+        def start(direction: int = direction, speed: float = speed, name: str = name, i=i) -> None:
+            # Register the case BEFORE motion commands (and not earlier: only the running case waits)
+            feedbacks[name] = feedback.expect(name)
+            expected.append(feedbacks[name])
+            if ledger is not None:
+                ledger.start(i)
+            since = time.monotonic()
+            cam.autostart(name)
+            wait_device(probe, probe.camera_recording, cam, since, probe.config.camera_wait_s, "camera_ready")
+            tow.movedirection = direction
+            moved["t"] = time.monotonic()
             tow.move(speed)
             osc.move()
 
-            # Wait until all finish flags received
-            listener_thread.join()
+        timeout_s = feedback_timeout_s if feedback_timeout_s is not None else runtime_s + feedback_margin_s
 
-            # Reset and disable
+        def wait_flag(flag: str, name: str = name, timeout_s: float = timeout_s) -> None:
+            try:
+                feedbacks[name].futures[flag].result(timeout=timeout_s)
+            except FutureTimeout:
+                raise TimeoutError(f"{flag} of {name} not received within {timeout_s:g} s") from None
+
+        def tow_reset() -> None:
             tow.setzero()
             tow.disable()
-            osc.disable()
 
-            # Mark completed in CSV
-            changedata(conditionlist, i, ["Finished"], [1])
-            conditionlist.to_csv(filename, index=False, encoding="utf-8")
+        def arm(i=i, name: str = name) -> None:
+            streams_by_case[name] = open_coeff_stream(streams, conditionlist, i)
+            since = time.monotonic()
+            osc.arm()
+            wait_device(probe, probe.oscillator_armed, osc, since, probe.config.arm_wait_s, "osc_armed")
 
-            completed_names.append(name)
-
-    return completed_names
-
-
-# ----------------------------- Main config -----------------------------
+        def coeff(i=i, name: str = name) -> None:
+            coes[name] = store_coefficients(streams_by_case.get(name), conditionlist, i, ledger)
 
+        def record(i=i, name: str = name) -> None:
+            mark_finished(conditionlist, i, name, filename, ledger)
+            monitor_case(monitor, conditionlist, i, coes.get(name))
+            completed_names.append(name)
 
-def main() -> None:
-    # File paths
-    filenametxt0 = "Input0_parameters.txt"
-    file_pretxt1 = "Input1_pre_parameters.txt"
-    filenamecsv0 = "initial_data.csv"
+        def add(step: str, fn, deps, group: Optional[str] = None, name: str = name) -> str:
+            return sched.add(
+                f"{name}/{step}", fn, deps, case=name, group=group, tags={"direction": direction, "iteration": run_index}
+            )
 
-    # IMPORTANT: keep '*' for MATLAB side auto-detect pattern
-    filenamestorematlab = r"D:\DPQ\主机-联合控制\Test实验\*"
-    filenamestoreforceback = r"D:\DPQ\主机-联合控制\Test实验"  # kept for compatibility (if needed later)
+        s_tow = add("tow_prep", tow_prep, [prev["tow"]])
+        s_settle = add("servo_settle", settle, [s_tow])
+        s_upload = add("osc_upload", lambda name=name, params=params: osc.upload(name, *params), [prev["osc"]])
+        s_arm = add("osc_arm", arm, [s_upload, s_settle])
+        s_static = add("static_wait", lambda: timeinterval(static_interval_s, "static_wait"), [s_arm])
+        s_cam = add("cam_arm", lambda runtime_s=runtime_s: cam.changetime(runtime_s), [prev["cam"]])
+        s_start = add("start", start, [s_static, s_cam])
+        s_move = add("wait_move", partial(wait_flag, "FINISHMOVE"), [s_start], "feedback")
+        s_photo = add("wait_photo", partial(wait_flag, "FINISHPHOTO"), [s_start], "feedback")
+        s_ctrl = add("wait_control", partial(wait_flag, "FINISHCONTROL"), [s_start], "feedback")
+        s_reset = add("tow_reset", tow_reset, [s_move])
+        s_release = add("osc_release", osc.disable, [s_ctrl])
+        s_coeff = add("coeff", coeff, [s_ctrl])
+        s_record = add("record", record, [s_reset, s_release, s_coeff, s_photo, prev["record"]])
+
+        prev = {"tow": s_reset, "osc": s_release, "cam": s_photo, "record": s_record}
+
+    tow.movedirection = direction
+    try:
+        sched.run()
+    except BaseException as e:
+        if ledger is not None:
+            ledger.fail_running(str(e) or type(e).__name__)
+        raise
+    finally:
+        print(format_case_report(sched.case_timings()))
+        for case_feedback in expected:
+            if not case_feedback.done():
+                feedback.cancel(case_feedback)
+        for stream in streams_by_case.values():
+            if stream is not None and stream.coefficients is None:
+                stream.cancel()
+        if sched.cancelled:
+            # the cancelled case had its servo enabled and the oscillator armed
+            tow.disable()
+            osc.disable()
+        if own_feedback:
+            feedback.stop()
 
-    # Experiment setup
-    distance0 = 12.0
-    tinterval = 10.0  # static sampling time between enabling osc and moving
+    return completed_names
 
-    # Device endpoints
-    ip_tuoche = {"ip": "192.168.1.102", "port": 55000}
-    ip_shexiang = {"ip": "192.168.1.104", "port": 55000}
-    ip_forceback = {"ip": "192.168.1.101", "port": 55000}
 
-    # Controllers
-    tow = TowingCarriage(ip=ip_tuoche["ip"], port=int(ip_tuoche["port"]))
-    cam = CameraController(ip=ip_shexiang["ip"], port=int(ip_shexiang["port"]))
-    osc = ForcedOscillationController(ip=ip_forceback["ip"], port=int(ip_forceback["port"]))
+# ----------------------------- Main config -----------------------------
 
-    # Modify towing travel distance
-    tow.changedistance(distance0)
 
-    # ----------------------------- Parameters -----------------------------
+def forced_parameters() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (data0, data1): Input0 campaign parameters and Input1 prediction parameters.
+    """
     data0 = {
         "S": 13,  # towing travel distance (will be overwritten)
         "D": 0.1,  # riser diameter
@@ -582,7 +1001,7 @@ def main() -> None:
         "XtrainType": 6,
         "Kernelfun": 1111,
         "Basisfun": 1111,
-        "Nextpointmethod": 6,
+        "Nextpointmethod": 6,  # 1/5 EI, 2 UCB, 3 max variance, 4 PI, 6 penalized UCB, 7 variance/EI hybrid (GpEngine)
         "Sigma": 7e-3,
         "Explorationratio": 0.5,
         "MaxEvaluations": 10,
@@ -599,44 +1018,211 @@ def main() -> None:
         "JiaoTi_YorN2": 0,
         "Fun_option": 0,
         "ConstantSigma": 0,
+        "GpEngine": 0,  # 1: incremental GP engine (rank-k Cholesky updates, warm-started hyperparameters)
+        "HypIters": 15,  # GpEngine: max hyperparameter iterations per update
+        "DriftTol": 0.2,  # GpEngine: full refactor when a log-hyperparameter moves more than this
+        "Sparsefun": 1111,  # GpEngine: per output column like Kernelfun; 1 exact, 2 subset of data, 3 FITC, 4 VFE
+        "Inducing": 200,  # GpEngine: active set / inducing points of the sparse modes
+        "MultiOutput": 0,  # GpEngine: 1 columns with equal codes share one factorization, 2 plus coregionalization (ICM)
+        "ModelSelect": 0,  # GpEngine: 1 picks kernel/basis per output column by cross-validation
+        "CvFolds": 0,  # ModelSelect: 0 closed-form leave-one-out, k > 1 k-fold
+        "GridTile": 0,  # GpEngine: predict the grid in tiles of this many points (0: whole grid in memory)
+        "BatchSize": 1,  # q next points per output column and GPR cycle (q > 1: batch acquisition)
+        "ContinuousOpt": 0,  # GpEngine: multi-start gradient refinement of the next point (number of starts, 0: grid only)
+        "BatchMethod": 1,  # 1: local penalization (Dis_Penalty / lambda logic), 2: kriging believer (GpEngine only)
     }
+    return data0, data1
+
+
+def forced_rig(
+    name: str,
+    workdir: str,
+    endpoints: Dict[str, Dict[str, Any]],
+    run_dir: str,
+    *,
+    listener_port: int = 55001,
+    **campaign: Any,
+) -> Rig:
+    """
+    Forced-oscillation rig: controllers for endpoints 'tow' / 'cam' / 'osc' ({"ip", "port",
+    "persistent"}), feedback listener on listener_port, files in workdir, oscillator output
+    in run_dir. campaign: keyword options of run_campaign.
+    """
+    for endpoint in endpoints.values():
+        register_endpoint(endpoint)
+    tow = TowingCarriage(ip=endpoints["tow"]["ip"], port=int(endpoints["tow"]["port"]))
+    cam = CameraController(ip=endpoints["cam"]["ip"], port=int(endpoints["cam"]["port"]))
+    osc = ForcedOscillationController(ip=endpoints["osc"]["ip"], port=int(endpoints["osc"]["port"]))
+    return Rig(
+        name,
+        workdir,
+        devices={"tow": tow, "cam": cam, "osc": osc},
+        campaign=partial(run_campaign, run_dir=run_dir, **campaign),
+        optimizer=optimizer,
+        listener_port=listener_port,
+        feedback=make_feedback_service(tow, cam, osc, port=listener_port),
+        pool=device_pool,
+        endpoints=[(e["ip"], int(e["port"])) for e in endpoints.values()],
+    )
+
+
+def run_campaign(
+    rig: Rig,
+    *,
+    run_dir: str,
+    distance: float = 12.0,
+    tinterval: float = 10.0,
+    readiness: Optional[ReadinessConfig] = None,
+    pipelined: bool = False,
+    monitor_convergence: bool = False,
+) -> None:
+    """
+    Campaign of one rig: initial cases, then Step4 / Step5 / Step6 rounds until the stop decision.
+
+    Parameter files, case table, ledger and Step5 outputs live in rig.workdir; the MATLAB
+    steps get absolute paths and keep their .mat files next to the case table. Step 5 passes the
+    parameter dicts and the ledger's training arrays in memory when the package is declared
+    with GPR_Pre_core (file-based Step5 otherwise). judge_next (step 6) decides when to stop;
+    with monitor_convergence the streaming monitor only logs its own decision next to it.
+    """
+    tow, cam, osc = rig.devices["tow"], rig.devices["cam"], rig.devices["osc"]
+
+    # File paths
+    filenametxt0 = rig.path("Input0_parameters.txt")
+    file_pretxt1 = rig.path("Input1_pre_parameters.txt")
+    filenamecsv0 = rig.path("initial_data.csv")
+    filenameledger = rig.path("experiment_ledger.sqlite")  # case status / coefficients; CSV exported for MATLAB steps
+
+    # IMPORTANT: keep '*' for MATLAB side auto-detect pattern
+    filenamestorematlab = os.path.join(run_dir, "*")
+
+    # Modify towing travel distance
+    tow.changedistance(distance)
 
     # Sync runtime parameters
-    data0["S"] = distance0
+    data0, data1 = forced_parameters()
+    data0["S"] = distance
     data0["Tinterval"] = tinterval
 
     write_txt_kv(data0, filenametxt0)
     write_txt_kv(data1, file_pretxt1)
 
     # ----------------------------- Workflow -----------------------------
+    ledger = ExperimentLedger(filenameledger, run_dir=run_dir)
+    streams = CoefficientStreams(
+        run_dir,
+        L=data0["L"],
+        D=data0["D"],
+        M=data0["M"],
+        tinterval=data0["Tinterval"],
+        # Compressed copy of every run; it replaces the text file once Step4 can read it (read_run)
+        store=RunStore(os.path.join(run_dir, "runstore"), replace_source=rig.optimizer.provides(READ_RUN)),
+    )
+    monitor = ConvergenceMonitor.from_params(
+        data0,
+        inputs=XTRAIN_COLUMNS[int(data1["XtrainType"])],
+        on_phase=lambda old, new, d: print(f"[CONV] {rig.name}: phase {old} -> {new}: {d.reason}"),
+    )
+    run_cases = partial(
+        run_experiments_pipelined if pipelined else run_experiments_from_csv,
+        feedback=rig.feedback,
+        streams=streams,
+        readiness=readiness,
+        monitor=monitor if monitor_convergence else None,
+    )
+
+    def step(fn, *args: Any) -> Any:
+        return ledger_step(ledger, filenamecsv0, fn, *args)
+
+    in_memory = rig.optimizer.provides(GPR_PRE_CORE)
+    if not in_memory:
+        print("[MATLAB] GPR_Pre_core not declared for this AnalysisOptimize build: file-based step 5")
+
+    def predict() -> Tuple[Optional[PredictionSummary], List[Expectation]]:
+        if not in_memory:
+            step(gpr_predict, 5, filenametxt0, filenamecsv0, file_pretxt1)
+            return load_step5(rig.workdir) if monitor_convergence else (None, [])
+        conditionlist = load_conditions(filenamecsv0, ledger)
+        pred = gpr_predict_arrays(data0, data1, conditionlist, rig.workdir, session=rig.optimizer)
+        save_step5(rig.workdir, asdict(pred))  # step 6 reads the Step5 files
+        return summarize_step5(pred.y_pre_data, pred.y_pre_err, pred.x_pre_data, pred.next_point_cal, pred.stats)
+
+    def predict_and_judge() -> int:
+        summary, expected = predict()
+        if monitor_convergence and summary is not None:
+            monitor.add_prediction(summary, expected)
+        stop_flag = step(judge_next, 6, filenametxt0, filenamecsv0)
+        if monitor_convergence:
+            print(monitor.report())
+            agree = "agrees" if monitor.stop == bool(stop_flag) else "disagrees"
+            print(f"[CONV] {rig.name}: judge_next={stop_flag}, monitor stop={monitor.stop} ({agree})")
+        return stop_flag
+
     number = 0
+    tracer.set_tags(iteration=number)  # MATLAB steps of the campaign thread
 
     # If initial CSV needs to be generated, enable the next line:
-    # create_input0(1, filenametxt0, filenamecsv0)
+    # step(create_input0, 1, filenametxt0, filenamecsv0)
+    ledger.import_csv(filenamecsv0)
+
+    try:
+        run_cases(filenamecsv0, tow, cam, osc, number, tinterval, ledger=ledger)
+
+        number = 1
+        tracer.set_tags(iteration=number)
+        step(deal_create_coeff, 4, filenametxt0, filenamecsv0, filenamestorematlab)
+
+        run_cases(filenamecsv0, tow, cam, osc, number, tinterval, ledger=ledger)
+        step(deal_create_coeff, 4, filenametxt0, filenamecsv0, filenamestorematlab)
 
-    run_experiments_from_csv(filenamecsv0, tow, cam, osc, number, tinterval)
+        stop_flag = predict_and_judge()
 
-    number = 1
-    deal_create_coeff(4, filenametxt0, filenamecsv0, filenamestorematlab)
+        while stop_flag == 0:
+            print(f"[LOOP] {rig.name}: newly added experiment count: run #{number}")
+            run_cases(filenamecsv0, tow, cam, osc, number, tinterval, ledger=ledger)
+            number += 1
+            tracer.set_tags(iteration=number)
 
-    run_experiments_from_csv(filenamecsv0, tow, cam, osc, number, tinterval)
-    deal_create_coeff(4, filenametxt0, filenamecsv0, filenamestorematlab)
+            step(deal_create_coeff, 4, filenametxt0, filenamecsv0, filenamestorematlab)
 
-    gpr_predict(5, filenametxt0, filenamecsv0, file_pretxt1)
-    stop_flag = judge_next(6, filenametxt0, filenamecsv0)
+            run_cases(filenamecsv0, tow, cam, osc, number, tinterval, ledger=ledger)
+            step(deal_create_coeff, 4, filenametxt0, filenamecsv0, filenamestorematlab)
 
-    while stop_flag == 0:
-        print(f"[LOOP] Newly added experiment count: run #{number}")
-        run_experiments_from_csv(filenamecsv0, tow, cam, osc, number, tinterval)
-        number += 1
+            stop_flag = predict_and_judge()
+    finally:
+        ledger.export_csv(filenamecsv0)
+        ledger.close()
 
-        deal_create_coeff(4, filenametxt0, filenamecsv0, filenamestorematlab)
 
-        run_experiments_from_csv(filenamecsv0, tow, cam, osc, number, tinterval)
-        deal_create_coeff(4, filenametxt0, filenamecsv0, filenamestorematlab)
+def main() -> None:
+    filenametrace = "experiment_trace.json"  # phase timeline of the campaign (chrome://tracing or Perfetto UI)
 
-        gpr_predict(5, filenametxt0, filenamecsv0, file_pretxt1)
-        stop_flag = judge_next(6, filenametxt0, filenamecsv0)
+    # Device endpoints
+    # persistent=True keeps one framed socket per device; set False for device programs
+    # that still read a single command per connection.
+    # The carriage (TowCo) and oscillator (ViForcedCo) programs still do one read per
+    # connection and know neither CONFIG nor STATUS: their setup goes out as unverified SET_*
+    # commands and readiness falls back to the fixed waits. Switch them to persistent=True
+    # once those programs read framed commands and answer ACK:CONFIG / STATUS.
+    ip_tuoche = {"ip": "192.168.1.102", "port": 55000, "persistent": False}
+    ip_shexiang = {"ip": "192.168.1.104", "port": 55000, "persistent": True}
+    ip_forceback = {"ip": "192.168.1.101", "port": 55000, "persistent": False}
+
+    rig = forced_rig(
+        "forced",
+        ".",
+        {"tow": ip_tuoche, "cam": ip_shexiang, "osc": ip_forceback},
+        r"D:\DPQ\主机-联合控制\Test实验",  # oscillator output folder (coefficient streams, ledger run-file references)
+        listener_port=55001,
+        distance=12.0,
+        tinterval=10.0,  # static sampling time between enabling osc and moving
+        readiness=ReadinessConfig(water_std_n=0.02),  # servo / water readiness instead of the fixed 10 s pre-enable wait
+        pipelined=False,  # True: overlap device preparation across cases (no measured gain yet, see bench_control_loop.py)
+        monitor_convergence=False,  # True: log the streaming ErrFinal / Conv_thresh decision next to judge_next
+    )
+    Orchestrator([rig]).run()  # more rigs: main_rigs.py
+    tracer.export_chrome(filenametrace)
+    print(tracer.format_summary(("cat", "name")))
 
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
-import socket
+import os
 import pandas as pd
-import threading
 import time
+from functools import partial
 import AnalysisOptimizeSELF as AnalyOpti
+from device_link import ConnectionPool
+from feedback_service import FeedbackService, split_message
+from optimizer_session import OptimizerSession
+from rig import Orchestrator, Rig
 #import A1 as AnalyOpti
 
 #  Command List
@@ -29,79 +33,62 @@ import AnalysisOptimizeSELF as AnalyOpti
 
 
 # =================== Sender Program ===================
+device_pool = ConnectionPool()  # one long-lived link per device, reconnects automatically
+
+
 def send_command(ip, port, command):
     try:
-        # Create a TCP/IP socket
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock: # auto destroy after use
-            # Connect to the server
-            sock.connect((ip, port))
-            print("connect to server {}:".format(ip))
-
-            # Send data
-            sock.sendall(command.encode('ascii'))
-            print(f"{command}")
+        # Reuse the pooled link of this device (framed persistent socket or one-shot)
+        device_pool.send(ip, port, command)
+        print("send to server {}:".format(ip))
+        print(f"{command}")
     except Exception as e:
         print(f"find error when sending command: {e}")
 
 
-# =================== Receiver Program (Status Feedback) ============================
-stopMoving_event = threading.Event()
-stopRecoding_event = threading.Event()
-stopControl_event = threading.Event()
-Maxposition = 1
+def configure_command(ip, port, params, actions):
+    try:
+        # One CONFIG frame with one ack (verified values); SET_xxx: commands if the device has no CONFIG support
+        applied = device_pool.link(ip, port).configure(params, actions)
+        print("configure server {}:".format(ip))
+        print(f"{applied} {actions}")
+    except OSError as e:
+        print(f"find error when sending command: {e}")
 
 
-def start_server(tuoche, shexiang, forceback, host="0.0.0.0", port=55001):
-    stopMoving_event.clear()
-    stopRecoding_event.clear()
-    stopControl_event.clear()
-    try:
-        sever_socket = socket.socket(socket.AF_INET)
-        sever_socket.bind((host, port))
-        sever_socket.listen(5)
-        print(f"Listening port {port}:")
-        while not (stopMoving_event.is_set() and stopRecoding_event.is_set() and stopControl_event.is_set()):
-        #while not (stopMoving_event.is_set() and stopControl_event.is_set()):
-            print(f"Towing finished:{stopMoving_event.is_set()}")
-            print(f"Recording finished:{stopRecoding_event.is_set()}")
-            print(f"Feedback finished:{stopControl_event.is_set()}")
-            sever_socket.settimeout(5)
-            try:
-                client_socket, client_address = sever_socket.accept()
-                print(f"connected by client {client_address[0]}")
-                message = client_socket.recv(1024).decode("utf-8")
-                print(f"{message}")
-                process_command(message, tuoche, shexiang, forceback)
-                client_socket.close()
-            except socket.timeout:
-                continue
-        print("LISTNER CLOSED")
-    except Exception as e:
-        print(f"Error occurred: {e}")
-        sever_socket.close()
+# =================== Receiver Program (Status Feedback) ============================
+Maxposition = 1
 
 
 def process_command(message, tuoche, shexiang, forceback):
-    if ":" in message:
-        action, name = message.split(":", 1)
-    else:
-        action, name = message, None
+    # device states only; the finish flags resolve the waiting case in the feedback service
+    action, name = split_message(message)
     if action.startswith("FINISHPHOTO"):
         setattr(shexiang, "Photostatus", False)
-        stopRecoding_event.set()
     elif action.startswith("FINISHMOVE"):
         setattr(tuoche, "Movestatus", False)
-        setattr(tuoche, "Position", float(name))
-        stopMoving_event.set()
+        try:
+            setattr(tuoche, "Position", float(name))
+        except (TypeError, ValueError):
+            pass
     elif action.startswith("FINISHCONTROL"):
         setattr(forceback, "Movestatus", False)
-        stopControl_event.set()
+
+
+def FeedbackListener(tuoche, shexiang, forceback, host="0.0.0.0", port=55001):
+    # one listener for the whole campaign (started and stopped by the rig)
+    return FeedbackService(host, port, on_message=lambda message: process_command(message, tuoche, shexiang, forceback))
 
 # =================== Initial Experiment Table Generation ==============
+# What the installed AnalysisOptimizeSELF build was compiled with (optimizer_session.STEP_FOLDER:
+# every step keeps its .mat files next to the case table; needed to run it beside other rigs)
+PACKAGE_CAPABILITIES = ()
+
+optimizer = OptimizerSession(AnalyOpti, capabilities=PACKAGE_CAPABILITIES)  # runtime started once and kept warm (restarted if it crashes)
+
+
 def Creatinput0(stepn,filenametxt,filenamecsv):
-    my_package=AnalyOpti.initialize()
-    my_package.Step0_Total_program(stepn,filenametxt,filenamecsv,'','')
-    my_package.terminate()
+    optimizer.step(stepn,filenametxt,filenamecsv,'','')
 
 
 # =================== Towing Carriage Parameters and Control ================
@@ -145,13 +132,10 @@ class tuoche():
         absvel = abs(vel)
         direction = "NEG" if self.Movedirection == 0 else "POS"
         if self.Enablestatus and self.Position == 0:
-            send_command(self.ip, self.port, "SET_SPEED:{}".format(absvel))
+            configure_command(self.ip, self.port, {"SPEED": absvel, "ACC": acc, "DEC": dec}, ["MOVE_{}".format(direction)])
             self.Movespeed = abs
-            send_command(self.ip, self.port, "SET_ACC:{}".format(acc))
             self.Moveacc = acc
-            send_command(self.ip, self.port, "SET_DEC:{}".format(dec))
             self.Mocedec = dec
-            send_command(self.ip, self.port, "MOVE_{}".format(direction))
             self.Movestatus = True
         else:
             print("cannot move")
@@ -204,27 +188,21 @@ class forceback():
     addzeta = 0
 
     def Enable(self, name, mass, dampingratio, stiffnessCF, stiffnessIL, realmass,vr, addzeta, runtime):
-        send_command(self.ip, self.port, "SET_NAME:{}".format(name))
+        # all parameters and ENABLE_CONTROL in one CONFIG frame (falls back to SET_xxx: commands)
+        configure_command(self.ip, self.port, {"NAME": name, "VM": mass, "DRATIO": dampingratio,
+                                               "VSCF": stiffnessCF, "VSIL": stiffnessIL, "RM": realmass,
+                                               "Vr": vr, "AddZeta": addzeta, "RUNTIME": runtime}, ["ENABLE_CONTROL"])
         self.name = name
-        send_command(self.ip, self.port, "SET_VM:{}".format(mass))
         self.mass = mass
-        send_command(self.ip, self.port, "SET_DRATIO:{}".format(dampingratio))
         self.dampingratio = dampingratio
-        send_command(self.ip, self.port, "SET_VSCF:{}".format(stiffnessCF))
         self.stiffnessCF = stiffnessCF
-        send_command(self.ip, self.port, "SET_VSIL:{}".format(stiffnessIL))
         self.stiffnessIL = dampingratio
-        send_command(self.ip, self.port, "SET_RM:{}".format(realmass))
         self.realmass = realmass
-        send_command(self.ip, self.port, "SET_Vr:{}".format(vr))
         self.vr = vr
-        send_command(self.ip, self.port, "SET_AddZeta:{}".format(addzeta))
         self.addzeta = addzeta
-        send_command(self.ip, self.port, "SET_RUNTIME:{}".format(runtime))
         self.runtime = runtime
         #send_command(self.ip, self.port, "SET_STORE:{}".format(filenamestore))
         #elf.filenamestore = filenamestore
-        send_command(self.ip, self.port, "ENABLE_CONTROL")
         self.Enablestatus = True
 
     def Disable(self):
@@ -251,19 +229,13 @@ def DealCreatCoe(stepn,filenametxt,filenamecsv,filenamestorematlab):
     # result = matlab.batch_function(datafilename)
     # eng.quit()
     # return result
-    my_package=AnalyOpti.initialize()
-    my_package.Step0_Total_program(stepn,filenametxt,filenamecsv,filenamestorematlab,'')
-    my_package.terminate()
+    optimizer.step(stepn,filenametxt,filenamecsv,filenamestorematlab,'')
 
 def GPRpre(stepn,filenametxt,filenamecsv,file_pretxt1):
-    my_package=AnalyOpti.initialize()
-    my_package.Step0_Total_program(stepn,filenametxt,filenamecsv,'',file_pretxt1)
-    my_package.terminate()
+    optimizer.step(stepn,filenametxt,filenamecsv,'',file_pretxt1)
 
 def JudgeNext(stepn,filenametxt,filenamecsv):
-    my_package=AnalyOpti.initialize()
-    stopYoN=my_package.Step0_Total_program(stepn,filenametxt,filenamecsv,'','')
-    my_package.terminate()
+    stopYoN=optimizer.step(stepn,filenametxt,filenamecsv,'','')
     return stopYoN
 
 # =================== Modify Condition Table Parameter File ===================
@@ -279,7 +251,7 @@ def timeinterval(timen):
 
 # =================== Run Program for n Consecutive Times ===================
 ## Run n tests according to csv0
-def StartNtest(filename, tuoche, shexiang, forceback,number,t):
+def StartNtest(filename, tuoche, shexiang, forceback,number,t,feedback):
     completedName = []
     # Read conditions
     conditionlist = pd.read_csv(filename) # library: pandas reads csv
@@ -304,13 +276,12 @@ def StartNtest(filename, tuoche, shexiang, forceback,number,t):
                 timeinterval(10)
                 forceback.Enable(Name, mass, dampingratio, stiffnessCF, stiffnessIL, realmass,vr, addzeta, runtime)
 
+                case = feedback.expect(Name)  # register before the motion starts
                 shexiang.Auto(runtime, Name)
                 forceback.Move()
                 timeinterval(t)
                 tuoche.Move(Speed)
-                threadtest = threading.Thread(target=start_server(tuoche, shexiang, forceback))
-                threadtest.start()
-                threadtest.join()
+                case.wait()  # FINISHMOVE, FINISHPHOTO and FINISHCONTROL of this case
                 tuoche.Setzero()
                 tuoche.Disable()
                 # process.stdin.flush()
@@ -397,19 +368,13 @@ data1={
         }
 
 
-if __name__ == "__main__":
-    
-    # Target position set
-    filenametxt0 ='Input0_parameters_self.txt'
-    file_pretxt1 ='Input1_pre_parameters_self.txt'
-    filenamecsv0 = "initial_data_self.csv"
-    filenamestorematlab ='D:\DPQ\程序处理分析优化-自激\自激振荡实验\Test实验\*'  # the '*' must not be removed; used for automatic recognition of txt suffix
-    filenamestoreforceback ='D:\DPQ\程序处理分析优化-自激\自激振荡实验\Test实验'
-    distance0 = 12 # towing distance                              # towing distance
-    tinterval = 10                                        # static sampling time
-    ip_tuoche = {"ip": '192.168.1.102', "port": 55000}    # IP and port for towing program
-    ip_shexiang = {"ip": '192.168.1.104', "port": 55000}  # IP and port for camera program
-    ip_forceback = {"ip": '192.168.1.101', "port": 55000}  # IP and port for feedback device
+# =================== Self-Excited Rig (one device set, own listener port and folder) ===================
+def SelfExcitedRig(name, workdir, ip_tuoche, ip_shexiang, ip_forceback, filenamestoreforceback, port=55001, distance0=12, tinterval=10):
+    device_pool.register(ip_tuoche["ip"], ip_tuoche["port"], persistent=False)  # towing program reads one command per connection
+    device_pool.register(ip_shexiang["ip"], ip_shexiang["port"], persistent=True)  # camera program reads framed commands
+    device_pool.register(ip_forceback["ip"], ip_forceback["port"], persistent=False)  # feedback program reads one command per connection
+    # one-shot links: CONFIG falls back to SET_xxx: commands, the applied values are not verified
+    print("one-shot links to towing and feedback programs: CONFIG acks not verified")
     tuoche1 = tuoche()
     tuoche1.ip = ip_tuoche["ip"]
     tuoche1.port = ip_tuoche["port"]
@@ -419,27 +384,60 @@ if __name__ == "__main__":
     forceback1 = forceback()
     forceback1.ip = ip_forceback["ip"]
     forceback1.port = ip_forceback["port"]
+    filenamestorematlab = os.path.join(filenamestoreforceback, '*')  # the '*' must not be removed; used for automatic recognition of txt suffix
+    return Rig(name, workdir,
+               devices={"tow": tuoche1, "cam": shexiang1, "osc": forceback1},
+               campaign=partial(RunCampaign, filenamestorematlab=filenamestorematlab, distance0=distance0, tinterval=tinterval),
+               optimizer=optimizer,
+               listener_port=port,
+               feedback=FeedbackListener(tuoche1, shexiang1, forceback1, port=port),  # listens here for the whole campaign
+               pool=device_pool,
+               endpoints=[(ip["ip"], int(ip["port"])) for ip in (ip_tuoche, ip_shexiang, ip_forceback)])
+
+
+def RunCampaign(rig, filenamestorematlab, distance0=12, tinterval=10):
+    tuoche1, shexiang1, forceback1 = rig.devices["tow"], rig.devices["cam"], rig.devices["osc"]
+    feedback = rig.feedback
+    filenametxt0 = rig.path('Input0_parameters_self.txt')
+    file_pretxt1 = rig.path('Input1_pre_parameters_self.txt')
+    filenamecsv0 = rig.path("initial_data_self.csv")
+    params0 = dict(data0)  # module tables stay untouched (several rigs)
     tuoche1.changedistance(distance0) # Modify towing travel distance
-    data0["S"]=distance0
-    data0["Tinterval"]=tinterval
-    writetxt(data0,filenametxt0)
+    params0["S"]=distance0
+    params0["Tinterval"]=tinterval
+    writetxt(params0,filenametxt0)
     writetxt(data1,file_pretxt1)
     number = 0
+    # Paths are absolute (rig.workdir): the MATLAB steps keep their .mat files next to the case table
     #Creatinput0(1,filenametxt0,filenamecsv0) # Generate initial condition table
-    StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval)
+    StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval,feedback)
     number = 1
     DealCreatCoe(4,filenametxt0,filenamecsv0,filenamestorematlab)
-    StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval)
+    StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval,feedback)
     DealCreatCoe(4,filenametxt0,filenamecsv0,filenamestorematlab)
     GPRpre(5,filenametxt0,filenamecsv0,file_pretxt1)
     stopYoN = JudgeNext(6,filenametxt0,filenamecsv0)
-    
+
     while stopYoN == 0:
-        print(f'Newly added experiment count: run #{number}')
-        StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval)
+        print(f'{rig.name}: Newly added experiment count: run #{number}')
+        StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval,feedback)
         number = number+1
         DealCreatCoe(4,filenametxt0,filenamecsv0,filenamestorematlab)
-        StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval)
+        StartNtest(filenamecsv0, tuoche1, shexiang1, forceback1,number,tinterval,feedback)
         DealCreatCoe(4,filenametxt0,filenamecsv0,filenamestorematlab)
         GPRpre(5,filenametxt0,filenamecsv0,file_pretxt1)
         stopYoN = JudgeNext(6,filenametxt0,filenamecsv0)
+
+
+if __name__ == "__main__":
+    
+    # Target position set
+    filenamestoreforceback ='D:\DPQ\程序处理分析优化-自激\自激振荡实验\Test实验'
+    distance0 = 12 # towing distance                              # towing distance
+    tinterval = 10                                        # static sampling time
+    ip_tuoche = {"ip": '192.168.1.102', "port": 55000}    # IP and port for towing program
+    ip_shexiang = {"ip": '192.168.1.104', "port": 55000}  # IP and port for camera program
+    ip_forceback = {"ip": '192.168.1.101', "port": 55000}  # IP and port for feedback device
+    rig = SelfExcitedRig("self-excited", ".", ip_tuoche, ip_shexiang, ip_forceback, filenamestoreforceback,
+                         port=55001, distance0=distance0, tinterval=tinterval)
+    Orchestrator([rig]).run()  # prints the optimizer report and closes the runtime; more rigs: main_rigs.py
@@ -0,0 +1,78 @@
+"""
+Several experiment rigs driven by one orchestrator process.
+
+Modules integrated:
+- Forced-oscillation rigs (main_command1V2.forced_rig), all on the one warm AnalysisOptimize
+  session of that module
+- Self-excited rig (main_command2.SelfExcitedRig) side by side, on its AnalysisOptimizeSELF session
+- Orchestrator (rig.py): one thread per rig, rigs and sessions closed at the end, one trace file
+
+Notes:
+- Every rig needs its own listener port; configure its device programs to send their
+  feedback there. Each rig keeps its case table (initial_data.csv), ledger and Step5
+  outputs in its own folder.
+- Rigs of the same package take turns on the MATLAB steps (session lock); the case loops
+  run concurrently.
+- Concurrent rigs need package builds whose steps all keep their .mat files next to the case
+  table: declare STEP_FOLDER in PACKAGE_CAPABILITIES of main_command1V2 and main_command2,
+  otherwise the Orchestrator refuses to start.
+"""
+
+from __future__ import annotations
+
+import main_command1V2 as forced
+import main_command2 as selfexcited
+from readiness import ReadinessConfig
+from rig import Orchestrator
+from tracing import tracer
+
+
+def main() -> None:
+    filenametrace = "experiment_trace.json"  # all rigs (tag 'rig'), chrome://tracing or Perfetto UI
+
+    # Device endpoints per rig
+    rig_a = {
+        "tow": {"ip": "192.168.1.102", "port": 55000, "persistent": False},
+        "cam": {"ip": "192.168.1.104", "port": 55000, "persistent": True},
+        "osc": {"ip": "192.168.1.101", "port": 55000, "persistent": False},
+    }
+    rig_b = {
+        "tow": {"ip": "192.168.2.102", "port": 55000, "persistent": False},
+        "cam": {"ip": "192.168.2.104", "port": 55000, "persistent": True},
+        "osc": {"ip": "192.168.2.101", "port": 55000, "persistent": False},
+    }
+    rig_self = {
+        "tow": {"ip": "192.168.3.102", "port": 55000},
+        "cam": {"ip": "192.168.3.104", "port": 55000},
+        "osc": {"ip": "192.168.3.101", "port": 55000},
+    }
+
+    campaign = dict(
+        distance=12.0,
+        tinterval=10.0,
+        readiness=ReadinessConfig(water_std_n=0.02),
+        pipelined=False,
+        monitor_convergence=False,  # True: log the streaming convergence decision next to judge_next
+    )
+    rigs = [
+        forced.forced_rig("forced-a", "rig_a", rig_a, r"D:\DPQ\主机-联合控制\Test实验A", listener_port=55001, **campaign),
+        forced.forced_rig("forced-b", "rig_b", rig_b, r"D:\DPQ\主机-联合控制\Test实验B", listener_port=55002, **campaign),
+        selfexcited.SelfExcitedRig(
+            "self-excited",
+            "rig_self",
+            rig_self["tow"],
+            rig_self["cam"],
+            rig_self["osc"],
+            r"D:\DPQ\程序处理分析优化-自激\自激振荡实验\Test实验",
+            port=55003,
+        ),
+    ]
+    try:
+        Orchestrator(rigs).run()
+    finally:
+        tracer.export_chrome(filenametrace)
+        print(tracer.format_summary(("rig", "cat")))
+
+
+if __name__ == "__main__":
+    main()
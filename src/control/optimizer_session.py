@@ -0,0 +1,301 @@
+"""
+Warm MATLAB Runtime session for the compiled optimization packages.
+
+Modules integrated:
+- OptimizerSession: initialize the compiled package once, keep it for the whole campaign
+- Automatic restart when the runtime dies (MATLAB code errors are re-raised unchanged)
+- Per-step call timing (plus runtime start-up time)
+- In-memory exchange: parameter dicts -> MATLAB structs, numeric arrays -> matlab.double
+- StubPackage / StubRuntime: stand-in backend for running without the MATLAB Runtime
+
+Notes:
+- `package` is the module produced by MATLAB Compiler SDK (AnalysisOptimize /
+  AnalysisOptimizeSELF): package.initialize() returns a handle exposing the compiled
+  functions and terminate().
+- Calls are serialized with a lock; the runtime handle is not thread-safe.
+- The process folder is never changed (rigs run in threads): steps get absolute paths and
+  keep their .mat files in the folder of the case table they are given.
+- The `matlab` module ships with the MATLAB Runtime; without it (stand-in backend)
+  arrays are passed as nested float lists.
+- Compiled handles resolve functions only when called, so what a build supports cannot be
+  probed: the capabilities (GPR_PRE_CORE, READ_RUN, STEP_FOLDER) are declared with the
+  session and default to none, i.e. the file-based steps of older builds.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tracing import tracer
+
+
+# Capabilities of a package build (OptimizerSession(capabilities=...))
+GPR_PRE_CORE = "GPR_Pre_core"  # in-memory GPR step (GPR_Pre_core.m)
+READ_RUN = "read_run"  # Step4 reads the run store (read_run.m / run_files.m)
+STEP_FOLDER = "step_folder"  # every step keeps its .mat files next to its case table (step_folder.m)
+
+
+# ----------------------------- Timing -----------------------------
+
+
+@dataclass
+class StepTiming:
+    calls: int = 0
+    total_s: float = 0.0
+    last_s: float = 0.0
+    max_s: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.total_s += seconds
+        self.last_s = seconds
+        self.max_s = max(self.max_s, seconds)
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.calls if self.calls else 0.0
+
+
+def is_matlab_code_error(err: BaseException) -> bool:
+    """
+    MATLAB errors raised by the compiled code itself; the runtime is still healthy.
+    """
+    return type(err).__name__ == "MatlabExecutionError"
+
+
+# ----------------------------- Array exchange -----------------------------
+
+
+try:
+    import matlab  # type: ignore
+except ImportError:  # no MATLAB Runtime (stand-in backend)
+    matlab = None
+
+
+def _rows(value: Any) -> List[List[float]]:
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if not any(isinstance(r, (list, tuple)) for r in value):
+        value = [value]  # 1-D -> one row, like matlab.double([...])
+    rows = [list(r) if isinstance(r, (list, tuple)) else [r] for r in value]
+    return [[float(x) for x in r] for r in rows]
+
+
+def to_matlab(value: Any) -> Any:
+    """
+    Convert Python inputs for a compiled call.
+
+    - dict -> struct (numbers as double, so MATLAB never sees int64)
+    - 1-D / 2-D sequences or numpy arrays -> matlab.double matrix (nested lists without MATLAB)
+    - str / numbers pass through (numbers as float)
+    """
+    if isinstance(value, dict):
+        return {str(k): to_matlab(v) for k, v in value.items()}
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if hasattr(value, "tolist") or isinstance(value, (list, tuple)):
+        rows = _rows(value)
+        return matlab.double(rows) if matlab is not None else rows
+    return value
+
+
+def from_matlab(value: Any) -> Any:
+    """
+    Convert compiled outputs back: matlab.double -> nested float lists (scalars -> float).
+    """
+    if isinstance(value, tuple):
+        return tuple(from_matlab(v) for v in value)
+    if isinstance(value, dict):
+        return {k: from_matlab(v) for k, v in value.items()}
+    if isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if hasattr(value, "size") and not hasattr(value, "tolist"):  # matlab.double
+        return [[float(x) for x in row] for row in value]
+    if hasattr(value, "tolist") or isinstance(value, list):
+        return _rows(value)
+    return value
+
+
+# ----------------------------- Session -----------------------------
+
+
+class OptimizerSession:
+    """
+    One warm runtime handle shared by every optimization step of a campaign.
+    """
+
+    def __init__(self, package: Any, *, max_restarts: int = 1, capabilities: Iterable[str] = ()) -> None:
+        self.package = package
+        self.max_restarts = max_restarts
+        self.capabilities = frozenset(capabilities)  # declared by whoever built the package
+        self.restarts = 0
+        self.timings: Dict[str, StepTiming] = {}
+        self._handle: Any = None
+        self._lock = threading.RLock()
+
+    @property
+    def running(self) -> bool:
+        return self._handle is not None
+
+    def start(self) -> Any:
+        with self._lock:
+            if self._handle is None:
+                t0 = time.perf_counter()
+                self._handle = self.package.initialize()
+                self._timing("startup").add(time.perf_counter() - t0)
+                print(f"[MATLAB] Runtime started ({self.timings['startup'].last_s:.2f} s)")
+            return self._handle
+
+    def close(self) -> None:
+        with self._lock:
+            handle, self._handle = self._handle, None
+            if handle is not None:
+                try:
+                    handle.terminate()
+                except Exception as e:
+                    print(f"[WARN] Runtime terminate failed: {e}")
+
+    def restart(self) -> Any:
+        with self._lock:
+            self.close()
+            self.restarts += 1
+            return self.start()
+
+    def __enter__(self) -> "OptimizerSession":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _timing(self, label: str) -> StepTiming:
+        return self.timings.setdefault(label, StepTiming())
+
+    def call(self, func: str, *args: Any, label: Optional[str] = None, **kwargs: Any) -> Any:
+        """
+        Call a compiled function on the warm handle; restart and retry if the runtime died.
+        """
+        label = label or func
+        with self._lock, tracer.span("optimizer", label):
+            attempt = 0
+            while True:
+                handle = self.start()
+                t0 = time.perf_counter()
+                try:
+                    return getattr(handle, func)(*args, **kwargs)
+                except Exception as e:
+                    if is_matlab_code_error(e) or attempt >= self.max_restarts:
+                        raise
+                    attempt += 1
+                    print(f"[MATLAB] {label} failed ({type(e).__name__}: {e}); restarting runtime")
+                    self.restart()
+                finally:
+                    self._timing(label).add(time.perf_counter() - t0)
+
+    def provides(self, capability: str) -> bool:
+        """
+        True if the package build was declared with `capability` (older builds have none).
+        """
+        return capability in self.capabilities
+
+    def call_arrays(self, func: str, *args: Any, nargout: int = 1, label: Optional[str] = None) -> Any:
+        """
+        In-memory call: dict / array arguments in, nested-list arrays out (tuple if nargout > 1).
+        """
+        out = self.call(func, *(to_matlab(a) for a in args), nargout=nargout, label=label)
+        return from_matlab(out)
+
+    def step(self, stepn: int, filenametxt: str, filenamecsv: str, store: str = "", pre_txt: str = "") -> Any:
+        """
+        Step0_Total_program(stepn, ...) with timing recorded under 'step<n>'.
+        """
+        return self.call(
+            "Step0_Total_program", stepn, filenametxt, filenamecsv, store, pre_txt, label=f"step{stepn}"
+        )
+
+    def report(self) -> str:
+        lines = [f"{'step':<12}{'calls':>7}{'mean_s':>10}{'max_s':>10}{'total_s':>10}"]
+        for label, t in self.timings.items():
+            lines.append(f"{label:<12}{t.calls:>7}{t.mean_s:>10.3f}{t.max_s:>10.3f}{t.total_s:>10.3f}")
+        lines.append(f"restarts: {self.restarts}")
+        return "\n".join(lines)
+
+
+# ----------------------------- Stand-in backend -----------------------------
+
+
+class StubRuntime:
+    """
+    Handle returned by StubPackage.initialize(); mimics Step0_Total_program.
+
+    Step results come from `results` (stepn -> value or callable(*args)); unknown
+    steps return stepn like the MATLAB steps do. Other compiled functions (e.g.
+    GPR_Pre_core) are looked up in `functions`.
+    """
+
+    def __init__(self, package: "StubPackage") -> None:
+        self._package = package
+        self.alive = True
+
+    def Step0_Total_program(self, stepn: int, *args: Any, **kwargs: Any) -> Any:
+        pkg = self._package
+        if not self.alive:
+            raise RuntimeError("MATLAB Runtime is not running")
+        if pkg.crash_next:
+            pkg.crash_next = False
+            self.alive = False
+            raise RuntimeError("MATLAB Runtime terminated unexpectedly")
+        pkg.calls.append((int(stepn),) + tuple(args))
+        if pkg.delay_s:
+            time.sleep(pkg.delay_s)
+        result = pkg.results.get(int(stepn), stepn)
+        return result(stepn, *args) if callable(result) else result
+
+    def __getattr__(self, name: str) -> Any:
+        func = None if name.startswith("_") else self._package.functions.get(name)
+        if func is None:
+            raise AttributeError(name)
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            self._package.calls.append((name,) + args)
+            return func(*args, **kwargs)
+
+        return call
+
+    def terminate(self) -> None:
+        self.alive = False
+
+
+class StubPackage:
+    """
+    Stand-in for the compiled package module (initialize() -> handle).
+    """
+
+    def __init__(
+        self,
+        results: Optional[Dict[int, Any]] = None,
+        *,
+        functions: Optional[Dict[str, Callable[..., Any]]] = None,
+        delay_s: float = 0.0,
+        startup_s: float = 0.0,
+    ) -> None:
+        self.results: Dict[int, Any] = dict(results or {})
+        self.functions: Dict[str, Callable[..., Any]] = dict(functions or {})
+        self.delay_s = delay_s
+        self.startup_s = startup_s
+        self.initializations = 0
+        self.crash_next = False
+        self.calls: List[tuple] = []
+
+    def initialize(self) -> StubRuntime:
+        self.initializations += 1
+        if self.startup_s:
+            time.sleep(self.startup_s)
+        return StubRuntime(self)
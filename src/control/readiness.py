@@ -0,0 +1,187 @@
+"""
+Readiness-driven waits of the experiment loop (servo, water, oscillator, camera).
+
+Modules integrated:
+- ReadinessBoard: last READY:<KEY>[:value] event per key, pushed by the device programs to
+  the campaign feedback listener
+- ReadinessConfig: poll period, status-query timeout, water-settled threshold and the
+  optional oscillator / camera holds
+- ReadinessProbe: device conditions from events or STATUS queries (servo enabled, oscillator
+  armed, camera recording, water settled) and wait(), which ends as soon as the condition holds
+
+Notes:
+- The old fixed waits are the upper bounds: a device that neither pushes READY events nor
+  answers STATUS queries (one-shot link, older device program) waits exactly as before.
+- STATUS queries need a persistent link. One-shot links are never queried; the probe says so
+  once per link, and their conditions end only on READY events. The shipped carriage and
+  oscillator programs (TowCo / ViForcedCo) are one-shot and push no READY events, so with
+  them the servo / water wait stays the fixed pre-enable wait.
+- Only events newer than the command that caused them count (`since`, time.monotonic()).
+- Water settled: the oscillator reports the standard deviation of its force signal over its
+  last sampling window (STATUS:WATER=<std> or READY:WATER:<std>, in N); the water counts as
+  settled at or below ReadinessConfig.water_std_n.
+- The static interval before each run is not shortened: it is the baseline window of
+  DataDeal.m (static means from the first Tinterval seconds, run data after them).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from device_link import DeviceLink
+from tracing import tracer
+
+
+READY_ACTION = "READY"
+ON_VALUES = ("1", "ON", "TRUE", "READY", "YES")
+
+
+def is_on(value: Optional[str]) -> bool:
+    return value is not None and value.strip().upper() in ON_VALUES
+
+
+@dataclass
+class ReadinessConfig:
+    enabled: bool = True  # False: fixed sleeps as before
+    poll_s: float = 0.2  # STATUS query period (events wake the wait immediately)
+    status_timeout_s: float = 0.5  # reply timeout of one STATUS query
+    water_std_n: float = 0.02  # force std (N) at which the water counts as settled
+    arm_wait_s: float = 0.0  # hold after ENABLE_CONTROL until the oscillator is armed (0: no hold)
+    camera_wait_s: float = 0.0  # hold the carriage until the camera records (0: no hold)
+
+
+# ----------------------------- Events -----------------------------
+
+
+class ReadinessBoard:
+    """
+    Latest readiness event per key; wait_change() wakes waiters on every new event.
+    """
+
+    def __init__(self) -> None:
+        self._events: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._generation = 0
+        self._cond = threading.Condition()
+
+    def feed(self, message: str) -> bool:
+        """
+        Record READY:<KEY>[:value]; False for any other message.
+        """
+        action, _, rest = message.strip().partition(":")
+        if action.strip().upper() != READY_ACTION or not rest.strip():
+            return False
+        key, _, value = rest.partition(":")
+        self.mark(key, value.strip() or None)
+        return True
+
+    def mark(self, key: str, value: Optional[str] = None) -> None:
+        with self._cond:
+            self._events[key.strip().upper()] = (time.monotonic(), value)
+            self._generation += 1
+            self._cond.notify_all()
+
+    def get(self, key: str) -> Optional[Tuple[float, Optional[str]]]:
+        """
+        (time.monotonic() of arrival, value) of the last event of `key`.
+        """
+        with self._cond:
+            return self._events.get(key.strip().upper())
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def wait_change(self, generation: int, timeout_s: float) -> bool:
+        """
+        Block until an event newer than `generation` arrived (True) or timeout_s elapsed.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._generation != generation, timeout_s)
+
+
+# ----------------------------- Conditions -----------------------------
+
+
+class ReadinessProbe:
+    def __init__(self, board: ReadinessBoard, config: Optional[ReadinessConfig] = None) -> None:
+        self.board = board
+        self.config = config or ReadinessConfig()
+        self._local = threading.local()  # deadline of the wait() running in this thread
+        self._one_shot_warned: set = set()
+
+    def check(
+        self,
+        key: str,
+        link: Optional[DeviceLink],
+        accept: Callable[[str], bool],
+        since: float,
+        *,
+        accept_event: Optional[Callable[[str], bool]] = None,
+    ) -> bool:
+        """
+        Condition `key` holds: a READY event after `since` (its value checked by accept_event,
+        if given) or a STATUS reply accepted by `accept`.
+        """
+        event = self.board.get(key)
+        if event is not None and event[0] >= since:
+            if event[1] is None or accept_event is None or accept_event(event[1]):
+                return True
+        if link is None:
+            return False
+        if not link.persistent:  # no STATUS on one-shot links: READY events only
+            if link.endpoint not in self._one_shot_warned:
+                self._one_shot_warned.add(link.endpoint)
+                print(
+                    f"[WARN] {link.ip}:{link.port} is a one-shot link: no STATUS readiness, "
+                    f"waits end on READY events or at the fixed wait"
+                )
+            return False
+        timeout_s = self.config.status_timeout_s
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is not None and link.supports_status:  # unprobed devices get the full timeout once
+            timeout_s = min(timeout_s, max(deadline - time.monotonic(), 0.0))
+        value = link.status(key, timeout_s=timeout_s)
+        return value is not None and accept(value)
+
+    def water_ok(self, value: str) -> bool:
+        try:
+            return float(value) <= self.config.water_std_n
+        except ValueError:
+            return is_on(value)
+
+    def servo_enabled(self, link: Optional[DeviceLink], since: float) -> bool:
+        return self.check("SERVO", link, is_on, since)
+
+    def oscillator_armed(self, link: Optional[DeviceLink], since: float) -> bool:
+        return self.check("CONTROL", link, is_on, since)
+
+    def camera_recording(self, link: Optional[DeviceLink], since: float) -> bool:
+        return self.check("PHOTO", link, is_on, since)
+
+    def water_settled(self, link: Optional[DeviceLink], since: float) -> bool:
+        return self.check("WATER", link, self.water_ok, since, accept_event=self.water_ok)
+
+    def wait(self, ready: Callable[[], bool], timeout_s: float, label: str) -> bool:
+        """
+        Block until ready() holds or timeout_s (the old fixed wait) elapsed; True when ready.
+        """
+        with tracer.span("wait", label, seconds=timeout_s):
+            if not self.config.enabled:
+                time.sleep(timeout_s)
+                return False
+            deadline = time.monotonic() + timeout_s
+            self._local.deadline = deadline
+            try:
+                while True:
+                    generation = self.board.generation
+                    if ready():
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self.board.wait_change(generation, min(self.config.poll_s, remaining))
+            finally:
+                self._local.deadline = None
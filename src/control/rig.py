@@ -0,0 +1,142 @@
+"""
+Multi-rig orchestration: several carriage / camera / oscillator sets driven by one process.
+
+Modules integrated:
+- Rig: one device set with its own controllers, feedback listener (own port), case queue
+  (case table, ledger and parameter files in its own folder) and campaign loop
+- Orchestrator: runs every rig's campaign concurrently, one thread per rig, on shared warm
+  optimizer sessions (one per compiled package), then closes rigs and sessions
+
+Notes:
+- No state is shared between rigs: finish flags live in each rig's FeedbackService (per-case
+  futures), and device states in its controllers.
+- Rig.workdir is made absolute and every path handed to devices and MATLAB steps derives
+  from it; the process folder is never changed. The MATLAB steps keep their .mat files in
+  the folder of the case table they are given (step_folder.m), so rigs of the same package
+  never share them.
+- That holds only for package builds declared with STEP_FOLDER (steps 1 and 6 included);
+  older builds keep information.mat / x_train.mat in the process folder, so the
+  Orchestrator refuses to run more than one rig unless every rig's session declares it.
+- Device links stay in the pool of the controller module (keyed by endpoint, so two rigs
+  never share a link); Rig.close() closes only the rig's own links.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from device_link import ConnectionPool
+from feedback_service import FeedbackService
+from optimizer_session import STEP_FOLDER, OptimizerSession
+from tracing import tracer
+
+
+@dataclass
+class Rig:
+    name: str
+    workdir: str  # case table, ledger, parameter files and Step5 outputs of this rig
+    devices: Dict[str, Any]  # controllers by role ('tow', 'cam', 'osc')
+    campaign: Callable[["Rig"], Any]  # experiment loop: cases and optimizer steps until the stop decision
+    optimizer: OptimizerSession  # shared by every rig of the same compiled package
+    listener_port: int = 55001  # where the rig's device programs send their feedback
+    feedback: Optional[FeedbackService] = None  # campaign-long listener (None: the loop listens itself)
+    pool: Optional[ConnectionPool] = None
+    endpoints: List[Tuple[str, int]] = field(default_factory=list)  # the rig's device links in `pool`
+
+    def __post_init__(self) -> None:
+        self.workdir = os.path.abspath(self.workdir)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.workdir, filename)
+
+    def start(self) -> None:
+        os.makedirs(self.workdir, exist_ok=True)
+        if self.feedback is not None:
+            self.feedback.start()
+
+    def run(self) -> Any:
+        with tracer.tags(rig=self.name):
+            return self.campaign(self)
+
+    def close(self) -> None:
+        if self.feedback is not None:
+            self.feedback.stop()
+        if self.pool is not None:
+            for ip, port in self.endpoints:
+                self.pool.close(ip, port)
+
+
+class Orchestrator:
+    """
+    Drive several rigs at once; every rig keeps its own devices, listener and case queue.
+    """
+
+    def __init__(self, rigs: Sequence[Rig]) -> None:
+        for attr in ("name", "listener_port"):
+            values = [getattr(r, attr) for r in rigs]
+            if len(set(values)) != len(values):
+                raise ValueError(f"Rigs need distinct {attr}s: {values}")
+        workdirs = [r.workdir for r in rigs]
+        if len(set(workdirs)) != len(workdirs):
+            raise ValueError(f"Rigs need distinct workdirs: {workdirs}")
+        shared = [r.name for r in rigs if not r.optimizer.provides(STEP_FOLDER)]
+        if len(rigs) > 1 and shared:
+            raise ValueError(
+                f"Rigs {shared} run a package build not declared with {STEP_FOLDER!r}; its steps keep "
+                "their .mat files in the process folder, so run one rig per process"
+            )
+        self.rigs = list(rigs)
+        self.errors: Dict[str, Optional[BaseException]] = {}
+
+    @property
+    def sessions(self) -> List[OptimizerSession]:
+        out: List[OptimizerSession] = []
+        for rig in self.rigs:
+            if all(s is not rig.optimizer for s in out):
+                out.append(rig.optimizer)
+        return out
+
+    def _run_rig(self, rig: Rig) -> None:
+        try:
+            rig.run()
+            self.errors[rig.name] = None
+            print(f"[RIG] {rig.name} finished")
+        except BaseException as e:
+            self.errors[rig.name] = e
+            print(f"[ERROR] Rig {rig.name} failed: {e}")
+
+    def run(self) -> Dict[str, Optional[BaseException]]:
+        """
+        Run all campaigns (a single rig in the calling thread); raises the first rig failure
+        after every rig has finished and the rigs and sessions are closed.
+        """
+        self.errors = {}
+        try:
+            for rig in self.rigs:
+                rig.start()
+            for session in self.sessions:
+                session.start()  # runtime start-up once, before the first rig needs it
+            if len(self.rigs) == 1:
+                self._run_rig(self.rigs[0])
+            else:
+                threads = [
+                    threading.Thread(target=self._run_rig, args=(rig,), name=f"rig-{rig.name}", daemon=True)
+                    for rig in self.rigs
+                ]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+        finally:
+            for rig in self.rigs:
+                rig.close()
+            for session in self.sessions:
+                print(session.report())
+                session.close()
+        failed = [e for e in self.errors.values() if e is not None]
+        if failed:
+            raise failed[0]
+        return self.errors
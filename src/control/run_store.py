@@ -0,0 +1,355 @@
+"""
+Chunked, compressed columnar storage for the 1 kHz oscillator run files.
+
+Modules integrated:
+- write_run / RunStore.convert: one binary '.fsirun' file per run, every channel stored as
+  zlib-compressed, byte-shuffled float64 chunks
+- RunReader: memory-mapped reader; only the chunks of the requested channels and sample
+  range are decompressed
+- RunStore: folder of runs plus an index (index.json) of per-file metadata
+  (case name, direction, sample count, source file, start time)
+
+Notes:
+- Layout: MAGIC | chunks ... | footer JSON | footer offset (uint64) | MAGIC. The footer is
+  written last, so a file is either complete or rejected by the reader.
+- Channels keep the column numbers of the text file (0-based); DataDeal uses 3..9.
+- Source text files are named 'yyyyMMddHHmmss<name>.txt' by the oscillator program.
+- replace_source: once a run is written, its source text file is re-read and removed if it
+  is unchanged and matches the stored copy, so a campaign keeps one copy of each run. Step4 reads the store directly
+  (read_run.m / run_files.m, data/initialData); enable it only with a package built from
+  those sources.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+MAGIC = b"FSIRUN1\0"
+SUFFIX = ".fsirun"
+DEFAULT_CHUNK = 65536  # samples per chunk (about 65 s at 1 kHz)
+DEAL_CHANNELS = tuple(range(3, 10))  # DataDeal.m columns 4..10
+
+_NAME_RE = re.compile(r"^(\d{14})(.+)\.txt$")
+
+
+@dataclass
+class RunInfo:
+    file: str  # path relative to the store root
+    name: str
+    n_samples: int
+    channels: List[int]
+    chunk: int
+    started: Optional[str] = None  # yyyyMMddHHmmss from the source file name
+    direction: Optional[int] = None
+    source: Optional[str] = None
+    source_size: Optional[int] = None
+    source_mtime: Optional[float] = None
+    fs: float = 1000.0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def parse_run_filename(path: str) -> tuple:
+    """
+    'yyyyMMddHHmmss<name>.txt' -> (started, name); (None, stem) for other names.
+    """
+    base = os.path.basename(path)
+    m = _NAME_RE.match(base)
+    if m:
+        return m.group(1), m.group(2)
+    return None, os.path.splitext(base)[0]
+
+
+def read_txt(path: str) -> np.ndarray:
+    """
+    Whitespace-separated numeric text file -> (samples, columns); an incomplete last line is dropped.
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        rows = [ln.split() for ln in f if ln.strip()]
+    if not rows:
+        return np.empty((0, 0))
+    ncols = len(rows[0])
+    return np.array([r for r in rows if len(r) == ncols], dtype=float)
+
+
+# ----------------------------- Chunk codec -----------------------------
+
+
+def _encode(values: np.ndarray, level: int) -> bytes:
+    raw = np.ascontiguousarray(values, dtype="<f8").view(np.uint8).reshape(-1, 8)
+    return zlib.compress(raw.T.tobytes(), level)  # byte planes first: compresses far better
+
+
+def _decode(blob: bytes, count: int) -> np.ndarray:
+    planes = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(8, count)
+    return planes.T.copy().view("<f8").reshape(count)
+
+
+# ----------------------------- Writer -----------------------------
+
+
+def write_run(
+    path: str,
+    data: np.ndarray,
+    *,
+    channels: Optional[Sequence[int]] = None,
+    chunk: int = DEFAULT_CHUNK,
+    level: int = 6,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Write a (samples, columns) array; returns the footer (metadata + chunk table).
+    """
+    data = np.asarray(data, dtype=float)
+    n = int(data.shape[0])
+    channels = list(range(data.shape[1])) if channels is None else [int(c) for c in channels]
+    table: Dict[str, List[List[int]]] = {}
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for c in channels:
+            entries = []
+            for start in range(0, n, chunk):
+                blob = _encode(data[start : start + chunk, c], level)
+                entries.append([f.tell(), len(blob)])
+                f.write(blob)
+            table[str(c)] = entries
+        footer = dict(meta or {})
+        footer.update({"n_samples": n, "channels": channels, "chunk": chunk, "chunks": table})
+        offset = f.tell()
+        f.write(json.dumps(footer).encode("utf-8"))
+        f.write(struct.pack("<Q", offset))
+        f.write(MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return footer
+
+
+# ----------------------------- Reader -----------------------------
+
+
+class RunReader:
+    """
+    Memory-mapped range reader for one '.fsirun' file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        tail = len(MAGIC) + 8
+        if self._map[: len(MAGIC)] != MAGIC or self._map[-len(MAGIC) :] != MAGIC:
+            self.close()
+            raise RuntimeError(f"Not a complete run file: {path}")
+        (offset,) = struct.unpack("<Q", self._map[-tail : -len(MAGIC)])
+        self.meta: Dict[str, Any] = json.loads(self._map[offset:-tail].decode("utf-8"))
+        self.n_samples: int = int(self.meta["n_samples"])
+        self.channels: List[int] = list(self.meta["channels"])
+        self.chunk: int = int(self.meta["chunk"])
+        self._chunks: Dict[int, List[List[int]]] = {int(k): v for k, v in self.meta["chunks"].items()}
+
+    def close(self) -> None:
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "RunReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def read(
+        self, channels: Optional[Iterable[int]] = None, start: int = 0, stop: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Samples [start, stop) of the given channels -> (samples, len(channels)).
+        """
+        channels = self.channels if channels is None else [int(c) for c in channels]
+        stop = self.n_samples if stop is None else min(int(stop), self.n_samples)
+        start = max(int(start), 0)
+        out = np.empty((max(stop - start, 0), len(channels)))
+        if stop <= start:
+            return out
+        first, last = start // self.chunk, (stop - 1) // self.chunk
+        for j, c in enumerate(channels):
+            if c not in self._chunks:
+                raise KeyError(f"Channel {c} not stored in {self.path}")
+            for k in range(first, last + 1):
+                offset, length = self._chunks[c][k]
+                k0 = k * self.chunk
+                count = min(self.chunk, self.n_samples - k0)
+                values = _decode(self._map[offset : offset + length], count)
+                lo, hi = max(start, k0), min(stop, k0 + count)
+                out[lo - start : hi - start, j] = values[lo - k0 : hi - k0]
+        return out
+
+    def read_full(self, channels: Optional[Sequence[int]] = None, ncols: Optional[int] = None) -> np.ndarray:
+        """
+        (samples, ncols) array laid out like the text file; only `channels` are loaded,
+        the other columns are zero (read_full(DEAL_CHANNELS) is enough for data_deal).
+        """
+        channels = self.channels if channels is None else [int(c) for c in channels]
+        ncols = (max(self.channels) + 1) if ncols is None else ncols
+        out = np.zeros((self.n_samples, ncols))
+        out[:, channels] = self.read(channels)
+        return out
+
+
+# ----------------------------- Store + index -----------------------------
+
+
+class RunStore:
+    """
+    Folder of '.fsirun' files with a JSON index of their metadata.
+    """
+
+    INDEX = "index.json"
+
+    def __init__(
+        self,
+        root: str,
+        *,
+        chunk: int = DEFAULT_CHUNK,
+        channels: Optional[Sequence[int]] = None,
+        replace_source: bool = False,
+    ) -> None:
+        self.root = root
+        self.chunk = chunk
+        self.channels = None if channels is None else list(channels)
+        self.replace_source = replace_source  # remove the text file once its copy is verified
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.index: Dict[str, RunInfo] = {}
+        path = os.path.join(root, self.INDEX)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.index = {k: RunInfo(**v) for k, v in json.load(f).items()}
+
+    def _save_index(self) -> None:
+        path = os.path.join(self.root, self.INDEX)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({k: asdict(v) for k, v in self.index.items()}, f, indent=1)
+        os.replace(tmp, path)
+
+    def add(
+        self,
+        data: np.ndarray,
+        name: str,
+        *,
+        started: Optional[str] = None,
+        direction: Optional[int] = None,
+        source: Optional[str] = None,
+        **extra: Any,
+    ) -> RunInfo:
+        """
+        Store an in-memory run (e.g. the samples a CoefficientStream already holds).
+        """
+        started = started or time.strftime("%Y%m%d%H%M%S")
+        rel = f"{started}{name}{SUFFIX}"
+        info = RunInfo(
+            file=rel, name=name, n_samples=int(len(data)), channels=[], chunk=self.chunk,
+            started=started, direction=direction, source=source, extra=dict(extra),
+        )
+        if source and os.path.exists(source):
+            st = os.stat(source)
+            info.source_size, info.source_mtime = st.st_size, st.st_mtime
+        footer = write_run(
+            os.path.join(self.root, rel), data, channels=self.channels, chunk=self.chunk,
+            meta={"name": name, "started": started, "direction": direction, "source": source},
+        )
+        info.channels = footer["channels"]
+        with self._lock:
+            self.index[rel] = info
+            self._save_index()
+        if self.replace_source and source and os.path.exists(source):
+            self._remove_source(info)
+        return info
+
+    def _source_unchanged(self, info: RunInfo) -> bool:
+        st = os.stat(info.source)
+        return (st.st_size, st.st_mtime) == (info.source_size, info.source_mtime)
+
+    def _remove_source(self, info: RunInfo) -> None:
+        """
+        Delete the source text file only if it is unchanged since the run was stored and
+        a fresh read of it matches the stored copy (the samples handed to add() may be a
+        partial buffer, e.g. of a stream that stopped waiting).
+        """
+        if not self._source_unchanged(info):
+            print(f"[WARN] {info.source} changed after it was stored; text file kept")
+            return
+        on_disk = read_txt(info.source)
+        with self.open(info) as reader:
+            stored = reader.read(info.channels)
+        complete = on_disk.shape[0] == info.n_samples and on_disk.shape[1] > max(info.channels, default=-1)
+        if not complete or not np.array_equal(stored, on_disk[:, info.channels]):
+            print(f"[WARN] Stored copy of {info.source} differs from the file; text file kept")
+            return
+        if not self._source_unchanged(info):
+            print(f"[WARN] {info.source} changed while it was checked; text file kept")
+            return
+        try:
+            os.remove(info.source)
+        except OSError as e:  # still open in the oscillator program
+            print(f"[WARN] Could not remove {info.source}: {e}")
+
+    def convert(self, txt_path: str, *, direction: Optional[int] = None, **extra: Any) -> RunInfo:
+        """
+        Convert one oscillator text file (skipped if already converted and unchanged).
+        """
+        started, name = parse_run_filename(txt_path)
+        existing = self.lookup_source(txt_path)
+        if existing is not None:
+            return existing
+        return self.add(read_txt(txt_path), name, started=started, direction=direction, source=txt_path, **extra)
+
+    def convert_many(self, txt_paths: Iterable[str], *, max_workers: int = 4) -> List[RunInfo]:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(self.convert, txt_paths))
+
+    def lookup_source(self, txt_path: str) -> Optional[RunInfo]:
+        """
+        Index entry converted from this text file, if it has not changed since.
+        """
+        if not os.path.exists(txt_path):
+            return None
+        st = os.stat(txt_path)
+        with self._lock:
+            for info in self.index.values():
+                if (
+                    info.source is not None
+                    and os.path.abspath(info.source) == os.path.abspath(txt_path)
+                    and info.source_size == st.st_size
+                    and info.source_mtime == st.st_mtime
+                ):
+                    return info
+        return None
+
+    def find(self, name: str) -> List[RunInfo]:
+        """
+        All runs of a case, newest first.
+        """
+        with self._lock:
+            runs = [i for i in self.index.values() if i.name == name]
+        return sorted(runs, key=lambda i: i.started or "", reverse=True)
+
+    def open(self, info: RunInfo) -> RunReader:
+        return RunReader(os.path.join(self.root, info.file))
@@ -0,0 +1,475 @@
+"""
+Long-running local query service for the compact GPR surrogates (Cv / Ca lookups).
+
+Modules integrated:
+- SurrogateService: keeps the '.gpc' models resident (gp_compact.CompactGP) and answers
+  mean / sd / confidence-interval queries through an in-process API and a TCP socket
+- Request coalescing: concurrent requests arriving within `max_wait_s` are merged into one
+  batched prediction per model (up to `max_batch` points)
+- ServiceStats: request / point / batch counters, throughput and latency percentiles
+- SurrogateClient: blocking loopback client for scripts and tests
+
+Notes:
+- Socket protocol: newline-framed JSON. Request {"id": 1, "model": "Free_4DIM", "x": [[...], ...],
+  "level": 0.95}; reply {"id": 1, "mu": [...], "sd": [...], "lo": [...], "hi": [...]} or
+  {"id": 1, "error": "..."}. {"cmd": "stats"} and {"cmd": "models"} return the counters and
+  the loaded models. Requests on one connection may be pipelined; replies carry the id.
+- Intervals are mu -/+ z*sd with the predictive sd (noise included), like the yint output of
+  predict() for fitrgp models.
+- Start: python surrogate_service.py Free_4DIM=GPR_Model_Free_4DIM.gpc Cv=GPR_Model_Forced_5DIM_Cv.gpc
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Deque, Dict, List, Mapping, Optional, Union
+
+import numpy as np
+
+from device_link import FrameBuffer, encode_frame
+from gp_compact import CompactGP
+
+
+DEFAULT_PORT = 55010
+
+
+def z_value(level: float) -> float:
+    """
+    Two-sided normal quantile for a confidence level (0.95 -> 1.96).
+    """
+    if not 0.0 < level < 1.0:
+        raise ValueError(f"Confidence level must be in (0, 1): {level}")
+    return NormalDist().inv_cdf(0.5 + level / 2.0)
+
+
+@dataclass
+class SurrogateResult:
+    mu: np.ndarray
+    sd: np.ndarray
+    lo: np.ndarray
+    hi: np.ndarray
+    level: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mu": self.mu.tolist(), "sd": self.sd.tolist(), "lo": self.lo.tolist(), "hi": self.hi.tolist(),
+            "level": self.level,
+        }
+
+
+@dataclass
+class _Request:
+    model: str
+    X: np.ndarray
+    level: float
+    t0: float
+    future: Future
+
+
+# ----------------------------- Counters -----------------------------
+
+
+class ServiceStats:
+    """
+    Thread-safe counters; latency percentiles over the last `history` requests.
+    """
+
+    def __init__(self, history: int = 10000) -> None:
+        self.started = time.time()
+        self.requests = 0
+        self.points = 0
+        self.batches = 0
+        self.batch_points = 0
+        self.errors = 0
+        self._latency: Deque[float] = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def add_batch(self, requests: int, points: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.requests += requests
+            self.points += points
+            self.batch_points += points
+
+    def add_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latency.append(seconds)
+
+    def add_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = np.array(self._latency) * 1e3
+            uptime = max(time.time() - self.started, 1e-9)
+            out = {
+                "uptime_s": uptime,
+                "requests": self.requests,
+                "points": self.points,
+                "batches": self.batches,
+                "errors": self.errors,
+                "requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+                "points_per_batch": self.batch_points / self.batches if self.batches else 0.0,
+                "requests_per_s": self.requests / uptime,
+                "points_per_s": self.points / uptime,
+            }
+        if lat.size:
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            out.update({"latency_ms_p50": p50, "latency_ms_p95": p95, "latency_ms_p99": p99, "latency_ms_max": lat.max()})
+        return out
+
+    def report(self) -> str:
+        s = self.snapshot()
+        lines = [
+            f"requests {s['requests']}  points {s['points']}  batches {s['batches']}  errors {s['errors']}",
+            f"per batch: {s['requests_per_batch']:.1f} requests, {s['points_per_batch']:.1f} points",
+            f"throughput: {s['requests_per_s']:.1f} requests/s, {s['points_per_s']:.1f} points/s",
+        ]
+        if "latency_ms_p50" in s:
+            lines.append(
+                f"latency ms: p50 {s['latency_ms_p50']:.3f}  p95 {s['latency_ms_p95']:.3f}  "
+                f"p99 {s['latency_ms_p99']:.3f}  max {s['latency_ms_max']:.3f}"
+            )
+        return "\n".join(lines)
+
+
+# ----------------------------- Service -----------------------------
+
+
+class SurrogateService:
+    """
+    Resident surrogate models behind one coalescing worker; the socket server is optional.
+    """
+
+    def __init__(
+        self,
+        models: Optional[Mapping[str, Union[str, CompactGP]]] = None,
+        *,
+        host: str = "127.0.0.1",
+        port: Optional[int] = DEFAULT_PORT,
+        max_batch: int = 4096,
+        max_wait_s: float = 0.002,
+        level: float = 0.95,
+        cache_size: int = 4096,
+    ) -> None:
+        self.host = host
+        self.port = port  # None: in-process API only
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self.level = level
+        self.cache_size = cache_size
+        self.models: Dict[str, CompactGP] = {}
+        self.stats = ServiceStats()
+
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._start_error: Optional[BaseException] = None
+        for name, model in (models or {}).items():
+            self.add_model(name, model)
+
+    def add_model(self, name: str, model: Union[str, CompactGP]) -> CompactGP:
+        """
+        Load a model (path or CompactGP) and keep it mapped for the lifetime of the service.
+        """
+        gp = CompactGP(model, cache_size=self.cache_size) if isinstance(model, str) else model
+        self.models[str(name)] = gp.open()
+        return gp
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"d": gp.d, "n": gp.n, "outputs": gp.outputs, "kernel": gp.kernel,
+                   "inputs": gp.meta.get("predictor_names", [])}
+            for name, gp in self.models.items()
+        }
+
+    # ----------------------------- Lifecycle -----------------------------
+
+    def start(self) -> "SurrogateService":
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, name="surrogate-worker", daemon=True)
+            self._worker.start()
+        if self.port is not None and self._thread is None:
+            self._ready.clear()
+            self._start_error = None
+            self._thread = threading.Thread(target=self._run, name="surrogate-server", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            if self._start_error is not None:
+                self._thread.join()
+                self._thread = None
+                self.stop()
+                raise self._start_error
+        return self
+
+    def stop(self) -> None:
+        loop, thread = self._loop, self._thread
+        if loop is not None and thread is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            self._thread = None
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+            print("[LISTEN] Surrogate service closed.")
+
+    def close(self) -> None:
+        self.stop()
+        for gp in self.models.values():
+            gp.close()
+
+    def __enter__(self) -> "SurrogateService":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ----------------------------- In-process API -----------------------------
+
+    def submit(self, model: str, X: Any, level: Optional[float] = None) -> "Future[SurrogateResult]":
+        """
+        Queue a query; the future resolves once the batch holding it has been predicted.
+        """
+        if self._worker is None:
+            raise RuntimeError("Surrogate service is not running")
+        gp = self.models.get(model)
+        if gp is None:
+            raise KeyError(f"Unknown model: {model}")
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if X.shape[1] != gp.d:
+            raise ValueError(f"Model {model} expects {gp.d} input columns, got {X.shape[1]}")
+        level = self.level if level is None else float(level)
+        z_value(level)  # reject bad levels here, not inside the batch
+        fut: Future = Future()
+        self._queue.put(_Request(model, X, level, time.perf_counter(), fut))
+        return fut
+
+    def query(self, model: str, X: Any, level: Optional[float] = None, timeout: Optional[float] = None) -> SurrogateResult:
+        return self.submit(model, X, level).result(timeout=timeout)
+
+    # ----------------------------- Coalescing worker -----------------------------
+
+    def _work(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch: List[_Request] = [first]
+            rows = len(first.X)
+            deadline = time.perf_counter() + self.max_wait_s
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    req = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if req is None:
+                    stopping = True
+                    break
+                batch.append(req)
+                rows += len(req.X)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_Request]) -> None:
+        groups: Dict[str, List[_Request]] = {}
+        for req in batch:
+            groups.setdefault(req.model, []).append(req)
+        for name, reqs in groups.items():
+            X = np.vstack([r.X for r in reqs])
+            try:
+                mu, sd = self.models[name].predict(X)
+            except Exception as e:
+                for r in reqs:
+                    self.stats.add_error()
+                    r.future.set_exception(e)
+                continue
+            self.stats.add_batch(len(reqs), len(X))
+            start = 0
+            for r in reqs:
+                stop = start + len(r.X)
+                m, s = mu[start:stop], sd[start:stop]
+                z = z_value(r.level)
+                r.future.set_result(SurrogateResult(m, s, m - z * s, m + z * s, r.level))
+                self.stats.add_latency(time.perf_counter() - r.t0)
+                start = stop
+
+    # ----------------------------- Socket server -----------------------------
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, reuse_address=True)
+            )
+            sockets = self._server.sockets or []
+            if sockets:
+                self.port = sockets[0].getsockname()[1]
+            print(f"[LISTEN] Surrogate service on {self.host}:{self.port} ({', '.join(self.models)})")
+        except BaseException as e:  # bind failure is reported to start()
+            self._start_error = e
+            self._ready.set()
+            loop.close()
+            self._loop = None
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            loop.run_until_complete(self._server.wait_closed())
+            tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+            for t in tasks:
+                t.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self._loop = None
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        frames = FrameBuffer("utf-8")
+        pending = set()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                for msg in frames.feed(data):
+                    task = asyncio.ensure_future(self._answer(msg, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, message: str, writer: asyncio.StreamWriter) -> None:
+        rid = None
+        try:
+            req = json.loads(message)
+            rid = req.get("id")
+            cmd = req.get("cmd", "query")
+            if cmd == "stats":
+                reply: Dict[str, Any] = {"stats": self.stats.snapshot()}
+            elif cmd == "models":
+                reply = {"models": self.describe()}
+            elif cmd == "query":
+                fut = self.submit(str(req["model"]), req["x"], req.get("level"))
+                reply = (await asyncio.wrap_future(fut)).to_dict()
+            else:
+                raise ValueError(f"Unknown command: {cmd}")
+        except Exception as e:
+            self.stats.add_error()
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        reply["id"] = rid
+        try:
+            writer.write(encode_frame(json.dumps(reply), "utf-8"))
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+# ----------------------------- Loopback client -----------------------------
+
+
+class SurrogateClient:
+    """
+    Blocking client for the socket API (one request in flight per client).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, *, timeout: float = 10.0) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._frames = FrameBuffer("utf-8")
+        self._replies: Deque[str] = deque()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self) -> "SurrogateClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._next_id += 1
+            payload = dict(payload, id=self._next_id)
+            self._sock.sendall(encode_frame(json.dumps(payload), "utf-8"))
+            while True:
+                while self._replies:
+                    reply = json.loads(self._replies.popleft())
+                    if reply.get("id") == payload["id"]:
+                        if "error" in reply:
+                            raise RuntimeError(reply["error"])
+                        return reply
+                data = self._sock.recv(65536)
+                if not data:
+                    raise ConnectionError("Surrogate service closed the connection")
+                self._replies.extend(self._frames.feed(data))
+
+    def query(self, model: str, X: Any, level: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        mu / sd / lo / hi arrays for the rows of X.
+        """
+        payload: Dict[str, Any] = {"cmd": "query", "model": model, "x": np.atleast_2d(np.asarray(X, dtype=float)).tolist()}
+        if level is not None:
+            payload["level"] = level
+        reply = self.request(payload)
+        return {k: np.asarray(reply[k]) for k in ("mu", "sd", "lo", "hi")}
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request({"cmd": "stats"})["stats"]
+
+    def models(self) -> Dict[str, Any]:
+        return self.request({"cmd": "models"})["models"]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local surrogate query service")
+    parser.add_argument("models", nargs="+", help="name=path/to/model.gpc")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=4096)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--stats-every", type=float, default=60.0, help="seconds between counter reports (0: off)")
+    args = parser.parse_args(argv)
+
+    models = dict(spec.split("=", 1) for spec in args.models)
+    service = SurrogateService(
+        models, host=args.host, port=args.port, max_batch=args.max_batch, max_wait_s=args.max_wait_ms / 1e3
+    )
+    with service:
+        try:
+            while True:
+                time.sleep(args.stats_every or 3600)
+                if args.stats_every:
+                    print(service.stats.report())
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
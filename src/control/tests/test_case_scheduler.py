@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from case_scheduler import StepScheduler
+
+
+def test_steps_wait_for_their_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def step(name, delay=0.0):
+        def fn():
+            time.sleep(delay)
+            with lock:
+                order.append(name)
+        return fn
+
+    s = StepScheduler()
+    s.add("a", step("a", 0.05))
+    s.add("b", step("b"))
+    s.add("c", step("c"), deps=("a", "b", None))
+    s.run()
+    assert order == ["b", "a", "c"]
+    assert s.steps["c"].start_s >= s.steps["a"].end_s
+
+
+def test_add_rejects_duplicates_and_unknown_dependencies():
+    s = StepScheduler()
+    s.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        s.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        s.add("b", lambda: None, deps=("missing",))
+
+
+def test_failed_step_is_raised_and_stops_new_steps():
+    ran = []
+
+    def fail():
+        raise RuntimeError("no FINISHMOVE")
+
+    s = StepScheduler()
+    s.add("a", fail)
+    s.add("b", lambda: ran.append("b"), deps=("a",))
+    with pytest.raises(RuntimeError, match="FINISHMOVE"):
+        s.run()
+    assert ran == []
+    assert isinstance(s.steps["a"].error, RuntimeError)
+
+
+def test_cancelled_cases_are_skipped_and_dependents_proceed():
+    ran = []
+    s = StepScheduler()
+    s.add("c1/run", lambda: s.cancel(["c2"]) or ran.append("c1/run"), case="c1")
+    s.add("c2/run", lambda: ran.append("c2/run"), deps=("c1/run",), case="c2")
+    s.add("final", lambda: ran.append("final"), deps=("c2/run",))
+    s.run()
+    assert ran == ["c1/run", "final"]
+    assert s.steps["c2/run"].skipped
+    assert s.cancelled == {"c2"}
+    assert [t.case for t in s.case_timings()] == ["c1"]
+
+
+def test_grouped_steps_count_once_in_serial_time():
+    s = StepScheduler()
+    for flag, delay in (("move", 0.05), ("photo", 0.02), ("control", 0.03)):
+        s.add(f"c1/{flag}", lambda d=delay: time.sleep(d), case="c1", group="finish")
+    s.run()
+    (timing,) = s.case_timings()
+    assert 0.05 <= timing.serial_s < 0.09
+    assert timing.added_wall_s == pytest.approx(max(st.end_s for st in s.steps.values()))
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from coeff_stream import FS, PULSE_TO_M, CoefficientStream, data_deal
+from run_store import DEAL_CHANNELS, RunStore
+
+U, L, D, TINTERVAL = 0.5, 1.0, 0.02, 2.0
+Q = 0.5 * U * U * L * D * 1000.0
+F_SWAY, AMP, CL0, PHI, CDM = 0.5, 1.0, 0.5, np.pi / 3, 1.2
+
+
+@pytest.fixture(scope="module")
+def run():
+    """
+    Cross-flow oscillation of AMP diameters with a lift force CL0 leading it by PHI and a
+    constant drag CDM, after TINTERVAL s of still water.
+    """
+    t = np.arange(int(FS * (TINTERVAL + 100.0))) / FS
+    on = t >= TINTERVAL
+    w = 2 * np.pi * F_SWAY * (t[on] - TINTERVAL)
+    data = np.zeros((len(t), 10))
+    data[on, 3] = AMP * D / PULSE_TO_M * np.sin(w)
+    data[on, 6] = CL0 * Q * np.sin(w + PHI)
+    data[on, 7] = -CDM * Q
+    return data
+
+
+def test_data_deal_recovers_the_imposed_coefficients(run):
+    clv, cma, clv_il, cma_il, cdm = data_deal(run, U, L, D, 0.0, TINTERVAL, 1, 0)
+    f0non = F_SWAY * D / U
+    assert clv == pytest.approx(CL0 * np.sin(PHI), rel=0.05)
+    assert cma == pytest.approx(CL0 * np.cos(PHI) / (2 * np.pi**3 * AMP * f0non**2), rel=0.1)
+    assert cdm == pytest.approx(CDM, rel=0.01)
+    assert (clv_il, cma_il) == (0.0, 0.0)
+
+
+def test_stream_matches_the_text_file(run, tmp_path):
+    path = tmp_path / "20240102030405A1f1.txt"
+    text = "\n".join(" ".join(f"{v:.6f}" for v in row) for row in run)  # no final newline
+    path.write_text(text)
+    expected = data_deal(np.round(run, 6), U, L, D, 0.0, TINTERVAL, 1, 0)
+
+    store = RunStore(str(tmp_path / "runstore"), channels=DEAL_CHANNELS)
+    stream = CoefficientStream(
+        name="A1f1", U=U, L=L, D=D, M=0.0, tinterval=TINTERVAL, il_cl=0, path=str(path), poll_s=0.01, store=store
+    ).start()
+    assert stream.finish(settle_s=0.05) == pytest.approx(expected, rel=1e-9)
+    assert stream.samples == len(run)
+
+    (info,) = store.find("A1f1")
+    with store.open(info) as reader:
+        np.testing.assert_array_equal(reader.read(DEAL_CHANNELS), np.round(run, 6)[:, 3:10])
+
+
+def test_partial_lines_wait_for_the_rest():
+    stream = CoefficientStream(name="c", U=U, L=L, D=D, M=0.0, tinterval=TINTERVAL)
+    stream.feed("1 2 3\n4 5")
+    assert stream.samples == 1
+    stream.feed(" 6\n7 8 9")
+    assert stream.samples == 2
+    stream.feed("\n")
+    np.testing.assert_array_equal(stream.data(), [[1, 2, 3], [4, 5, 6], [7, 8, 9]])
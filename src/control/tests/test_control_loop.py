@@ -0,0 +1,29 @@
+import pytest
+
+from bench_control_loop import run_benchmark
+from device_sim import DeviceFaults
+
+
+@pytest.mark.parametrize("mode", ["serial", "pipelined"])
+def test_every_case_completes_against_the_simulated_fleet(mode, tmp_path):
+    result = run_benchmark(3, mode=mode, time_scale=0.002, workdir=str(tmp_path))
+    assert result["error"] is None
+    assert result["completed"] == 3
+
+
+def test_one_shot_links_without_status_replies(tmp_path):
+    result = run_benchmark(
+        2, mode="pipelined", time_scale=0.002, persistent=False, supports_config=False,
+        supports_status=False, workdir=str(tmp_path),
+    )
+    assert result["error"] is None
+    assert result["completed"] == 2
+
+
+def test_dropped_finish_flag_times_out(tmp_path):
+    result = run_benchmark(
+        2, mode="pipelined", time_scale=0.002, feedback_timeout_s=0.5,
+        faults=DeviceFaults(drop_finish=1.0), workdir=str(tmp_path),
+    )
+    assert result["error"] is not None
+    assert result["completed"] == 0
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from convergence import (
+    ConvergenceMonitor,
+    Expectation,
+    PredictionSummary,
+    conv_thresholds,
+    load_step5,
+    pair_target,
+    save_step5,
+)
+
+
+def _summary(sd, mu=1.0, ncol=2):
+    return PredictionSummary([sd] * ncol, [sd] * ncol, [-mu] * ncol, [mu] * ncol)
+
+
+def test_conv_thresholds():
+    assert conv_thresholds(0.05, 3) == [0.05, 0.05, 0.05]
+    assert conv_thresholds(0, 2) == [None, None]
+    assert conv_thresholds(1230, 4) == [0.01, 0.02, 0.03, None]
+    assert conv_thresholds(1234, 5) == [0.01, 0.02, 0.03, 0.04, 0.04]  # 5th column: 4th digit
+    assert conv_thresholds(5, 4) == [None, None, None, 0.05]
+
+
+def test_pair_target():
+    fwd, bwd = [1.0, 4.0], [3.0, 2.0]
+    assert pair_target(fwd, bwd, 2) == [2.0, 3.0]
+    assert pair_target(fwd, bwd, 1) == fwd
+    assert pair_target(fwd, bwd, 0) == bwd
+    assert pair_target(fwd, bwd, 3) == bwd
+    with pytest.raises(ValueError):
+        pair_target(fwd, bwd, 7)
+
+
+def test_phases_from_explore_to_stop():
+    phases = []
+    monitor = ConvergenceMonitor(0.1, 0.05, 2, ytrain_type=1, on_phase=lambda old, new, d: phases.append((old, new)))
+    assert monitor.add_prediction(_summary(0.5)).phase == "explore"
+    assert monitor.add_prediction(_summary(0.08)).phase == "refine"  # error ok, window 1/2
+    assert monitor.add_prediction(_summary(0.079)).phase == "refine"  # 0.84 change still in the window
+    decision = monitor.add_prediction(_summary(0.078))
+    assert decision.stop and decision.phase == "stop"
+    assert phases == [("explore", "refine"), ("refine", "stop")]
+    assert monitor.predictions == 4
+
+
+def test_measured_pair_far_from_its_prediction_reopens_refine():
+    x = (0.5, 0.2, 0.3)
+    monitor = ConvergenceMonitor(0.1, 0.05, 2, ytrain_type=1, inputs=["A1non", "f1non", "Speed"])
+    monitor.add_prediction(_summary(0.08))
+    monitor.add_prediction(_summary(0.0799))
+    monitor.add_prediction(_summary(0.0798), [Expectation(x, [1.0, 2.0], [0.08, 0.08])])
+    assert monitor.stop
+
+    monitor.add_coefficients(0, True, x, [1.0, 2.0, 0.0, 0.0, 0.0])
+    assert monitor.cases == 0
+    decision = monitor.add_coefficients(0, False, x, [1.2, 2.0, 0.0, 0.0, 0.0])  # target 1.1: 10 % off
+    assert (monitor.cases, monitor.matched) == (1, 1)
+    assert decision.phase == "refine"
+    assert decision.change[0] == pytest.approx(0.1)
+
+
+def test_failed_extraction_and_unchecked_columns_never_stop():
+    monitor = ConvergenceMonitor(0.1, 0, 1, ytrain_type=1)
+    for sd in (0.01, 0.01, 0.01):
+        assert not monitor.add_prediction(_summary(sd)).stop
+    monitor.add_coefficients(0, True, (0.5,), None)
+    monitor.add_coefficients(0, False, (0.5,), [1.0] * 5)
+    assert monitor.cases == 0
+
+
+def test_step5_files_round_trip(tmp_path):
+    pytest.importorskip("scipy")
+    x = np.array([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]])
+    mu = np.array([[1.0, -2.0], [1.5, -1.0], [0.5, 3.0]])
+    sd = np.full_like(mu, 0.1)
+    save_step5(str(tmp_path), {
+        "y_train": np.ones((4, 2)), "y_pre_data": mu, "y_pre_err": sd, "y_pre_sco": sd, "x_pre_data": x,
+        "next_point_write": x[1:2], "next_point_cal": x[1:2],
+    })
+    assert (tmp_path / "y_pre_data4.mat").exists()
+    summary, expected = load_step5(str(tmp_path))
+    assert summary.mu_max == [1.5, 3.0]
+    assert summary.rel_err() == pytest.approx([0.1 / 1.5, 0.1 / 3.0])
+    assert expected == [Expectation((0.3, 0.4), [1.5, -1.0], [0.1, 0.1])]
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from device_link import ConfigError, DeviceLink, config_mismatches, encode_config, legacy_commands, parse_config
+from device_sim import DeviceFaults, SimOscillator
+
+FEEDBACK = ("127.0.0.1", 9)  # never contacted: DISABLE_CONTROL sends no feedback
+
+
+def _until(cond, timeout_s=2.0):
+    deadline = time.monotonic() + timeout_s
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def _device(**kwargs):
+    return SimOscillator(FEEDBACK, **kwargs).start()
+
+
+def test_config_frame_round_trip():
+    frame = encode_config({"A1": 0.5, "NAME": "A1f1"}, ["DISABLE_CONTROL"])
+    assert frame == "CONFIG:A1=0.5;NAME=A1f1;DO=DISABLE_CONTROL"
+    assert parse_config(frame) == ({"A1": "0.5", "NAME": "A1f1"}, ["DISABLE_CONTROL"])
+    assert parse_config("ACK:CONFIG:A1=0.5") == ({"A1": "0.5"}, [])
+    assert legacy_commands({"A1": 0.5}, ["MOVE"]) == ["SET_A1:0.5", "MOVE"]
+
+
+def test_mismatches_compare_numbers_with_tolerance():
+    applied = {"A1": "0.50000000000001", "f1": "0.3", "NAME": "x"}
+    assert config_mismatches({"A1": 0.5, "NAME": "x"}, applied) == {}
+    assert config_mismatches({"f1": 0.2, "Theta": 0}, applied) == {"f1": (0.2, "0.3"), "Theta": (0, None)}
+
+
+def test_acknowledged_config_is_one_round_trip():
+    dev = _device()
+    try:
+        link = DeviceLink("127.0.0.1", dev.port)
+        applied = link.configure({"A1": 0.5, "NAME": "A1f1"}, ["DISABLE_CONTROL"])
+        assert applied == {"A1": "0.5", "NAME": "A1f1"}
+        assert link.supports_config and link.round_trips == 1
+        assert (dev.configs, dev.frames, dev.params["NAME"]) == (1, 1, "A1f1")
+        link.close()
+    finally:
+        dev.stop()
+
+
+def test_legacy_device_falls_back_to_single_commands():
+    dev = _device(supports_config=False)
+    try:
+        link = DeviceLink("127.0.0.1", dev.port, ack_timeout_s=0.2)
+        assert link.configure({"A1": 0.5}) == {"A1": "0.5"}
+        assert link.supports_config is False
+        link.configure({"A1": 0.7})  # not probed again
+        assert link.round_trips == 1
+        assert _until(lambda: dev.params == {"A1": "0.7"})
+        link.close()
+    finally:
+        dev.stop()
+
+
+def test_rejected_config_raises():
+    dev = _device(faults=DeviceFaults(nak_config=1.0))
+    try:
+        link = DeviceLink("127.0.0.1", dev.port)
+        with pytest.raises(ConfigError, match="rejected"):
+            link.configure({"A1": 0.5})
+        link.close()
+    finally:
+        dev.stop()
+
+
+def test_one_shot_link_sends_single_commands():
+    dev = _device()
+    try:
+        link = DeviceLink("127.0.0.1", dev.port, persistent=False)
+        link.configure({"A1": 0.5, "A2": 0.2})
+        assert link.round_trips == 0
+        assert _until(lambda: dev.params == {"A1": "0.5", "A2": "0.2"})
+        assert (dev.configs, dev.connections) == (0, 2)
+    finally:
+        dev.stop()
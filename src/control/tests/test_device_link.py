@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from device_link import ConnectionPool, DeviceLink, FrameBuffer, encode_frame
+from device_sim import DeviceFaults, SimOscillator
+
+FEEDBACK = ("127.0.0.1", 9)  # never contacted: the commands below send no feedback
+
+
+def _until(cond, timeout_s=2.0):
+    deadline = time.monotonic() + timeout_s
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+@pytest.fixture
+def device():
+    dev = SimOscillator(FEEDBACK).start()
+    yield dev
+    dev.stop()
+
+
+def test_frames_split_across_reads():
+    frames = FrameBuffer()
+    assert frames.feed(b"SET_A:1\r\nSET_") == ["SET_A:1"]
+    assert frames.feed(b"B:2\n\n") == ["SET_B:2"]
+    assert frames.feed(b"MOVE") == []
+    assert frames.flush() == ["MOVE"]
+    assert encode_frame("MOVE") == b"MOVE\n"
+
+
+def test_persistent_link_keeps_one_connection(device):
+    link = DeviceLink("127.0.0.1", device.port)
+    for k in range(3):
+        link.send(f"SET_K{k}:{k}")
+    assert _until(lambda: device.frames == 3)
+    assert (device.connections, link.connects, link.sends) == (1, 1, 3)
+    assert device.params == {"K0": "0", "K1": "1", "K2": "2"}
+    link.close()
+
+
+def test_link_reconnects_after_the_device_closed_it():
+    dev = SimOscillator(FEEDBACK, faults=DeviceFaults(disconnect=1.0)).start()
+    try:
+        link = DeviceLink("127.0.0.1", dev.port, retry_delay_s=0.01)
+        link.send("SET_A:1")
+        assert _until(lambda: dev.frames == 1)
+        time.sleep(0.05)  # let the close reach the client
+        link.send("SET_B:2")
+        assert _until(lambda: dev.frames == 2)
+        assert link.reconnects == 1
+        assert dev.params == {"A": "1", "B": "2"}
+        link.close()
+    finally:
+        dev.stop()
+
+
+def test_one_shot_link_connects_per_command(device):
+    link = DeviceLink("127.0.0.1", device.port, persistent=False)
+    link.send("SET_A:1")
+    link.send("SET_B:2")
+    assert _until(lambda: device.frames == 2)
+    assert device.connections == 2
+
+
+def test_pool_creates_one_link_per_endpoint_under_concurrency():
+    pool = ConnectionPool()
+    start = threading.Barrier(16)
+    links = []
+
+    def get():
+        start.wait()
+        links.append(pool.link("127.0.0.1", 50000))
+
+    threads = [threading.Thread(target=get) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(link) for link in links}) == 1
+    assert pool.link("127.0.0.1", "50000") is links[0]
+
+
+def test_pool_register_chooses_the_mode(device):
+    pool = ConnectionPool()
+    first = pool.link("127.0.0.1", device.port)
+    one_shot = pool.register("127.0.0.1", device.port, persistent=False)
+    assert one_shot is not first and not one_shot.persistent
+    assert pool.link("127.0.0.1", device.port) is one_shot
+    pool.send("127.0.0.1", device.port, "SET_A:1")
+    assert _until(lambda: device.params.get("A") == "1")
+    pool.close_all()
+    assert pool.link("127.0.0.1", device.port) is not one_shot
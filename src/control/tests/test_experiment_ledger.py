@@ -0,0 +1,87 @@
+import csv
+
+import pytest
+
+from bench_control_loop import import_control
+from experiment_ledger import DONE, PENDING, ExperimentLedger
+
+HEADER = ["Name", "A1", "f1", "Speed", "Finished"]
+
+
+def _write(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    with ExperimentLedger(str(tmp_path / "ledger.sqlite")) as led:
+        yield led
+
+
+def test_import_export_round_trip(ledger, tmp_path):
+    src = tmp_path / "initial_data.csv"
+    _write(src, [["A0.5f0.2", 0.5, 0.2, 0.3, 1], ["A1f0.2", 1, 0.2, 0.3, 0]])
+    assert ledger.import_csv(str(src)) == 2
+    assert [ledger.status(r) for r in (0, 1)] == [DONE, PENDING]
+    assert ledger.next_pending()["Name"] == "A1f0.2"
+
+    ledger.set_coefficients(0, {"Cv1": 0.25, "Cdm": 1.2})
+    out = tmp_path / "export.csv"
+    ledger.export_csv(str(out))
+    rows = _read(out)
+    assert list(rows[0]) == HEADER + ["Cv1", "Ca1", "Cv2", "Ca2", "Cdm"]
+    assert [r["Finished"] for r in rows] == ["1", "0"]
+    assert (rows[0]["A1"], rows[1]["A1"], rows[0]["Cv1"], rows[1]["Cv1"]) == ("0.5", "1", "0.25", "")
+
+
+def test_names_stay_verbatim(ledger, tmp_path):
+    src = tmp_path / "initial_data.csv"
+    _write(src, [["001", 0.5, 0.2, 0.3, 0], ["1e3", 1, 0.2, 0.3, 0]])
+    ledger.import_csv(str(src))
+    assert [r["Name"] for r in ledger.rows()] == ["001", "1e3"]
+    out = tmp_path / "export.csv"
+    ledger.export_csv(str(out))
+    assert [r["Name"] for r in _read(out)] == ["001", "1e3"]
+
+
+def test_reimport_appends_rows_and_keeps_status(ledger, tmp_path):
+    src = tmp_path / "initial_data.csv"
+    _write(src, [["c0", 0.5, 0.2, 0.3, 0]])
+    ledger.import_csv(str(src))
+    ledger.finish(0)
+    _write(src, [["c0", 0.5, 0.25, 0.3, 0], ["c1", 1, 0.2, 0.3, 0]])  # user table, Finished not updated
+    assert ledger.import_csv(str(src)) == 1
+    assert ledger.status(0) == DONE
+    assert ledger.rows()[0]["f1"] == 0.25
+
+
+def test_step_redo_request_reopens_the_case(ledger, tmp_path):
+    mc = import_control()
+    src = tmp_path / "initial_data.csv"
+    _write(src, [["c0", 0.5, 0.2, 0.3, 0], ["c1", 1, 0.2, 0.3, 0]])
+    ledger.import_csv(str(src))
+    ledger.finish(0)
+    ledger.finish(1)
+
+    def step4(filenamecsv):
+        rows = _read(filenamecsv)
+        assert [r["Finished"] for r in rows] == ["1", "1"]
+        rows[1]["Finished"] = "0"  # Errcoe failed: run the pair again
+        with open(filenamecsv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return 4
+
+    assert mc.ledger_step(ledger, str(src), step4, str(src)) == 4
+    assert [ledger.status(r) for r in (0, 1)] == [DONE, PENDING]
+    assert ledger.events(1)[-1]["detail"] == "Finished=0 in initial_data.csv"
+    assert ledger.next_pending()["Name"] == "c1"
@@ -0,0 +1,71 @@
+import socket
+
+import pytest
+
+from feedback_service import FINISH_FLAGS, FeedbackService, split_message
+
+
+def test_split_message():
+    assert split_message("finishmove: case3 ") == ("FINISHMOVE", "case3")
+    assert split_message("FINISHPHOTO") == ("FINISHPHOTO", None)
+
+
+def test_addressed_flag_resolves_its_case():
+    service = FeedbackService()
+    first, second = service.expect("c1"), service.expect("c2")
+    assert service.dispatch("FINISHMOVE:c2") is second
+    assert not first.futures["FINISHMOVE"].done()
+    assert second.futures["FINISHMOVE"].result() == "c2"
+
+
+def test_unaddressed_flag_resolves_the_oldest_waiting_case():
+    service = FeedbackService()
+    first, second = service.expect("c1"), service.expect("c2")
+    for flag in FINISH_FLAGS:
+        assert service.dispatch(flag) is first
+    assert first.done()
+    assert first.wait(0) == {flag: None for flag in FINISH_FLAGS}
+    assert service.dispatch("FINISHMOVE") is second
+
+
+def test_other_messages_and_cancelled_cases_are_not_dispatched():
+    service = FeedbackService()
+    case = service.expect("c1")
+    assert service.dispatch("STATUS:IDLE") is None
+    service.cancel(case)
+    assert service.dispatch("FINISHMOVE:c1") is None
+    assert case.futures["FINISHMOVE"].cancelled()
+
+
+def test_wait_reports_missing_flags():
+    case = FeedbackService().expect("c1", flags=("FINISHMOVE", "FINISHCONTROL"))
+    case.futures["FINISHMOVE"].set_result(None)
+    with pytest.raises(TimeoutError, match="FINISHCONTROL"):
+        case.wait(0.01)
+
+
+def test_frames_from_the_network_are_dispatched():
+    with FeedbackService(host="127.0.0.1", port=0) as service:
+        case = service.expect("c1")
+        with socket.create_connection(("127.0.0.1", service.port)) as sock:
+            sock.sendall(b"READY:CAMERA\nFINISHMOVE:c1\r\nFINISHPH")
+            sock.sendall(b"OTO:c1\nFINISHCONTROL:c1")  # last frame unterminated (one-shot sender)
+        assert case.wait(5) == {"FINISHMOVE": "c1", "FINISHPHOTO": "c1", "FINISHCONTROL": "c1"}
+        assert service.ready.get("CAMERA") is not None
+        assert service.messages_received == 4
+
+
+def test_campaign_listener_updates_the_controller_states():
+    from bench_control_loop import import_control
+
+    mc = import_control()
+    tow = mc.TowingCarriage(ip="127.0.0.1", port=0)
+    cam = mc.CameraController(ip="127.0.0.1", port=0)
+    osc = mc.ForcedOscillationController(ip="127.0.0.1", port=0)
+    tow.movestatus = cam.photostatus = osc.movestatus = True
+    service = mc.make_feedback_service(tow, cam, osc, host="127.0.0.1", port=0)
+    case = service.expect("c1")
+    for message in ("FINISHMOVE:12.5", "FINISHPHOTO", "FINISHCONTROL"):
+        service._on_frame("127.0.0.1", message)
+    assert case.done()
+    assert (tow.movestatus, tow.position, cam.photostatus, osc.movestatus) == (False, 12.5, False, False)
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import gp_compact
+from gp_compact import CompactGP, basis, kernel, load_compact, write_compact
+
+
+def _model(kernel_name="squaredexponential", basis_name="constant", outputs=1):
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0.0, 4.0, size=(25, 2))
+    Y = np.column_stack([np.sin(X[:, 0]) + 0.3 * X[:, 1] * (k + 1) for k in range(outputs)])
+    xloc, xscale = X.mean(0), X.std(0)
+    ymu, ysd = Y.mean(0), Y.std(0)
+    Xs = (X - xloc) / xscale
+    Ys = (Y - ymu) / ysd
+    ell, sf, sn = np.array([0.8, 1.5]), 1.2, 0.05
+    K = kernel(kernel_name, Xs, Xs, ell, sf) + sn * sn * np.eye(len(X))
+    L = np.linalg.cholesky(K)
+    H = basis(basis_name, Xs)
+    beta = np.linalg.lstsq(H, Ys, rcond=None)[0] if H.size else None
+    alpha = np.linalg.solve(K, Ys - (H @ beta if H.size else 0.0))
+    return dict(X=Xs, alpha=alpha, L=L, kernel=kernel_name, ell=ell, sf=sf, sn=sn, beta=beta,
+                basis=basis_name, xloc=xloc, xscale=xscale, ymu=ymu, ysd=ysd), K
+
+
+def _reference(model, K, Xq):
+    # Textbook GP posterior in the original units.
+    Xs = (Xq - model["xloc"]) / model["xscale"]
+    Ks = kernel(model["kernel"], model["X"], Xs, model["ell"], model["sf"])
+    mu = Ks.T @ model["alpha"]
+    if model["beta"] is not None:
+        mu = mu + basis(model["basis"], Xs) @ model["beta"]
+    var = model["sf"] ** 2 - np.einsum("ij,ij->j", Ks, np.linalg.solve(K, Ks)) + model["sn"] ** 2
+    return mu * model["ysd"] + model["ymu"], np.sqrt(var)[:, None] * model["ysd"]
+
+
+@pytest.mark.parametrize("kernel_name", gp_compact.KERNELS)
+def test_predict_matches_the_model(tmp_path, kernel_name):
+    model, K = _model(kernel_name)
+    path = str(tmp_path / f"{kernel_name}.gpc")
+    footer = write_compact(path, **model)
+    assert footer["n"] == 25 and footer["d"] == 2 and footer["outputs"] == 1
+    Xq = np.random.default_rng(1).uniform(0.0, 4.0, size=(40, 2))
+    mu_ref, sd_ref = _reference(model, K, Xq)
+    with load_compact(path, block=7) as gp:  # several kernel blocks
+        mu, sd = gp.predict(Xq)
+    assert mu.shape == sd.shape == (40,)
+    np.testing.assert_allclose(mu, mu_ref[:, 0], rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(sd, sd_ref[:, 0], rtol=1e-8, atol=1e-10)
+
+
+def test_multi_output_and_numpy_fallback(tmp_path, monkeypatch):
+    model, K = _model("matern52", "linear", outputs=2)
+    path = str(tmp_path / "two.gpc")
+    write_compact(path, **model)
+    monkeypatch.setattr(gp_compact, "solve_triangular", None)
+    Xq = np.random.default_rng(2).uniform(0.0, 4.0, size=(10, 2))
+    mu_ref, sd_ref = _reference(model, K, Xq)
+    with CompactGP(path) as gp:
+        mu, sd = gp.predict(Xq)
+        assert mu.shape == (10, 2)
+        np.testing.assert_allclose(mu, mu_ref, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(sd, sd_ref, rtol=1e-6, atol=1e-8)
+        assert gp.predict(Xq[:3], return_sd=False).shape == (3, 2)
+
+
+def test_float32_file_is_close(tmp_path):
+    model, K = _model()
+    path = str(tmp_path / "f32.gpc")
+    write_compact(path, dtype="float32", **model)
+    Xq = np.random.default_rng(3).uniform(0.0, 4.0, size=(5, 2))
+    mu_ref, _ = _reference(model, K, Xq)
+    with CompactGP(path) as gp:
+        assert gp.meta["dtype"] == "float32"
+        np.testing.assert_allclose(gp.predict(Xq, return_sd=False), mu_ref[:, 0], rtol=1e-3, atol=1e-3)
+
+
+def test_cache_answers_repeated_points(tmp_path):
+    model, _ = _model()
+    path = str(tmp_path / "c.gpc")
+    write_compact(path, **model)
+    Xq = np.array([[1.0, 2.0], [3.0, 0.5], [1.0, 2.0]])
+    with CompactGP(path, cache_size=2) as gp:
+        mu, sd = gp.predict(Xq)
+        assert mu[0] == mu[2] and sd[0] == sd[2]
+        assert gp.cache_info() == {"hits": 0, "misses": 2, "size": 2, "max_size": 2}  # duplicate computed once
+        mu2, _ = gp.predict(Xq[:2])
+        np.testing.assert_array_equal(mu2, mu[:2])
+        assert gp.cache_info()["hits"] == 2
+        np.testing.assert_allclose(gp.predict(Xq, use_cache=False)[0], mu)
+        gp.predict(np.array([[0.1, 0.1]]))  # evicts the oldest point
+        assert gp.cache_info()["size"] == 2
+        gp.clear_cache()
+        assert gp.cache_info() == {"hits": 0, "misses": 0, "size": 0, "max_size": 2}
+
+
+def test_bad_inputs(tmp_path):
+    model, _ = _model()
+    with pytest.raises(ValueError):
+        write_compact(str(tmp_path / "x.gpc"), **dict(model, kernel="cubic"))
+    path = str(tmp_path / "m.gpc")
+    write_compact(path, **model)
+    with CompactGP(path) as gp, pytest.raises(ValueError):
+        gp.predict(np.zeros((2, 3)))
+    truncated = tmp_path / "t.gpc"
+    truncated.write_bytes(open(path, "rb").read()[:-4])
+    with pytest.raises(RuntimeError):
+        CompactGP(str(truncated)).open()
@@ -0,0 +1,77 @@
+import pytest
+
+from optimizer_session import GPR_PRE_CORE, READ_RUN, OptimizerSession, StubPackage, from_matlab, to_matlab
+
+
+class MatlabExecutionError(Exception):
+    pass
+
+
+def test_runtime_started_once_for_all_steps():
+    pkg = StubPackage(results={6: 1})
+    session = OptimizerSession(pkg)
+    session.step(4, "in.txt", "cases.csv", "store")
+    session.step(5, "in.txt", "cases.csv", "", "pre.txt")
+    assert session.step(6, "in.txt", "cases.csv") == 1
+    assert pkg.initializations == 1
+    assert [c[0] for c in pkg.calls] == [4, 5, 6]
+    assert session.timings["step5"].calls == 1
+    session.close()
+    assert not session.running
+
+
+def test_dead_runtime_is_restarted_and_the_step_retried():
+    pkg = StubPackage()
+    session = OptimizerSession(pkg)
+    session.start()
+    pkg.crash_next = True
+    assert session.step(4, "in.txt", "cases.csv") == 4
+    assert session.restarts == 1
+    assert pkg.initializations == 2
+
+
+def test_matlab_code_errors_are_raised_without_restart():
+    def fail(stepn, *args):
+        raise MatlabExecutionError("index exceeds array bounds")
+
+    pkg = StubPackage(results={4: fail})
+    session = OptimizerSession(pkg)
+    with pytest.raises(MatlabExecutionError):
+        session.step(4, "in.txt", "cases.csv")
+    assert session.restarts == 0
+    assert pkg.initializations == 1
+
+
+def test_restart_limit():
+    pkg = StubPackage(results={4: lambda *a: (_ for _ in ()).throw(RuntimeError("runtime gone"))})
+    session = OptimizerSession(pkg, max_restarts=1)
+    with pytest.raises(RuntimeError):
+        session.step(4, "in.txt", "cases.csv")
+    assert session.restarts == 1
+
+
+def test_array_exchange_without_matlab_module():
+    assert to_matlab({"S": 12, "Name": "x", "v": [1, 2]}) == {"S": 12.0, "Name": "x", "v": [[1.0, 2.0]]}
+    assert to_matlab([[1, 2], [3, 4]]) == [[1.0, 2.0], [3.0, 4.0]]
+    assert from_matlab((1, [[2, 3]], {"a": 4})) == (1.0, [[2.0, 3.0]], {"a": 4.0})
+
+
+def test_capabilities_are_declared_not_probed():
+    session = OptimizerSession(StubPackage(functions={"GPR_Pre_core": lambda *a, **k: None}))
+    assert not session.provides(GPR_PRE_CORE)
+    assert not session.running
+
+
+def test_compiled_functions_beyond_step0():
+    seen = {}
+
+    def core(p0, p1, coe, x, out_dir, nargout=1):
+        seen.update(p0=p0, coe=coe, out_dir=out_dir, nargout=nargout)
+        return [[1, 2]], [[3, 4]]
+
+    session = OptimizerSession(StubPackage(functions={"GPR_Pre_core": core}), capabilities=[GPR_PRE_CORE])
+    assert session.provides(GPR_PRE_CORE)
+    assert not session.provides(READ_RUN)
+    out = session.call_arrays("GPR_Pre_core", {"L": 1}, {}, [[0.5] * 5], [[1, 2]], "/tmp/rig", nargout=2)
+    assert out == ([[1.0, 2.0]], [[3.0, 4.0]])
+    assert seen == {"p0": {"L": 1.0}, "coe": [[0.5] * 5], "out_dir": "/tmp/rig", "nargout": 2}
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from device_link import DeviceLink
+from device_sim import SimOscillator
+from readiness import ReadinessBoard, ReadinessConfig, ReadinessProbe, is_on
+
+FEEDBACK = ("127.0.0.1", 9)  # never contacted: the tests below send no commands
+
+
+def test_board_records_ready_events():
+    board = ReadinessBoard()
+    assert not board.feed("FINISHMOVE:1.5")
+    assert not board.feed("READY:")
+    g = board.generation
+    assert board.feed("ready:water:0.01\n")
+    assert board.get("WATER")[1] == "0.01"
+    assert board.feed("READY:SERVO")
+    assert board.get("servo")[1] is None
+    assert board.generation == g + 2
+    assert board.get("PHOTO") is None
+    assert not board.wait_change(board.generation, 0.01)
+    assert board.wait_change(g, 0.01)  # already changed
+    assert is_on(" yes ") and not is_on("0") and not is_on(None)
+
+
+def test_events_count_only_after_since():
+    board = ReadinessBoard()
+    probe = ReadinessProbe(board)
+    board.mark("SERVO", "1")
+    since = time.monotonic()
+    assert not probe.servo_enabled(None, since + 1.0)
+    assert probe.servo_enabled(None, since - 1.0)
+    board.mark("WATER", "0.5")
+    assert not probe.water_settled(None, since)  # event value above water_std_n
+    board.feed("READY:WATER:0.01")
+    assert probe.water_settled(None, since)
+
+
+def test_one_shot_link_is_never_queried(capsys):
+    dev = SimOscillator(FEEDBACK).start()
+    try:
+        probe = ReadinessProbe(ReadinessBoard(), ReadinessConfig(poll_s=0.01))
+        link = DeviceLink("127.0.0.1", dev.port, persistent=False)
+        since = time.monotonic()
+        assert not probe.wait(lambda: probe.oscillator_armed(link, since), 0.05, "arm")
+        assert not probe.camera_recording(link, since)
+        assert dev.status_queries == 0
+        assert capsys.readouterr().out.count("one-shot link") == 1
+    finally:
+        dev.stop()
+
+
+def test_status_queries_on_a_persistent_link():
+    water = [0.5]
+    dev = SimOscillator(FEEDBACK, water_std=lambda: water[0]).start()
+    link = DeviceLink("127.0.0.1", dev.port)
+    try:
+        probe = ReadinessProbe(ReadinessBoard(), ReadinessConfig(status_timeout_s=1.0))
+        since = time.monotonic()
+        assert not probe.oscillator_armed(link, since)
+        dev.armed = True
+        assert probe.oscillator_armed(link, since)
+        assert not probe.water_settled(link, since)
+        water[0] = 0.01
+        assert probe.water_settled(link, since)
+        assert dev.status_queries == 4 and link.supports_status
+    finally:
+        link.close()
+        dev.stop()
+
+
+def test_unanswered_status_is_not_asked_again():
+    dev = SimOscillator(FEEDBACK, supports_status=False).start()
+    link = DeviceLink("127.0.0.1", dev.port)
+    try:
+        probe = ReadinessProbe(ReadinessBoard(), ReadinessConfig(status_timeout_s=0.05))
+        assert not probe.oscillator_armed(link, time.monotonic())
+        assert link.supports_status is False
+        t0 = time.monotonic()
+        assert not probe.oscillator_armed(link, time.monotonic())
+        assert time.monotonic() - t0 < 0.04
+    finally:
+        link.close()
+        dev.stop()
+
+
+def test_wait_ends_on_an_event():
+    board = ReadinessBoard()
+    probe = ReadinessProbe(board, ReadinessConfig(poll_s=10.0))  # only the event can wake it
+    since = time.monotonic()
+    threading.Timer(0.05, board.feed, args=("READY:PHOTO:1",)).start()
+    t0 = time.monotonic()
+    assert probe.wait(lambda: probe.camera_recording(None, since), 5.0, "camera")
+    assert time.monotonic() - t0 < 2.0
+
+
+def test_disabled_probe_sleeps_the_fixed_wait():
+    board = ReadinessBoard()
+    board.mark("SERVO", "1")
+    probe = ReadinessProbe(board, ReadinessConfig(enabled=False))
+    t0 = time.monotonic()
+    assert not probe.wait(lambda: True, 0.05, "servo")
+    assert time.monotonic() - t0 >= 0.05
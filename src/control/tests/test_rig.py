@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from bench_control_loop import import_control
+from experiment_ledger import ExperimentLedger
+from optimizer_session import STEP_FOLDER, OptimizerSession, StubPackage
+from rig import Orchestrator, Rig
+
+
+def _rig(name, workdir, campaign=lambda rig: None, optimizer=None, port=55001):
+    optimizer = optimizer or OptimizerSession(StubPackage(), capabilities=[STEP_FOLDER])
+    return Rig(name, workdir, {}, campaign, optimizer, listener_port=port)
+
+
+def test_relative_workdir_is_made_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rig = _rig("a", "rig_a")
+    assert rig.workdir == str(tmp_path / "rig_a")
+    assert rig.path("initial_data.csv") == str(tmp_path / "rig_a" / "initial_data.csv")
+
+
+def test_rigs_need_distinct_workdirs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError, match="workdirs"):
+        Orchestrator([_rig("a", "rig_a", port=55001), _rig("b", str(tmp_path / "rig_a") + os.sep, port=55002)])
+
+
+def test_rigs_on_builds_without_step_folder_run_alone(tmp_path):
+    old = OptimizerSession(StubPackage())
+    with pytest.raises(ValueError, match="one rig per process"):
+        Orchestrator([_rig("a", str(tmp_path / "a"), port=55001), _rig("b", str(tmp_path / "b"), optimizer=old, port=55002)])
+    assert Orchestrator([_rig("a", str(tmp_path / "a"), optimizer=old)]).run() == {"a": None}
+
+
+def test_concurrent_rigs_keep_their_own_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mc = import_control()
+    pkg = StubPackage(results={4: lambda stepn, filenametxt, filenamecsv, *rest: os.path.exists(filenamecsv)})
+    session = OptimizerSession(pkg, capabilities=[STEP_FOLDER])
+    seen = {}
+
+    def campaign(rig):
+        filenamecsv = rig.path("initial_data.csv")
+        with open(filenamecsv, "w", encoding="utf-8") as f:
+            f.write(f"Name,Finished\n{rig.name},1\n")
+        with ExperimentLedger(rig.path("ledger.sqlite")) as ledger:
+            ledger.import_csv(filenamecsv)
+            for _ in range(3):
+                assert mc.ledger_step(ledger, filenamecsv, rig.optimizer.step, 4, rig.path("x.txt"), filenamecsv)
+                assert os.getcwd() == str(tmp_path)
+            seen[rig.name] = [r["Name"] for r in ledger.rows()]
+
+    rigs = [_rig(n, f"rig_{n}", campaign, session, port=p) for n, p in (("a", 55001), ("b", 55002))]
+    assert Orchestrator(rigs).run() == {"a": None, "b": None}
+    assert seen == {"a": ["a"], "b": ["b"]}
+    assert pkg.initializations == 1
+    assert not session.running
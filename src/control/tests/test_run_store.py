@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+from run_store import DEAL_CHANNELS, RunReader, RunStore, parse_run_filename, read_txt, write_run
+
+
+def _run(n=2500, ncols=11, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, ncols)).round(6)
+
+
+def _write_txt(path, data):
+    np.savetxt(path, data, fmt="%.6f")
+    return path
+
+
+def test_parse_run_filename():
+    assert parse_run_filename("/x/20240102030405A1f1.txt") == ("20240102030405", "A1f1")
+    assert parse_run_filename("notes.txt") == (None, "notes")
+
+
+def test_range_reads_across_chunks(tmp_path):
+    data = _run()
+    path = str(tmp_path / "r.fsirun")
+    write_run(path, data, chunk=1000)
+    with RunReader(path) as reader:
+        assert reader.n_samples == len(data)
+        np.testing.assert_array_equal(reader.read([3, 9], 990, 2010), data[990:2010, [3, 9]])
+        np.testing.assert_array_equal(reader.read(start=2400, stop=9999), data[2400:])
+        assert reader.read([3], 10, 10).shape == (0, 1)
+        np.testing.assert_array_equal(reader.read_full(DEAL_CHANNELS)[:, 3:10], data[:, 3:10])
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = str(tmp_path / "r.fsirun")
+    write_run(path, _run(100))
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 4)
+    with pytest.raises(RuntimeError, match="Not a complete run file"):
+        RunReader(path)
+
+
+def test_store_converts_once_and_reloads_its_index(tmp_path):
+    data = _run()
+    txt = _write_txt(str(tmp_path / "20240102030405A1f1.txt"), data)
+    store = RunStore(str(tmp_path / "runstore"), chunk=1000, channels=DEAL_CHANNELS)
+    info = store.convert(txt, direction=1)
+    assert store.convert(txt) is info
+    assert (info.name, info.started, info.n_samples) == ("A1f1", "20240102030405", len(data))
+
+    reopened = RunStore(str(tmp_path / "runstore"))
+    (found,) = reopened.find("A1f1")
+    assert found.direction == 1
+    with reopened.open(found) as reader:
+        np.testing.assert_array_equal(reader.read(DEAL_CHANNELS), read_txt(txt)[:, 3:10])
+    assert os.path.exists(txt)
+
+
+def test_replace_source_keeps_one_copy(tmp_path):
+    data = _run()
+    txt = _write_txt(str(tmp_path / "20240102030405A1f1.txt"), data)
+    store = RunStore(str(tmp_path / "runstore"), channels=DEAL_CHANNELS, replace_source=True)
+    info = store.convert(txt)
+    assert not os.path.exists(txt)
+    with store.open(info) as reader:
+        np.testing.assert_array_equal(reader.read_full(DEAL_CHANNELS)[:, 3:10], data[:, 3:10])
+
+
+def test_partial_buffer_keeps_the_source(tmp_path):
+    data = _run()
+    txt = _write_txt(str(tmp_path / "20240102030405A1f1.txt"), data)
+    store = RunStore(str(tmp_path / "runstore"), channels=DEAL_CHANNELS, replace_source=True)
+    info = store.add(data[:-100], "A1f1", started="20240102030405", source=txt)  # stream stopped early
+    assert os.path.exists(txt)
+    assert store.lookup_source(txt) is info
+
+
+def test_source_changed_after_storing_is_kept(tmp_path, monkeypatch):
+    data = _run()
+    txt = _write_txt(str(tmp_path / "20240102030405A1f1.txt"), data)
+    store = RunStore(str(tmp_path / "runstore"), channels=DEAL_CHANNELS, replace_source=True)
+    monkeypatch.setattr(store, "_remove_source", lambda info: None)
+    info = store.convert(txt)
+    with open(txt, "a", encoding="utf-8") as f:
+        f.write(" ".join(["1.0"] * data.shape[1]) + "\n")
+    monkeypatch.undo()
+    store._remove_source(info)
+    assert os.path.exists(txt)
+
+
+def test_find_returns_newest_first(tmp_path):
+    store = RunStore(str(tmp_path))
+    store.add(_run(10), "A1f1", started="20240101000000")
+    store.add(_run(10), "A1f1", started="20240102000000")
+    store.add(_run(10), "A2f2", started="20240103000000")
+    assert [i.started for i in store.find("A1f1")] == ["20240102000000", "20240101000000"]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from gp_compact import CompactGP, kernel, write_compact
+from surrogate_service import SurrogateClient, SurrogateService, z_value
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-1.0, 1.0, size=(15, 2))
+    y = np.cos(2.0 * X[:, 0]) + X[:, 1]
+    ell, sf, sn = np.array([0.7, 0.9]), 1.0, 0.1
+    K = kernel("squaredexponential", X, X, ell, sf) + sn * sn * np.eye(len(X))
+    path = str(tmp_path / "m.gpc")
+    write_compact(path, X=X, alpha=np.linalg.solve(K, y), L=np.linalg.cholesky(K),
+                  kernel="squaredexponential", ell=ell, sf=sf, sn=sn, meta={"predictor_names": ["a", "b"]})
+    return path
+
+
+def test_z_value():
+    assert z_value(0.95) == pytest.approx(1.959964, abs=1e-6)
+    with pytest.raises(ValueError):
+        z_value(1.0)
+
+
+def test_concurrent_queries_are_coalesced(model_path):
+    Xq = np.random.default_rng(1).uniform(-1.0, 1.0, size=(6, 2))
+    with CompactGP(model_path) as gp:
+        mu_ref, sd_ref = gp.predict(Xq, use_cache=False)
+    with SurrogateService({"m": model_path}, port=None, max_wait_s=0.2) as svc:
+        futures = [svc.submit("m", Xq[i : i + 2], level=lvl) for i, lvl in zip((0, 2, 4), (0.9, 0.95, 0.99))]
+        results = [f.result(timeout=5) for f in futures]
+        stats = svc.stats.snapshot()
+    assert stats["batches"] == 1 and stats["requests"] == 3 and stats["points"] == 6
+    np.testing.assert_allclose(np.concatenate([r.mu for r in results]), mu_ref)
+    np.testing.assert_allclose(np.concatenate([r.sd for r in results]), sd_ref)
+    r = results[2]
+    assert r.level == 0.99
+    np.testing.assert_allclose(r.hi - r.mu, z_value(0.99) * r.sd)
+    np.testing.assert_allclose(r.mu - r.lo, z_value(0.99) * r.sd)
+
+
+def test_submit_rejects_bad_queries(model_path):
+    svc = SurrogateService({"m": model_path}, port=None)
+    with pytest.raises(RuntimeError):
+        svc.query("m", [[0.0, 0.0]])  # not started
+    with svc:
+        with pytest.raises(KeyError):
+            svc.submit("other", [[0.0, 0.0]])
+        with pytest.raises(ValueError):
+            svc.submit("m", [[0.0, 0.0, 0.0]])
+        with pytest.raises(ValueError):
+            svc.submit("m", [[0.0, 0.0]], level=1.5)
+        assert svc.query("m", [[0.0, 0.0]], timeout=5).mu.shape == (1,)
+
+
+def test_socket_api(model_path):
+    with SurrogateService({"m": model_path}, port=0) as svc:
+        expected = svc.query("m", [[0.1, -0.2], [0.3, 0.4]], timeout=5)
+        with SurrogateClient(port=svc.port) as client:
+            reply = client.query("m", [[0.1, -0.2], [0.3, 0.4]])
+            np.testing.assert_allclose(reply["mu"], expected.mu)
+            np.testing.assert_allclose(reply["hi"], expected.hi)
+            assert client.models() == {"m": {"d": 2, "n": 15, "outputs": 1, "kernel": "squaredexponential",
+                                              "inputs": ["a", "b"]}}
+            with pytest.raises(RuntimeError, match="Unknown model"):
+                client.query("other", [[0.0, 0.0]])
+            with pytest.raises(RuntimeError, match="Unknown command"):
+                client.request({"cmd": "reload"})
+            stats = client.stats()
+    assert stats["requests"] == 2 and stats["errors"] == 2
+    assert "latency_ms_p50" in stats
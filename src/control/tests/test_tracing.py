@@ -0,0 +1,100 @@
+import json
+import threading
+
+import pytest
+
+from tracing import Tracer
+
+
+def test_spans_carry_thread_tags():
+    t = Tracer()
+    with t.tags(case="A1", direction=1):
+        with t.span("wait", "photo", fn=len):
+            pass
+        t.set_tags(direction=None, iteration=2)
+        t.instant("feedback", "FINISHPHOTO")
+    with t.span("send", "MOVE"):
+        pass
+    (span, instant, outside) = t.events()
+    assert span[:3] == ("X", "wait", "photo") and span[6] == {"case": "A1", "direction": 1}
+    assert instant[:3] == ("i", "feedback", "FINISHPHOTO") and instant[6] == {"case": "A1", "iteration": 2}
+    assert outside[6] == {}
+    assert t.current_tags() == {}
+
+
+def test_disabled_tracer_records_nothing():
+    t = Tracer(enabled=False)
+
+    @t.traced("optimizer")
+    def step(x):
+        return x + 1
+
+    with t.span("wait", "x"):
+        t.instant("feedback", "y")
+    assert step(1) == 2
+    assert t.events() == []
+
+
+def test_traced_decorator_and_span_on_error():
+    t = Tracer()
+
+    @t.traced("optimizer")
+    def fit():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        fit()
+    assert [e[:3] for e in t.events()] == [("X", "optimizer", "fit")]
+
+
+def test_capacity_keeps_the_latest_events():
+    t = Tracer(capacity=3)
+    for i in range(5):
+        t.instant("send", str(i))
+    assert [e[2] for e in t.events()] == ["2", "3", "4"]
+    t.clear()
+    assert t.events() == []
+
+
+def test_summary_self_times():
+    t = Tracer()
+    ms = 1_000_000
+    with t.tags(case="A1"):
+        t._append("X", "case", "A1", 0, 100 * ms, {})
+        t._append("X", "wait", "photo", 10 * ms, 30 * ms, {})
+        t._append("X", "send", "MOVE", 15 * ms, 5 * ms, {})  # nested in the wait
+        t._append("X", "wait", "move", 50 * ms, 20 * ms, {})
+    with t.tags(case="A2"):
+        t._append("X", "wait", "photo", 100 * ms, 100 * ms, {})
+    rows = {r["key"]: r for r in t.summary()}
+    assert rows[("case",)]["self_s"] == pytest.approx(0.05)
+    assert rows[("wait",)]["count"] == 3
+    assert rows[("wait",)]["total_s"] == pytest.approx(0.15)
+    assert rows[("wait",)]["self_s"] == pytest.approx(0.145)
+    assert rows[("wait",)]["max_s"] == pytest.approx(0.1)
+    assert rows[("send",)]["share"] == pytest.approx(0.005 / 0.2)
+    assert sum(r["self_s"] for r in rows.values()) == pytest.approx(0.2)
+    by_case = {r["key"]: r for r in t.summary(by=("case", "name"))}
+    assert by_case[("A1", "photo")]["self_s"] == pytest.approx(0.025)
+    assert by_case[("A2", "photo")]["total_s"] == pytest.approx(0.1)
+    table = t.format_summary(by=("case",))
+    assert table.splitlines()[0].startswith("case") and "A2" in table
+
+
+def test_export_chrome(tmp_path):
+    t = Tracer()
+    worker = threading.Thread(target=lambda: t.instant("ready", "probe", obj=object()), name="probe-thread")
+    worker.start()
+    worker.join()
+    with t.tags(case="A1"):
+        with t.span("save", "run", n=3):
+            pass
+    path = tmp_path / "trace.json"
+    t.export_chrome(str(path))
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert "probe-thread" in names
+    inst = next(e for e in events if e["ph"] == "i")
+    assert inst["s"] == "t" and isinstance(inst["args"]["obj"], str)
+    span = next(e for e in events if e["ph"] == "X")
+    assert span["args"] == {"case": "A1", "n": 3} and span["dur"] >= 0
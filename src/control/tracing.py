@@ -0,0 +1,211 @@
+"""
+Low-overhead span tracing of the experiment loop (commands, waits, feedback, optimizer steps).
+
+Modules integrated:
+- Tracer: thread-safe ring buffer of spans and instant events, tagged with case name,
+  direction and iteration from a per-thread tag context
+- Chrome trace-event JSON export (chrome://tracing, Perfetto UI)
+- Per-phase summary table: count, total, self time (nested spans excluded), mean, max and
+  share of the traced wall time, grouped by category, name or case
+
+Notes:
+- `tracer` is the process-wide instance used by device_link, feedback_service,
+  optimizer_session, case_scheduler and main_command1V2.
+- A span costs two perf_counter_ns() calls and one deque append; with `enabled = False`
+  nothing is recorded. The buffer keeps the last `capacity` events.
+- Categories: connect, send, config, wait, feedback, ready, save, coeff, optimizer, step, case.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# (phase 'X' span / 'i' instant, category, name, start ns, duration ns, thread id, tags, args)
+Event = Tuple[str, str, str, int, int, int, Dict[str, Any], Dict[str, Any]]
+
+
+class Tracer:
+    def __init__(self, *, enabled: bool = True, capacity: int = 1_000_000) -> None:
+        self.enabled = enabled
+        self._events: Deque[Event] = deque(maxlen=capacity)
+        self._threads: Dict[int, str] = {}
+        self._local = threading.local()
+        self._t0 = time.perf_counter_ns()
+
+    # ----------------------------- Tags -----------------------------
+
+    def current_tags(self) -> Dict[str, Any]:
+        return getattr(self._local, "tags", {})
+
+    def set_tags(self, **tags: Any) -> None:
+        """
+        Update the tags of the calling thread (None removes a tag).
+        """
+        merged = dict(self.current_tags())
+        for k, v in tags.items():
+            if v is None:
+                merged.pop(k, None)
+            else:
+                merged[k] = v
+        self._local.tags = merged
+
+    @contextmanager
+    def tags(self, **tags: Any) -> Iterator[None]:
+        """
+        Tag every span of this thread inside the block (e.g. case=..., direction=..., iteration=...).
+        """
+        old = self.current_tags()
+        self.set_tags(**tags)
+        try:
+            yield
+        finally:
+            self._local.tags = old
+
+    # ----------------------------- Recording -----------------------------
+
+    def _append(self, ph: str, cat: str, name: str, start: int, dur: int, args: Dict[str, Any]) -> None:
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        self._events.append((ph, cat, name, start, dur, tid, self.current_tags(), args))
+
+    @contextmanager
+    def span(self, cat: str, name: str, **args: Any) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._append("X", cat, name, start, time.perf_counter_ns() - start, args)
+
+    def instant(self, cat: str, name: str, **args: Any) -> None:
+        if self.enabled:
+            self._append("i", cat, name, time.perf_counter_ns(), 0, args)
+
+    def traced(self, cat: str, name: Optional[str] = None) -> Callable:
+        """
+        Decorator form of span().
+        """
+
+        def deco(fn: Callable) -> Callable:
+            label = name or fn.__name__
+
+            @wraps(fn)
+            def wrapper(*a: Any, **kw: Any) -> Any:
+                with self.span(cat, label):
+                    return fn(*a, **kw)
+
+            return wrapper
+
+        return deco
+
+    def events(self) -> List[Event]:
+        return list(self._events)
+
+    def clear(self) -> None:
+        self._events.clear()
+        self._t0 = time.perf_counter_ns()
+
+    # ----------------------------- Export -----------------------------
+
+    def export_chrome(self, path: str) -> None:
+        """
+        Write the events as Chrome trace-event JSON (timestamps in microseconds).
+        """
+        pid = os.getpid()
+        out: List[Dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self._threads.items()
+        ]
+        for ph, cat, name, start, dur, tid, tags, args in self.events():
+            ev: Dict[str, Any] = {
+                "name": name, "cat": cat, "ph": ph, "ts": (start - self._t0) / 1e3, "pid": pid, "tid": tid,
+                "args": {**tags, **{k: _jsonable(v) for k, v in args.items()}},
+            }
+            if ph == "X":
+                ev["dur"] = dur / 1e3
+            else:
+                ev["s"] = "t"
+            out.append(ev)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": out, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp, path)
+
+    def summary(self, by: Sequence[str] = ("cat",)) -> List[Dict[str, Any]]:
+        """
+        Spans grouped by any of 'cat', 'name' and tag names ('case', 'direction', 'iteration').
+
+        total_s counts every span; self_s subtracts time spent in spans nested inside it on
+        the same thread, so self times of all groups add up to the busy time. share is self
+        time over the traced wall time; overlapping threads (pipelined loop) can exceed 100 %.
+        """
+        spans = [e for e in self.events() if e[0] == "X"]
+        if not spans:
+            return []
+        self_ns = _self_times(spans)
+        rows: Dict[Tuple, Dict[str, Any]] = {}
+        for e, own in zip(spans, self_ns):
+            _, cat, name, _, dur, _, tags, _ = e
+            fields = {"cat": cat, "name": name}
+            key = tuple(fields[k] if k in fields else tags.get(k) for k in by)
+            row = rows.setdefault(key, {"key": key, "count": 0, "total_s": 0.0, "self_s": 0.0, "max_s": 0.0})
+            row["count"] += 1
+            row["total_s"] += dur / 1e9
+            row["self_s"] += own / 1e9
+            row["max_s"] = max(row["max_s"], dur / 1e9)
+        wall = (max(e[3] + e[4] for e in spans) - min(e[3] for e in spans)) / 1e9
+        out = sorted(rows.values(), key=lambda r: -r["self_s"])
+        for r in out:
+            r["mean_s"] = r["total_s"] / r["count"]
+            r["share"] = r["self_s"] / wall if wall > 0 else 0.0
+        return out
+
+    def format_summary(self, by: Sequence[str] = ("cat",)) -> str:
+        label = "/".join(by)
+        lines = [f"{label:<32}{'count':>8}{'total_s':>10}{'self_s':>10}{'mean_s':>10}{'max_s':>10}{'share':>8}"]
+        for r in self.summary(by):
+            key = "/".join("-" if k is None else str(k) for k in r["key"])
+            lines.append(
+                f"{key[:31]:<32}{r['count']:>8}{r['total_s']:>10.3f}{r['self_s']:>10.3f}"
+                f"{r['mean_s']:>10.4f}{r['max_s']:>10.3f}{r['share']:>8.1%}"
+            )
+        return "\n".join(lines)
+
+
+def _self_times(spans: List[Event]) -> List[int]:
+    """
+    Duration minus directly nested child spans, per span (nesting per thread).
+    """
+    own = [e[4] for e in spans]
+    by_thread: Dict[int, List[int]] = {}
+    for i, e in enumerate(spans):
+        by_thread.setdefault(e[5], []).append(i)
+    for idx in by_thread.values():
+        idx.sort(key=lambda i: (spans[i][3], -spans[i][4]))
+        stack: List[int] = []
+        for i in idx:
+            start, end = spans[i][3], spans[i][3] + spans[i][4]
+            while stack and spans[stack[-1]][3] + spans[stack[-1]][4] <= start:
+                stack.pop()
+            if stack and end <= spans[stack[-1]][3] + spans[stack[-1]][4]:
+                own[stack[-1]] -= spans[i][4]
+            stack.append(i)
+    return own
+
+
+def _jsonable(v: Any) -> Any:
+    return v if isinstance(v, (str, int, float, bool)) or v is None else str(v)
+
+
+tracer = Tracer()
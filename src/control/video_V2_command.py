@@ -41,6 +41,39 @@ def rename_latest_mp4(folder, new_name):
     os.rename(latest_file, new_path)
     # messagebox.showinfo("信息", f"Renamed {latest_file} to {new_path}")
 
+# 每个文件夹中最新的MP4文件及其大小（无文件为None），用于判断录像开始/写完
+def latest_mp4_state(root_folder):
+    state = []
+    for folder in folders:
+        mp4_files = glob.glob(os.path.join(root_folder + "/" + folder, '*.mp4'))
+        if not mp4_files:
+            state.append(None)
+            continue
+        latest_file = max(mp4_files, key=os.path.getctime)
+        try:
+            state.append((latest_file, os.path.getsize(latest_file)))
+        except OSError:
+            state.append(None)
+    return state
+
+# 所有文件夹都出现了新的录像文件
+def recording_started(before, root_folder):
+    now = latest_mp4_state(root_folder)
+    return all(n is not None and (b is None or n[0] != b[0]) for b, n in zip(before, now))
+
+# 等待结束录像后新文件写完（大小不再变化），最多等待timeout_s（原为固定1 s）
+def wait_recording_closed(before, root_folder, timeout_s=1.0, poll_s=0.25):
+    deadline = time.monotonic() + timeout_s
+    last = None
+    while time.monotonic() < deadline:
+        now = latest_mp4_state(root_folder)
+        new = all(n is not None and (b is None or n[0] != b[0]) for b, n in zip(before, now))
+        if new and now == last:
+            return True
+        last = now
+        time.sleep(poll_s)
+    return False
+
 # 删除最新的MP4文件
 def delete_latest_mp4(folder):
     mp4_files = glob.glob(os.path.join(folder, '*.mp4'))
@@ -111,6 +144,8 @@ def getposition():
 def main_program():
     stopAll_event=threading.Event()
     stopRecoding_event=threading.Event()
+    recording_event=threading.Event()  # 正在录像（STATUS:PHOTO查询）
+    recording_before=[]  # 开始录像前各文件夹最新的MP4，用于判断新文件
     def stop_recoding():
         stopRecoding_event.set()
     def select_folder():
@@ -121,17 +156,28 @@ def main_program():
     # 自动开始结束
     def motion0(name, time0):
         def record_thread():
+            before = latest_mp4_state(folder_entry.get())
+            recording_before[:] = before
             start_end_recording()
-            totaltime=int(float(time0) + 2)
-            for i in range(totaltime):
-                if stopRecoding_event.is_set() or stopAll_event.is_set():
-                    rename_button1.config(state="disabled")
-                    record_button1.config(state="normal")
-                    auto_button1.config(state="normal")
-                    return
-                time.sleep(1) 
+            recording_event.set()
+            # 录像时长到或收到停止/退出即结束（原为1 s步长的固定等待）
+            deadline = time.monotonic() + float(time0) + 2
+            reported = False
+            while not stopAll_event.is_set():
+                if not reported and recording_started(before, folder_entry.get()):
+                    send_command(ip_main, f"READY:PHOTO:{name}")  # 录像已开始
+                    reported = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or stopRecoding_event.wait(min(remaining, 0.2)):
+                    break
+            if stopRecoding_event.is_set() or stopAll_event.is_set():
+                rename_button1.config(state="disabled")
+                record_button1.config(state="normal")
+                auto_button1.config(state="normal")
+                return
             start_end_recording()
-            time.sleep(1)
+            recording_event.clear()
+            wait_recording_closed(before, folder_entry.get())
             send_command(ip_main,"FINISHPHOTO")
             rename_button1.config(state="disabled")
             record_button1.config(state="normal")
@@ -150,13 +196,16 @@ def main_program():
         rename_button1.config(state="normal")
         record_button1.config(state="disabled")
         auto_button1.config(state="disabled")
+        recording_before[:] = latest_mp4_state(folder_entry.get())
         start_end_recording()
+        recording_event.set()
     # 结束
     def motion1(name):
         stop_recoding()
         rename_button1.config(state="disabled")
         start_end_recording()
-        time.sleep(1)
+        recording_event.clear()
+        wait_recording_closed(recording_before, folder_entry.get())
         send_command(ip_main,"FINISHPHOTO")
         for index, folder in enumerate(folders, start=1):
             new_name = name + f"-{index}.mp4"
@@ -208,10 +257,8 @@ def main_program():
                 try:
                     client_socket, client_address=sever_socket.accept()
                     print(f"connected by client {client_address[0]}:")
-                    message=client_socket.recv(1024).decode("utf-8")
-                    print(f"{message}")
-                    process_command(message)
-                    client_socket.close()
+                    # 主机可保持长连接连续发送以换行分隔的指令，每个连接单独线程处理
+                    threading.Thread(target=handle_client, args=(client_socket,), daemon=True).start()
                 except socket.timeout:
                     continue
             print("LISTNER CLOSED")
@@ -220,6 +267,43 @@ def main_program():
             print(f"find error when sending command：{e}")
             sever_socket.close()
 
+    def handle_client(client_socket):
+        # 按换行符拆分消息；旧的单次发送（无换行）在连接关闭时作为一条消息处理
+        buffer = b""
+        client_socket.settimeout(1)
+        try:
+            while not stopAll_event.is_set():
+                try:
+                    data = client_socket.recv(1024)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break
+                buffer += data
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    message = line.decode("utf-8").strip()
+                    if message.upper().startswith("STATUS:"):
+                        # 状态查询在同一连接上应答：STATUS:PHOTO=1/0
+                        client_socket.sendall((status_reply(message) + "\n").encode("utf-8"))
+                    elif message:
+                        print(f"{message}")
+                        process_command(message)
+            message = buffer.decode("utf-8").strip()
+            if message:
+                print(f"{message}")
+                process_command(message)
+        except Exception as e:
+            print(f"find error when receiving command：{e}")
+        finally:
+            client_socket.close()
+
+    def status_reply(message):
+        key = message.split(":", 1)[1].strip().upper()
+        if key == "PHOTO":
+            return f"STATUS:PHOTO={1 if recording_event.is_set() else 0}"
+        return f"STATUS:{key}="
+
     def process_command(message):
         if ":" in message:
             action,name=message.split(":",1)